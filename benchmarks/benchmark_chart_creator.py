@@ -0,0 +1,202 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+import plotly
+from benchmarks.synthetic_dataset import generate_dataset, write_dataset
+from dash_app.chart_creator_module import ChartCreator
+from dash_app.figure_cache_module import FigureCache
+
+DEFAULT_SIZES = (1000, 100000, 1000000)
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+# The first figure of each group, which creates the rest of the figures of the group
+GRAPH_PHASES = {'graph1_mean_revenue': 'fig1', 'graph1_overall_revenue': 'fig5', 'graph2': 'fig7', 'graph3': 'fig10',
+                'graph4': 'fig11'}
+
+
+def run_phases(dataset_path, measure_memory, chart_creator_options):
+    """
+    Create a ChartCreator from a dataset file and all its figures, and serialize the figures, measuring the time (and
+    optionally the tracemalloc peak memory) of each phase.
+
+    Arguments
+    ---------
+    dataset_path : str
+        The path to the dataset file.
+    measure_memory : bool
+        Whether the peak memory of each phase is measured (tracemalloc makes the phases slower, so the times of a run
+        with measure_memory should not be used).
+    chart_creator_options : dict
+        Any other arguments of ChartCreator.
+
+    Returns
+    -------
+    phases : dict
+        The seconds (and peak_memory_bytes) of each phase: construction (split into load and aggregate), each graph
+        and serialization.
+    figure_bytes : dict
+        The size of the JSON of each figure.
+
+    """
+    phases = {}
+
+    def measure(name, function):
+        """Run a phase and store its time (and peak memory)"""
+        if measure_memory:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        result = function()
+        phases[name] = {'seconds': time.perf_counter() - start}
+        if measure_memory:
+            phases[name]['peak_memory_bytes'] = tracemalloc.get_traced_memory()[1]
+        return result
+
+    if measure_memory:
+        tracemalloc.start()
+    try:
+        chart_creator = measure('construction', lambda: ChartCreator(dataset_path, **chart_creator_options))
+        for name, seconds in chart_creator.construction_times.items():
+            phases[name] = {'seconds': seconds}
+        for name, figure_name in GRAPH_PHASES.items():
+            measure(name, lambda: getattr(chart_creator, figure_name))
+        figure_cache = FigureCache(chart_creator)
+        figure_bytes = measure('serialization', lambda: {name: len(figure_cache.serialized(name)[0])
+                                                         for name in chart_creator.figure_names})
+    finally:
+        if measure_memory:
+            tracemalloc.stop()
+
+    return phases, figure_bytes
+
+
+def benchmark_size(number_of_rows, directory, measure_memory, seed, chart_creator_options):
+    """
+    Generate a synthetic dataset with a number of rows and benchmark ChartCreator on it.
+
+    Arguments
+    ---------
+    number_of_rows : int
+        The number of rows of the dataset.
+    directory : str
+        The directory where the dataset file is written.
+    measure_memory : bool
+        Whether a second run is made to measure the peak memory of each phase.
+    seed : int
+        The seed of the dataset generator.
+    chart_creator_options : dict
+        Any other arguments of ChartCreator.
+
+    Returns
+    -------
+    dict
+        The results for the dataset.
+
+    """
+    start = time.perf_counter()
+    dataset_path = os.path.join(directory, f'synthetic_{number_of_rows}.csv')
+    write_dataset(generate_dataset(number_of_rows, seed), dataset_path)
+    generation_seconds = time.perf_counter() - start
+    if chart_creator_options['use_cache']:  # The cache file is built before the measured runs
+        ChartCreator(dataset_path, **chart_creator_options)
+
+    phases, figure_bytes = run_phases(dataset_path, False, chart_creator_options)
+    if measure_memory:
+        memory_phases, _ = run_phases(dataset_path, True, chart_creator_options)
+        for name, memory_phase in memory_phases.items():
+            if 'peak_memory_bytes' in memory_phase:
+                phases[name]['peak_memory_bytes'] = memory_phase['peak_memory_bytes']
+
+    return {'rows': number_of_rows, 'dataset_bytes': os.path.getsize(dataset_path),
+            'generation_seconds': generation_seconds, 'phases': phases, 'figure_bytes': figure_bytes}
+
+
+def get_commit():
+    """Get the hash of the current git commit (None if it cannot be obtained)"""
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_results(previous, current):
+    """
+    Print the time of each phase in two result files, along with the ratio between them (so regressions between two
+    commits stand out).
+
+    Arguments
+    ---------
+    previous, current : dict
+        The contents of the result files.
+
+    """
+    previous_results = {result['rows']: result for result in previous['results']}
+    print(f"Comparing with {previous.get('commit')} ({previous.get('created')})")
+    for result in current['results']:
+        if result['rows'] not in previous_results:
+            continue
+        print(f"{result['rows']} rows")
+        for name, phase in result['phases'].items():
+            previous_phase = previous_results[result['rows']]['phases'].get(name)
+            if previous_phase:
+                ratio = phase['seconds'] / previous_phase['seconds'] if previous_phase['seconds'] else float('nan')
+                print(f"  {name:<24}{previous_phase['seconds']:>10.3f} s{phase['seconds']:>10.3f} s{ratio:>8.2f}x")
+
+
+def main(argv=None):
+    """Run the benchmark from the command line (python -m benchmarks.benchmark_chart_creator)"""
+    parser = argparse.ArgumentParser(description='Benchmark the creation of the dashboard data and figures on '
+                                                 'synthetic datasets')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help='The number of rows of the datasets')
+    parser.add_argument('--output', help='The path of the JSON result file (default: benchmarks/results/'
+                                         'chart_creator-<commit>-<time>.json)')
+    parser.add_argument('--compare', help='A previous result file to compare the results with')
+    parser.add_argument('--seed', type=int, default=0, help='The seed of the dataset generator')
+    parser.add_argument('--skip-memory', action='store_true', help='Do not measure the peak memory of each phase')
+    parser.add_argument('--streaming', action='store_true', help='Stream the datasets instead of loading them')
+    parser.add_argument('--workers', type=int, help='The maximum number of processes used to aggregate the datasets')
+    parser.add_argument('--cache', action='store_true', help='Load the datasets from their cache files (built before '
+                                                             'the measured runs) instead of parsing them')
+    arguments = parser.parse_args(argv)
+
+    # Unless --cache is given, the cache is disabled, so that the dataset file is parsed every time
+    chart_creator_options = {'use_cache': arguments.cache, 'streaming': arguments.streaming,
+                             'workers': arguments.workers}
+    results = {'created': datetime.datetime.now().isoformat(timespec='seconds'), 'commit': get_commit(),
+               'python': sys.version.split()[0], 'platform': platform.platform(), 'cpu_count': os.cpu_count(),
+               'packages': {'numpy': np.__version__, 'pandas': pd.__version__, 'plotly': plotly.__version__},
+               'options': dict(chart_creator_options), 'results': []}
+
+    with tempfile.TemporaryDirectory() as directory:
+        for number_of_rows in arguments.sizes:
+            result = benchmark_size(number_of_rows, directory, not arguments.skip_memory, arguments.seed,
+                                    chart_creator_options)
+            results['results'].append(result)
+            print(f'{number_of_rows} rows: ' + ', '.join(f"{name} {phase['seconds']:.3f} s"
+                                                         for name, phase in result['phases'].items()))
+
+    output = arguments.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        timestamp = datetime.datetime.now().strftime('%Y%m%d-%H%M%S')
+        output = os.path.join(RESULTS_DIR, f"chart_creator-{(results['commit'] or 'unknown')[:8]}-{timestamp}.json")
+    with open(output, 'w') as output_file:
+        json.dump(results, output_file, indent=2)
+    print(f'Results written to {output}')
+
+    if arguments.compare:
+        with open(arguments.compare) as previous_file:
+            compare_results(json.load(previous_file), results)
+
+
+if __name__ == '__main__':
+    main()
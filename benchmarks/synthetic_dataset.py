@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+
+# The genres of prepared_dataset.xlsx, with their relative frequency in it
+GENRES = {'Drama': 136, 'Comedy': 116, 'Action': 102, 'Thriller': 94, 'Adventure': 91, 'Horror': 61, 'Fantasy': 54,
+          'Family': 52, 'Science Fiction': 51, 'Crime': 47, 'Romance': 44, 'Animation': 41, 'Mystery': 32,
+          'History': 27, 'Music': 16, 'Documentary': 8, 'War': 7, 'Western': 3}
+NUMBER_OF_DISTRIBUTORS = 31
+FIRST_RELEASE_DATE = '2018-01-01'
+LAST_RELEASE_DATE = '2021-10-21'
+
+
+def generate_dataset(number_of_rows, seed=0):
+    """
+    Generate a synthetic dataset with the same columns as prepared_dataset.xlsx (as they are stored in the file, i.e.,
+    the genres are the string representation of a list), so it can be read by ChartCreator. The distributions are
+    similar to the real ones: one to four genres per film (with the frequencies of GENRES), a few distributors that
+    release most of the films, normally distributed runtimes and log-normally distributed revenues.
+
+    Arguments
+    ---------
+    number_of_rows : int
+        The number of films.
+    seed : int
+        The seed of the random generator (the same seed always generates the same dataset). Default is 0.
+
+    Returns
+    -------
+    pandas.core.frame.DataFrame
+        The generated dataset.
+
+    """
+    generator = np.random.default_rng(seed)
+    genres = np.array(list(GENRES))
+    weights = np.array(list(GENRES.values()), dtype=np.float64)
+
+    # The genres of each film are sampled without replacement by keeping the smallest exponential keys (divided by the
+    # weight of each genre), which is vectorized for all the films
+    number_of_genres = generator.integers(1, 5, size=number_of_rows)
+    keys = generator.exponential(size=(number_of_rows, len(genres))).astype(np.float32) / weights.astype(np.float32)
+    order = np.argsort(keys, axis=1)
+    film_genres = [str(genres[row_order[:count]].tolist()) for row_order, count in zip(order, number_of_genres)]
+
+    distributor_weights = 1 / np.arange(1, NUMBER_OF_DISTRIBUTORS + 1)
+    distributors = generator.choice(NUMBER_OF_DISTRIBUTORS, size=number_of_rows,
+                                    p=distributor_weights / distributor_weights.sum())
+
+    first_day = np.datetime64(FIRST_RELEASE_DATE)
+    number_of_days = (np.datetime64(LAST_RELEASE_DATE) - first_day).astype(np.int64) + 1
+    release_dates = first_day + generator.integers(0, number_of_days, size=number_of_rows).astype('timedelta64[D]')
+
+    return pd.DataFrame({
+        'Unnamed: 0': np.arange(number_of_rows),
+        'Film': [f'Film {number}' for number in range(number_of_rows)],
+        'Distributor': [f'Distributor {number + 1}' for number in distributors],
+        'Rating': np.round(np.clip(generator.normal(6.5, 1.0, size=number_of_rows), 1, 10), 1),
+        'Runtime': np.clip(generator.normal(112, 19, size=number_of_rows), 60, 240).astype(np.int64),
+        'Genres': film_genres,
+        'Revenue': np.maximum(generator.lognormal(np.log(5e7), 1.6, size=number_of_rows), 1000).astype(np.int64),
+        'Release Date': pd.to_datetime(np.sort(release_dates))
+    })
+
+
+def write_dataset(df, path):
+    """
+    Write a generated dataset into a file that ChartCreator can read (.csv or .xlsx, depending on the extension).
+    Writing large datasets as .xlsx is very slow, so .csv is recommended for them.
+
+    Arguments
+    ---------
+    df : pandas.core.frame.DataFrame
+        The dataset returned by generate_dataset.
+    path : str
+        The path of the file.
+
+    """
+    if path.lower().endswith('.xlsx'):
+        df.drop(columns=['Unnamed: 0']).to_excel(path)  # The index is stored as the unnamed column
+    else:
+        df.to_csv(path, index=False)
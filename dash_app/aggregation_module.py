@@ -0,0 +1,409 @@
+import itertools
+import numpy as np
+import pandas as pd
+
+
+def explode_category(column_data):
+    """
+    Convert a categorical column into integer codes, so that the rows can be grouped without Python loops.
+
+    Columns whose cells are lists (e.g., Genres) are flattened, which means a film will contribute to each of the
+    elements in its list. Columns whose cells are scalars (e.g., Distributor) produce one code per row.
+
+    Arguments
+    ---------
+    column_data : pandas.core.series.Series
+        The categorical column that is to be encoded.
+
+    Returns
+    -------
+    rows : numpy.ndarray
+        The position of the row that each code was taken from.
+    codes : numpy.ndarray
+        The integer code of the element found in each position of rows.
+    elements : numpy.ndarray
+        The individual categorical elements (elements[code] is the element that a code stands for).
+
+    """
+    if len(column_data) and isinstance(column_data.iloc[0], (list, tuple)):
+        lengths = np.fromiter((len(cell) for cell in column_data), dtype=np.int64, count=len(column_data))
+        rows = np.repeat(np.arange(len(column_data)), lengths)
+        flat_elements = np.fromiter(itertools.chain.from_iterable(column_data), dtype=object, count=lengths.sum())
+        codes, elements = pd.factorize(flat_elements)
+    else:
+        rows = np.arange(len(column_data))
+        codes, elements = pd.factorize(column_data.to_numpy())
+
+    return rows, codes, np.asarray(elements, dtype=object)
+
+
+def aggregate_by_category(df, column, list_of_variables):
+    """
+    Produce a dataframe containing information (Overall, Mean, Standard deviation, Number of Movies and Standard error)
+    about each element in a categorical column of df (e.g., Genres, Distributor) with regards to different numerical
+    variables (e.g., Revenue, Rating).
+
+    The categorical elements are converted to integer codes and every statistic is accumulated with numpy.bincount, so
+    the rows are only traversed once per variable regardless of how many elements the column has.
+
+    Arguments
+    ---------
+    df : pandas.core.frame.DataFrame
+        The dataframe that contains the categorical and numerical columns.
+    column : str
+        The name of the categorical column whose information we want extracted.
+    list_of_variables : list
+        The names of the numerical columns we want the information (overall, mean, standard deviation and standard
+        error) to be calculated about (e.g., Revenue, Rating).
+
+    Returns
+    -------
+    pandas.core.frame.DataFrame
+        The dataframe that was created. It has the same columns as the one previously generated by
+        ChartCreator.__create_specialized_df: column, the Overall, Mean and SD columns for each variable, Number of
+        Movies and the Standard Error columns for each variable.
+
+    """
+    accumulator = CategoryAccumulator(column, list_of_variables)
+    accumulator.update(df)
+    return accumulator.to_frame()
+
+
+def category_statistics(codes, values, number_of_elements):
+    """
+    Calculate the number of rows, the sum and the sum of squared deviations from the mean (M2) of different variables
+    for each categorical element, given the integer code of the element of each row.
+
+    Arguments
+    ---------
+    codes : numpy.ndarray
+        The code of the element of each row (as returned by explode_category).
+    values : dict
+        The values of each variable (numpy.ndarray, aligned with codes), keyed by variable name.
+    number_of_elements : int
+        The number of different elements (i.e., the codes are smaller than this number).
+
+    Returns
+    -------
+    counts : numpy.ndarray
+        The number of rows of each element.
+    sums, m2 : dict
+        The sum and M2 of each variable for each element (numpy.ndarray), keyed by variable name.
+
+    """
+    counts = np.bincount(codes, minlength=number_of_elements)
+    sums, m2 = {}, {}
+    with np.errstate(invalid='ignore', divide='ignore'):  # Elements without rows have no mean
+        for variable, variable_values in values.items():
+            variable_values = np.asarray(variable_values, dtype=np.float64)
+
+            # Two bincounts are used for M2 (rather than the sum of squares) to avoid losing precision when the values
+            # are large (revenues are in the order of 10^9)
+            sums[variable] = np.bincount(codes, weights=variable_values, minlength=number_of_elements)
+            means = sums[variable] / counts
+            m2[variable] = np.bincount(codes, weights=np.square(variable_values - means[codes]),
+                                       minlength=number_of_elements)
+
+    return counts, sums, m2
+
+
+class CategoryAccumulator:
+    """
+    A class that keeps running statistics (number of movies, sum and sum of squared deviations from the mean, i.e., M2)
+    of different numerical variables for each element of a categorical column.
+
+    The statistics of two sets of rows can be merged without going through the rows again (Chan et al.'s parallel
+    algorithm), so when new rows are added to a dataset only the new rows have to be processed.
+
+    Arguments
+    ---------
+    column : str
+        The name of the categorical column (e.g., Genres, Distributor).
+    list_of_variables : list
+        The names of the numerical columns whose statistics are kept (e.g., Revenue).
+
+    Attributes
+    ----------
+    __column, __variables
+        The column and variables introduced when creating the class.
+    __elements : list
+        The categorical elements, in the order in which they first appeared.
+    __positions : dict
+        The position of each element in __elements (and in the statistic arrays).
+    __counts : numpy.ndarray
+        The number of rows of each element.
+    __sums, __m2 : dict
+        The sum and the sum of squared deviations from the mean of each variable (numpy.ndarray, one value per
+        element), keyed by variable name.
+    __integer_variables : set
+        The variables whose values have always been integers (their sums are returned as integers).
+
+    Methods
+    -------
+    add_statistics
+        Merge the statistics of a set of rows into the accumulated statistics.
+    update
+        Add the rows of a dataframe to the statistics.
+    merge
+        Add the statistics of another accumulator.
+    to_frame
+        Obtain the statistics as a dataframe (in the same format as aggregate_by_category).
+
+    """
+
+    def __init__(self, column, list_of_variables):
+        """Create an instance of the class"""
+        self.__column = column
+        self.__variables = list(list_of_variables)
+        self.__elements = []
+        self.__positions = {}
+        self.__counts = np.zeros(0, dtype=np.int64)
+        self.__sums = {variable: np.zeros(0) for variable in self.__variables}
+        self.__m2 = {variable: np.zeros(0) for variable in self.__variables}
+        self.__integer_variables = set(self.__variables)
+
+    def add_statistics(self, elements, counts, sums, m2, integer_variables):
+        """
+        Merge the statistics of a set of rows (e.g., calculated with category_statistics) into the accumulated
+        statistics. Elements that have not been seen before are appended.
+
+        Arguments
+        ---------
+        elements : list
+            The categorical elements the statistics belong to.
+        counts : numpy.ndarray
+            The number of rows of each element. They must be greater than 0.
+        sums, m2 : dict
+            The sum and M2 of each variable for each element.
+        integer_variables : set
+            The variables whose values were integers.
+
+        """
+        for element in elements:
+            if element not in self.__positions:
+                self.__positions[element] = len(self.__elements)
+                self.__elements.append(element)
+        positions = np.fromiter((self.__positions[element] for element in elements), dtype=np.int64,
+                                count=len(elements))
+
+        new_size = len(self.__elements)
+        if new_size > len(self.__counts):
+            self.__counts = np.pad(self.__counts, (0, new_size - len(self.__counts)))
+            for variable in self.__variables:
+                self.__sums[variable] = np.pad(self.__sums[variable], (0, new_size - len(self.__sums[variable])))
+                self.__m2[variable] = np.pad(self.__m2[variable], (0, new_size - len(self.__m2[variable])))
+
+        counts_a = self.__counts[positions]
+        total_counts = counts_a + counts
+        for variable in self.__variables:
+            sums_a = self.__sums[variable][positions]
+            # delta = mean_b - mean_a. Elements without previous rows have no mean, but their M2 is not affected
+            # because counts_a is 0
+            mean_a = np.divide(sums_a, counts_a, out=np.zeros(len(positions)), where=counts_a > 0)
+            delta = sums[variable] / counts - mean_a
+            self.__m2[variable][positions] += m2[variable] + np.square(delta) * counts_a * counts / total_counts
+            self.__sums[variable][positions] = sums_a + sums[variable]
+        self.__counts[positions] = total_counts
+        self.__integer_variables &= integer_variables
+
+    def update(self, df, encoding=None):
+        """
+        Add the rows of a dataframe to the statistics. Only the new rows are traversed.
+
+        Arguments
+        ---------
+        df : pandas.core.frame.DataFrame
+            The dataframe that contains the categorical column and the numerical variables.
+        encoding : tuple
+            The rows, codes and elements of the categorical column, as returned by explode_category. Default is None,
+            which means the column is encoded here.
+
+        """
+        if not len(df):
+            return
+
+        rows, codes, elements = encoding if encoding is not None else explode_category(df[self.__column])
+        values = {variable: df[variable].to_numpy()[rows] for variable in self.__variables}
+        counts, sums, m2 = category_statistics(codes, values, len(elements))
+        integer_variables = {variable for variable in self.__variables
+                             if np.issubdtype(df[variable].dtype, np.integer)}
+
+        self.add_statistics(list(elements), counts, sums, m2, integer_variables)
+
+    def merge(self, other):
+        """
+        Add the statistics of another accumulator (e.g., one that was updated with a different set of rows).
+
+        Arguments
+        ---------
+        other : dash_app.aggregation_module.CategoryAccumulator
+            The accumulator to be merged. It must have the same column and variables.
+
+        """
+        if other.column != self.__column or other.variables != self.__variables:
+            raise ValueError('Only accumulators with the same column and variables can be merged')
+
+        elements, counts, sums, m2, integer_variables = other.statistics
+        if len(elements):
+            self.add_statistics(elements, counts, sums, m2, integer_variables)
+
+    def to_frame(self):
+        """
+        Obtain the accumulated statistics as a dataframe.
+
+        Returns
+        -------
+        pandas.core.frame.DataFrame
+            A dataframe with the same columns as the one produced by aggregate_by_category. The elements are in the
+            order in which they first appeared.
+
+        """
+        number_of_movies = self.__counts.copy()
+        specialized_df = pd.DataFrame({self.__column: np.asarray(self.__elements, dtype=object)})
+        standard_errors = {}
+        for variable in self.__variables:
+            sums = self.__sums[variable]
+            means = sums / number_of_movies
+            standard_deviations = np.sqrt(self.__m2[variable] / number_of_movies)
+
+            # Keep integer variables (e.g., Revenue) as integers, in the same way the summation of the values would
+            if variable in self.__integer_variables:
+                sums = np.rint(sums).astype(np.int64)
+
+            specialized_df[variable] = sums
+            specialized_df[f'Mean {variable}'] = means
+            specialized_df[f'SD {variable}'] = standard_deviations
+            # The formula is SE = SD / sqrt(n of samples)
+            standard_errors[f'Standard Error ({variable})'] = np.round(standard_deviations / np.sqrt(number_of_movies),
+                                                                       2)
+
+        specialized_df['Number of Movies'] = number_of_movies
+        for name, standard_error in standard_errors.items():
+            specialized_df[name] = standard_error
+
+        return specialized_df
+
+    @property
+    def column(self):
+        """Getter method to obtain the categorical column"""
+        return self.__column
+
+    @property
+    def variables(self):
+        """Getter method to obtain the numerical variables"""
+        return list(self.__variables)
+
+    @property
+    def statistics(self):
+        """Getter method to obtain a copy of the elements, counts, sums, M2 and integer variables"""
+        return (list(self.__elements), self.__counts.copy(),
+                {variable: values.copy() for variable, values in self.__sums.items()},
+                {variable: values.copy() for variable, values in self.__m2.items()}, set(self.__integer_variables))
+
+
+# Frequencies accepted by aggregate_by_date and the pandas period alias they correspond to
+DATE_FREQUENCIES = {'daily': 'D', 'weekly': 'W', 'monthly': 'M'}
+
+
+def aggregate_by_date(df, date_column, variable, frequency='daily'):
+    """
+    Produce a dataframe containing the summation of a numerical variable (e.g., Revenue) for each date (or week or
+    month) in a date column (e.g., Release Date).
+
+    The dataframe is sorted once and grouped by date, instead of comparing each date with every row.
+
+    Arguments
+    ---------
+    df : pandas.core.frame.DataFrame
+        The dataframe that contains the date and numerical columns.
+    date_column : str
+        The name of the date column (e.g., Release Date).
+    variable : str
+        The name of the numerical column that is to be summed (e.g., Revenue).
+    frequency : str
+        The period in which the rows are grouped: 'daily', 'weekly' or 'monthly'. Weeks and months are labelled with the
+        date they start on. Default is 'daily'.
+
+    Returns
+    -------
+    pandas.core.frame.DataFrame
+        A dataframe with the date_column and variable columns, sorted by ascending date. Only the periods that contain
+        at least one row are included.
+
+    """
+    if frequency not in DATE_FREQUENCIES:
+        raise ValueError(f"Unknown date frequency '{frequency}'. Available options: {', '.join(DATE_FREQUENCIES)}")
+
+    dates = pd.to_datetime(df[date_column])
+    if frequency != 'daily':
+        dates = dates.dt.to_period(DATE_FREQUENCIES[frequency]).dt.start_time
+    else:
+        dates = dates.dt.normalize()
+
+    date_df = df[variable].groupby(dates.to_numpy(), sort=True).sum()
+    date_df.index.name = date_column
+
+    return date_df.reset_index()
+
+
+class DateAccumulator:
+    """
+    A class that keeps the running summation of a numerical variable (e.g., Revenue) for each date (or week or month),
+    so that new rows can be added without grouping the previous rows again.
+
+    Arguments
+    ---------
+    date_column : str
+        The name of the date column (e.g., Release Date).
+    variable : str
+        The name of the numerical column that is summed (e.g., Revenue).
+    frequency : str
+        The period in which the rows are grouped: 'daily', 'weekly' or 'monthly'. Default is 'daily'.
+
+    Attributes
+    ----------
+    __date_column, __variable, __frequency
+        The arguments introduced when creating the class.
+    __sums : dict
+        The summation of the variable for each period, keyed by the date the period starts on.
+
+    Methods
+    -------
+    update
+        Add the rows of a dataframe to the summations.
+    to_frame
+        Obtain the summations as a dataframe (in the same format as aggregate_by_date).
+
+    """
+
+    def __init__(self, date_column, variable, frequency='daily'):
+        """Create an instance of the class"""
+        if frequency not in DATE_FREQUENCIES:
+            raise ValueError(f"Unknown date frequency '{frequency}'. Available options: {', '.join(DATE_FREQUENCIES)}")
+        self.__date_column = date_column
+        self.__variable = variable
+        self.__frequency = frequency
+        self.__sums = {}
+
+    def update(self, df):
+        """Add the rows of a dataframe (which must contain the date column and the variable) to the summations"""
+        if not len(df):
+            return
+
+        date_df = aggregate_by_date(df, self.__date_column, self.__variable, self.__frequency)
+        for date, value in zip(date_df[self.__date_column], date_df[self.__variable].tolist()):
+            self.__sums[date] = self.__sums.get(date, 0) + value
+
+    def to_frame(self):
+        """
+        Obtain the summations as a dataframe.
+
+        Returns
+        -------
+        pandas.core.frame.DataFrame
+            A dataframe with the date column and the variable, sorted by ascending date.
+
+        """
+        dates = sorted(self.__sums)
+        return pd.DataFrame({self.__date_column: pd.DatetimeIndex(dates),
+                             self.__variable: [self.__sums[date] for date in dates]})
@@ -0,0 +1,245 @@
+import argparse
+import hashlib
+import json
+import math
+import mmap
+import os
+import struct
+import numpy as np
+import pandas as pd
+from dash_app.dataset_cache_module import atomic_write
+
+# Increase this number whenever the layout of the artefact file (or what ChartCreator stores in it) changes, so that
+# old artefacts are not opened
+ARTEFACT_VERSION = 1
+MAGIC = b'DASHARTF'
+HEADER = struct.Struct('<8sIQ')  # Magic bytes, version and length of the JSON index
+ALIGNMENT = 64  # Every array starts at a multiple of this number of bytes, so it can be viewed without being copied
+
+
+def default_artefact_path(dataset_path):
+    """Get the default path of the artefact of a dataset file (e.g., prepared_dataset.artefact next to the dataset)"""
+    return os.path.splitext(dataset_path)[0] + '.artefact'
+
+
+def align(offset):
+    """Round an offset up to the next multiple of ALIGNMENT"""
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def write_artefact(path, metadata, arrays, frames, figures):
+    """
+    Write the aggregates and serialized figures of the dashboard into an artefact file. The file starts with a header
+    (magic bytes, ARTEFACT_VERSION and the length of a JSON index) followed by the index, which contains the metadata
+    and the position of every array and figure. The arrays and figures are stored after the index as raw bytes, so
+    they can be read through a memory map without being parsed or copied.
+
+    The file is written atomically, so workers never open a half-written artefact.
+
+    Arguments
+    ---------
+    path : str
+        The path of the artefact file.
+    metadata : dict
+        Any JSON serializable information (e.g., the hash of the dataset and the options used to aggregate it).
+    arrays : dict
+        The numpy arrays to be stored, keyed by name. They cannot contain Python objects.
+    frames : dict
+        The dataframes to be stored, keyed by name. Each column is stored as an array (strings as fixed-width unicode).
+    figures : dict
+        The JSON bytes of each figure, keyed by figure name.
+
+    """
+    arrays = dict(arrays)
+    frame_columns = {}
+    for frame_name, df in frames.items():
+        frame_columns[frame_name] = []
+        for position, column in enumerate(df.columns):
+            if df[column].dtype.kind in 'biufcmM':  # Numbers and datetimes can be stored directly
+                arrays[f'{frame_name}/{position}'] = df[column].to_numpy()
+                frame_columns[frame_name].append([column, 'values'])
+            else:
+                arrays[f'{frame_name}/{position}'] = np.array(df[column].tolist(), dtype=str)
+                frame_columns[frame_name].append([column, 'str'])
+
+    index = {'metadata': metadata, 'arrays': {}, 'frames': frame_columns, 'figures': {}}
+    blobs = []
+    offset = 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        if array.dtype.hasobject:
+            raise ValueError(f"The array '{name}' contains Python objects, which cannot be stored in an artefact")
+        index['arrays'][name] = {'offset': offset, 'dtype': array.dtype.str, 'shape': list(array.shape)}
+        blobs.append((offset, array.tobytes()))
+        offset = align(offset + array.nbytes)
+    for name, payload in figures.items():
+        index['figures'][name] = {'offset': offset, 'length': len(payload),
+                                  'etag': hashlib.sha256(payload).hexdigest()[:32]}
+        blobs.append((offset, payload))
+        offset = align(offset + len(payload))
+
+    index_bytes = json.dumps(index).encode()
+    data_start = align(HEADER.size + len(index_bytes))
+
+    def write(artefact_file):
+        artefact_file.write(HEADER.pack(MAGIC, ARTEFACT_VERSION, len(index_bytes)))
+        artefact_file.write(index_bytes)
+        for blob_offset, blob in blobs:
+            artefact_file.seek(data_start + blob_offset)
+            artefact_file.write(blob)
+        artefact_file.truncate(data_start + offset)
+
+    atomic_write(path, write)
+
+
+class DashboardArtefact:
+    """
+    A class that opens an artefact file written by write_artefact through a read-only memory map. The arrays are numpy
+    views of the map, so the pages are loaded on demand and shared by every process that opens the same file (e.g., the
+    gunicorn workers), instead of each process keeping its own copy.
+
+    Arguments
+    ---------
+    path : str
+        The path of the artefact file.
+
+    Attributes
+    ----------
+    __path : str
+        The path introduced when creating the class.
+    __map : mmap.mmap
+        The read-only memory map of the file.
+    __index : dict
+        The JSON index of the file (metadata and position of the arrays, dataframes and figures).
+    __data_start : int
+        The position of the first array or figure in the file.
+
+    Methods
+    -------
+    array
+        Get an array (a read-only view of the memory map).
+    frame
+        Get a dataframe.
+    figure_json
+        Get the JSON bytes of a figure.
+    etag
+        Get the content hash of a figure.
+    path, metadata, figure_names
+        Getter methods to obtain the path, the metadata and the names of the stored figures.
+
+    """
+
+    def __init__(self, path):
+        """Create an instance of the class. A ValueError is raised if the file is not a valid artefact"""
+        self.__path = path
+        with open(path, 'rb') as artefact_file:
+            self.__map = mmap.mmap(artefact_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self.__map) < HEADER.size:
+            raise ValueError(f'{path} is not a dashboard artefact')
+        magic, version, index_length = HEADER.unpack_from(self.__map, 0)
+        if magic != MAGIC:
+            raise ValueError(f'{path} is not a dashboard artefact')
+        if version != ARTEFACT_VERSION:
+            raise ValueError(f'{path} has version {version}, but version {ARTEFACT_VERSION} is required')
+
+        self.__index = json.loads(self.__map[HEADER.size:HEADER.size + index_length])
+        self.__data_start = align(HEADER.size + index_length)
+
+    def array(self, name):
+        """
+        Get one of the arrays stored in the artefact. The array is not copied: it is a read-only view of the memory map.
+
+        Arguments
+        ---------
+        name : str
+            The name of the array.
+
+        Returns
+        -------
+        numpy.ndarray
+            The array.
+
+        """
+        entry = self.__index['arrays'][name]
+        dtype = np.dtype(entry['dtype'])
+        return np.frombuffer(self.__map, dtype=dtype, count=math.prod(entry['shape']),
+                             offset=self.__data_start + entry['offset']).reshape(entry['shape'])
+
+    def frame(self, name):
+        """Get one of the dataframes stored in the artefact (the columns are copied from the memory map)"""
+        columns = {}
+        for position, (column, kind) in enumerate(self.__index['frames'][name]):
+            values = self.array(f'{name}/{position}')
+            columns[column] = np.asarray(values.tolist(), dtype=object) if kind == 'str' else values.copy()
+
+        return pd.DataFrame(columns)
+
+    def figure_json(self, name):
+        """Get the JSON bytes of one of the figures stored in the artefact"""
+        entry = self.__index['figures'][name]
+        start = self.__data_start + entry['offset']
+        return self.__map[start:start + entry['length']]
+
+    def etag(self, name):
+        """Get the content hash of one of the figures stored in the artefact"""
+        return self.__index['figures'][name]['etag']
+
+    @property
+    def path(self):
+        """Getter method to obtain the path of the artefact file"""
+        return self.__path
+
+    @property
+    def metadata(self):
+        """Getter method to obtain the metadata stored in the artefact"""
+        return self.__index['metadata']
+
+    @property
+    def figure_names(self):
+        """Getter method to obtain the names of the figures stored in the artefact"""
+        return tuple(self.__index['figures'])
+
+
+def build_artefact(dataset_path, artefact_path=None, **options):
+    """
+    Aggregate a dataset, create all the figures and store them in an artefact file, so that the app processes can open
+    the artefact instead of computing everything again.
+
+    Arguments
+    ---------
+    dataset_path : str
+        The path to the dataset file.
+    artefact_path : str
+        The path of the artefact file. Default is None, which means default_artefact_path(dataset_path).
+    **options
+        Any other arguments of ChartCreator (they must match the ones the app uses, otherwise the artefact is ignored).
+
+    Returns
+    -------
+    str
+        The path of the artefact file.
+
+    """
+    from dash_app.chart_creator_module import ChartCreator  # Imported here, as ChartCreator reads artefacts
+
+    artefact_path = artefact_path or default_artefact_path(dataset_path)
+    ChartCreator(dataset_path, **options).export_artefact(artefact_path)
+    return artefact_path
+
+
+def main(argv=None):
+    """Build the artefact of a dataset from the command line (python -m dash_app.artefact_module dataset.xlsx)"""
+    parser = argparse.ArgumentParser(description='Build the artefact file of the dashboard, which contains the '
+                                                 'aggregated data and the serialized figures')
+    parser.add_argument('dataset_path', help='The path to the dataset file (.xlsx or .csv)')
+    parser.add_argument('-o', '--output', help='The path of the artefact file (default: next to the dataset, with the '
+                                               '.artefact extension)')
+    arguments = parser.parse_args(argv)
+
+    artefact_path = build_artefact(arguments.dataset_path, arguments.output)
+    print(f'Artefact written to {artefact_path} ({os.path.getsize(artefact_path)} bytes)')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,35 @@
 import plotly.express as px
 import plotly.graph_objects as go
+import plotly.io as pio
 import pandas as pd
 import numpy as np
 import math
-import copy
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from dash_app.aggregation_module import CategoryAccumulator, DateAccumulator
+from dash_app.artefact_module import DashboardArtefact, write_artefact
+from dash_app.dataset_cache_module import default_cache_dir, load_cached_dataset, source_hash
+from dash_app.dataset_stream_module import DEFAULT_CHUNK_SIZE, prepare_dataset, stream_dataset
+from dash_app.date_index_module import ONE_DAY, DateIndex
+from dash_app.downsampling_module import DEFAULT_MAX_POINTS, largest_triangle_three_buckets
+from dash_app.genre_index_module import GenreIndex
+from dash_app.parallel_aggregation_module import aggregate_in_parallel
+from dash_app.runtime_index_module import RuntimeIndex
+
+logger = logging.getLogger(__name__)
+
+# The periods highlighted on the Revenue vs Date plot (graph 3): name, first date, date after the last one and color
+DEFAULT_PERIODS = [
+    ('Pre-Lockdown', '2018-01-01', '2020-03-15', 'rgb(0,255,0)'),
+    ('Lockdown', '2020-03-15', '2020-07-15', 'rgb(255,0,0)'),
+    ('Post-Lockdown', '2020-07-15', '2021-10-22', 'rgb(255,153,0)')
+]
+DEFAULT_RUNTIME_BINS = 8  # The number of bins of the runtime histograms (fig7 to fig9) before they are modified
 
 
 class ChartCreator:
@@ -13,53 +39,144 @@ class ChartCreator:
     Arguments
     ---------
     dataset_path : str
-        The path to the file containing the dataset (prepared_dataset.xlsx).
+        The path to the file containing the dataset (prepared_dataset.xlsx, or an .xlsx or .csv file with the same
+        columns).
+    date_frequency : str
+        The period used to group the revenue over time (graph 3): 'daily', 'weekly' or 'monthly'. Default is 'daily'.
+    use_cache : bool
+        Whether the prepared dataset is loaded from (and stored in) a columnar cache file, instead of parsing the
+        dataset file every time. Default is True.
+    cache_dir : str
+        The directory where the cache files are stored. Default is None, which means a .dataset_cache directory next to
+        the dataset file is used.
+    figure_cache_size : int
+        The maximum number of figures created by category_figure that are kept in memory. Default is 128.
+    streaming : bool
+        Whether the dataset file is read in chunks that are added to the aggregated data one at a time, instead of
+        loading the whole dataset into a dataframe. It is meant for datasets that do not fit comfortably in memory (the
+        cache is not used). Default is False.
+    chunk_size : int
+        The number of rows of each chunk when streaming is True. Default is DEFAULT_CHUNK_SIZE.
+    aggregated_variables : list
+        The numerical columns whose statistics are calculated for each genre and distribution company (the figures use
+        Revenue, which must be included). Default is ['Revenue'].
+    workers : int
+        The maximum number of processes used to aggregate the dataset (see
+        dash_app.parallel_aggregation_module.aggregate_in_parallel). Small datasets are always aggregated in a single
+        process. Default is None, which means the number of CPUs.
+    periods : list
+        The periods highlighted on graph 3 and summarized by date_range_summary. Each period is a tuple with its name,
+        its first date, the date after its last date and its color. Default is DEFAULT_PERIODS (before, during and
+        after the lockdown).
+    max_points : int
+        The maximum number of points of the revenue over time line (graph 3). Longer lines are downsampled with
+        dash_app.downsampling_module.largest_triangle_three_buckets. Default is DEFAULT_MAX_POINTS.
+    artefact_path : str
+        The path of an artefact file written by export_artefact (e.g., by dash_app.artefact_module.build_artefact). If
+        it was built from the current dataset file with the same options, the aggregated data and the figures are
+        read from it (through a memory map shared by every process that opens it) instead of being computed. Default is
+        None, which means the data is always computed.
 
     Attributes
     ----------
     __df_file : str
         The dataset path introduced when creating the class.
+    __date_frequency, __use_cache, __cache_dir, __streaming, __chunk_size, __aggregated_variables, __workers
+        The date frequency, cache, streaming and aggregation options introduced when creating the class.
     __df : pandas.core.frame.DataFrame
-        The dataframe obtained by reading the dataset file.
-    __genres_list : list
-        A list containing each individual genre on __df['Genres'].
-    __distributors_list : list
-        A list containing each distribution company on __df['Distributor'].
+        The dataframe obtained by reading the dataset file (or its cache file). It is None if streaming is True.
+    __columns : list
+        The columns of the prepared dataset.
+    __films : set
+        The titles of the films in the dataset (used to ignore repeated films).
+    __ingestion_report : dict
+        The number of rows and chunks, time and peak memory of the last time the dataset was streamed.
+    __construction_times : dict
+        The time (in seconds) it took to load the dataset (load) and to create the aggregated data (aggregate) when
+        the class was created, or to open the artefact (artefact). If the dataset is streamed, it is loaded while the
+        data is aggregated, so the streaming time is included in aggregate.
+    __accumulators : dict
+        The running statistics (dash_app.aggregation_module.CategoryAccumulator) of the aggregated variables for each
+        genre and each distribution company, keyed by column. New rows are added to them without processing the
+        previous rows again.
+    __date_accumulator : dash_app.aggregation_module.DateAccumulator
+        The running summation of the Revenue for each date (or week or month).
     __genres_df : pandas.core.frame.DataFrame
-        A dataframe containing information about each individual genre that appears on __genres_list.
+        A dataframe containing information about each individual genre that appears on __df['Genres'].
     __dist_df : pandas.core.frame.DataFrame
-        A dataframe containing information about each distribution company that appears on __distributors_list.
+        A dataframe containing information about each distribution company that appears on __df['Distributor'].
+    __date_df : pandas.core.frame.DataFrame
+        A dataframe containing the overall revenue of the films released on each date (or week or month, depending on
+        date_frequency).
+    __genre_index : dash_app.genre_index_module.GenreIndex
+        The bitmask index of the genres of each film, used to answer queries about combinations of genres.
+    __runtime_index : dash_app.runtime_index_module.RuntimeIndex
+        The sorted runtimes and cumulative revenue of the films, used to bin the films in any way (graph 2).
+    __daily_accumulator : dash_app.aggregation_module.DateAccumulator
+        The running summation of the Revenue for each day (regardless of date_frequency).
+    __date_index : dash_app.date_index_module.DateIndex
+        The cumulative revenue of each day, used to obtain the revenue of any range of dates.
+    __periods : list
+        The periods introduced when creating the class.
+    __max_points : int
+        The maximum number of points of the revenue over time line of fig10.
+    __artefact : dash_app.artefact_module.DashboardArtefact
+        The artefact the data was loaded from. It is None if the data was computed, or once it has been modified (e.g.,
+        by append_rows or reload).
+    __artefact_figures : set
+        The names of the figures of __artefact that are still up to date (they are served without being created).
     __preferred_genres : list
-        A list containing the preferred genres of the user. In this case, the preferred genres defined in persona.png
-        will be utilized.
-    __fig1, __fig2, __fig3, __fig4 : plotly.graph_objs._figure.Figure
-        Different options for the Mean Revenue vs Genre bar chart (i.e., graph 1).
-    __fig5, __fig6 : plotly.graph_objs._figure.Figure
-        Different options for the Overall Revenue vs Genre bar plot (i.e., graph 1).
-    __fig7, __fig8, __fig9 : plotly.graph_objs._figure.Figure
-        Different options for the Runtime histograms (i.e., graph 2).
-    __fig10 : plotly.graph_objs._figure.Figure
-        Revenue before, during and after lockdown Area plot (i.e., graph 3).
-    __fig11 : plotly.graph_objs._figure.Figure
-        Revenue by distribution company Treemap (i.e., graph 4).
-    __fig12, __fig13 : plotly.graph_objs._figure.Figure
-        Different options for the Distribution Company vs Mean Revenue bar plot (i.e., graph 4).
+        A list containing the default preferred genres, which are used for fig2, fig3 and fig6. In this case, the
+        preferred genres defined in persona.png will be utilized (users can choose their own on the dashboard).
+    __figure_builders : dict
+        The method that creates each group of figures, keyed by the names of the figures it returns. The figures are
+        only created the first time one of them is accessed:
+            fig1, fig2, fig3, fig4: different options for the Mean Revenue vs Genre bar chart (i.e., graph 1).
+            fig5, fig6: different options for the Overall Revenue vs Genre bar plot (i.e., graph 1).
+            fig7, fig8, fig9: different options for the Runtime histograms (i.e., graph 2).
+            fig10: Revenue before, during and after lockdown Area plot (i.e., graph 3).
+            fig11: Revenue by distribution company Treemap (i.e., graph 4).
+            fig12, fig13: different options for the Distribution Company vs Mean Revenue bar plot (i.e., graph 4).
+    __figures : dict
+        The figures (plotly.graph_objs._figure.Figure) that have already been created, keyed by their name.
+    __build_times : dict
+        The time (in seconds) it took to create each group of figures in __figures (the figures that are created by the
+        same method), keyed by the names of the figures joined with '+' (e.g., fig7+fig8+fig9).
+    __figures_lock : threading.RLock
+        Lock that prevents two threads from creating the same figures at the same time, and the data from being
+        modified while the figures are created.
+    __data_version : int
+        A number that is increased every time the data changes. It is part of the keys of __category_figure_cache, so
+        figures created from outdated data are never returned.
+    __category_figure_cache : functools._lru_cache_wrapper
+        The size-bounded LRU cache (with hit and miss counters) of the figures created by __build_category_figure.
 
     Methods
     -------
+    __artefact_metadata
+        Obtain the hash of the dataset file and the options that determine the content of an artefact.
+    __open_artefact
+        Open an artefact file, if it exists and matches the dataset file and the options.
+    __load_artefact
+        Load the aggregated data from __artefact.
+    __leave_artefact
+        Compute the aggregated data from the dataset file, so that it can be modified.
     __create_df
+        Load the dataframe, either from the cache or by reading the dataset file.
+    __read_dataset
         Read prepared_dataset.xlsx and convert to a dataframe.
-    __create_specialized_df
-        Generate a dataframe containing information (overall, mean, standard deviation and standard error) about each
-        element in a categorical column in __df (e.g., Genres, Distributors) with regards to different numerical
-        variables (e.g., Revenue, Rating).
-    --extract_sms
-        Create a list containing information (overall, mean and standard deviation) about each element in a categorical
-        column in __df (e.g., Genres, Distributors) with regards to different numerical variables (e.g., Revenue,
-        Rating).
-    __produce_color_lists
-        Produce a couple of lists comprised of the colors for the bars of a bar chart. One of the lists will be
-        monochromatic and the other will have a different color for the bars representing the preferred user genres.
+    __create_specialized_dfs
+        Create the accumulators from __df (or by streaming the dataset file) and generate __genres_df, __dist_df,
+        __date_df, __genre_index and __runtime_index.
+    __stream_dataset
+        Read the dataset file in chunks and add each chunk to the accumulators.
+    __add_to_specialized_dfs
+        Add new rows to the accumulators, __genre_index and __runtime_index.
+    __refresh_specialized_dfs
+        Generate __genres_df, __dist_df, __date_df and __date_index from the accumulators.
+    __produce_color_list
+        Produce the list of colors for the bars of a bar chart, in which the highlighted bars (e.g., the preferred user
+        genres) have a different color.
     __create_barchart
         Create a vertical bar chart figure for a specific set of data.
     __create_horizontal_barchart
@@ -67,167 +184,356 @@ class ChartCreator:
     __add_labels
         Add the labels and any other additional options to one or more figures.
     __create_graph1_figs_mean_revenue
-        Generate __fig1, __fig2, __fig3 and __fig4.
+        Generate fig1, fig2, fig3 and fig4.
     __create_graph1_figs_overall_revenue
-        Produce __fig5 and __fig6.
+        Produce fig5 and fig6.
+    __create_runtime_trace
+        Create the bar trace of a Runtime histogram from the binned films.
     __create_graph2_figs
-        Create __fig7, __fig8 and __fig9.
+        Create fig7, fig8 and fig9.
+    __downsample_dates
+        Select the dates of __date_df within a range, downsampled to a maximum number of points.
     __create_graph3_fig
-        Generate __fig10.
+        Generate fig10.
     __create_graph4_figs
-        Create __fig11, __fig12 and __fig13.
+        Create fig11, fig12 and fig13.
+    __build_category_figure
+        Create a bar chart of a revenue metric for each genre or distributor.
+    category_figure
+        Obtain a bar chart of a revenue metric for each genre or distributor, for any combination of highlighted
+        genres, error bars and sort order (the figures are stored in an LRU cache).
+    __get_figure
+        Obtain a figure, creating it (and the rest of the figures in its group) if it does not exist yet.
+    warm
+        Create all the figures that have not been created yet.
+    __invalidate
+        Remove the figures created from outdated data.
+    append_rows
+        Add new films to the dataset, updating the aggregated data in proportion to the number of new rows.
+    reload
+        Read the dataset file again and add the films that have been appended to it (without restarting the app).
+    export_artefact
+        Write the aggregated data and all the figures into an artefact file.
+    serialized_figure
+        Get the JSON bytes and ETag of a figure stored in the artefact the data was loaded from.
+    dataset_path
+        Getter method to obtain the path to the dataset file.
+    ingestion_report
+        Getter method to obtain the number of rows and chunks, time and peak memory of the last streaming ingestion.
+    build_times
+        Getter method to obtain the time it took to create each group of figures.
+    construction_times
+        Getter method to obtain the time it took to load the dataset and create the aggregated data.
+    figure_names
+        Getter method to obtain the names of all the figures.
+    figure_cache_info
+        Getter method to obtain the hits, misses and size of the category_figure cache.
+    genres, preferred_genres
+        Getter methods to obtain the genres in the dataset and the default preferred genres.
+    genre_index
+        Getter method to obtain the bitmask index of the genres of each film.
+    genre_combination_stats
+        Get the revenue statistics of the films that have (and do not have) a combination of genres.
+    runtime_histogram_trace
+        Get the bar trace of a Runtime histogram with any number of bins and range of runtimes.
+    runtime_range
+        Getter method to obtain the smallest and largest runtimes.
+    date_range_summary
+        Get the revenue of a range of dates, of each period within it and of the last and best 7 and 30 days.
+    date_range, periods
+        Getter methods to obtain the first and last release dates and the periods.
+    revenue_over_time_trace
+        Get the revenue over time line of any range of dates, downsampled to a maximum number of points.
+    max_points
+        Getter and setter methods for the maximum number of points of the revenue over time line of fig10.
     fig1, fig2, fig3, fig4, fig5, fig6, fig7, fig8, fig9, fig10, fig11, fig12, fig13
-        Getter methods to obtain the private figures.
+        Getter methods to obtain the figures (they are created on first access).
 
 
     """
 
-    def __init__(self, dataset_path):
+    def __init__(self, dataset_path, date_frequency='daily', use_cache=True, cache_dir=None, figure_cache_size=128,
+                 streaming=False, chunk_size=DEFAULT_CHUNK_SIZE, aggregated_variables=('Revenue',),
+                 workers=None, periods=DEFAULT_PERIODS, max_points=DEFAULT_MAX_POINTS, artefact_path=None):
         """Create an instance of the class"""
         self.__df_file = dataset_path
-        self.__df = self.__create_df()
-
-        # Get the each genre without repetition. As the Genres column contains lists, a list of lists must be converted
-        # to a simple list before using set()
-        self.__genres_list = list(set([genre for column_data in self.__df['Genres'] for genre in column_data]))
+        self.__use_cache = use_cache
+        self.__cache_dir = cache_dir
+        self.__date_frequency = date_frequency
+        self.__streaming = streaming
+        self.__chunk_size = chunk_size
+        self.__aggregated_variables = list(aggregated_variables)
+        self.__workers = workers
+        self.__periods = [tuple(period) for period in periods]
+        self.__max_points = max_points
+        self.__ingestion_report = {}
+        self.__artefact_figures = set()
+        start = time.perf_counter()
+        self.__artefact = self.__open_artefact(artefact_path)
+        if self.__artefact is None:
+            flat_columns = {}
+            self.__df = None if streaming else self.__create_df(flat_columns)
+            loaded = time.perf_counter()
+            self.__create_specialized_dfs(flat_columns)
+            self.__construction_times = {'load': loaded - start, 'aggregate': time.perf_counter() - loaded}
+        else:
+            self.__df = None
+            self.__load_artefact()
+            self.__construction_times = {'artefact': time.perf_counter() - start}
+        self.__preferred_genres = ['History', 'Romance', 'Action']  # Taken from persona.png
 
-        # Get a list of distributors without repetition
-        self.__distributors_list = list(set([element for element in self.__df['Distributor']]))
+        # The figures are not created here, but the first time they are accessed (or when warm() is called)
+        self.__figure_builders = {
+            ('fig1', 'fig2', 'fig3', 'fig4'): self.__create_graph1_figs_mean_revenue,
+            ('fig5', 'fig6'): self.__create_graph1_figs_overall_revenue,
+            ('fig7', 'fig8', 'fig9'): self.__create_graph2_figs,
+            ('fig10',): self.__create_graph3_fig,
+            ('fig11', 'fig12', 'fig13'): self.__create_graph4_figs
+        }
+        self.__figures = {}
+        self.__build_times = {}
+        self.__figures_lock = threading.RLock()
+        self.__data_version = 0
+        self.__category_figure_cache = functools.lru_cache(maxsize=figure_cache_size)(self.__build_category_figure)
+
+    def __artefact_metadata(self):
+        """
+        Obtain the hash of the dataset file and the options that determine the aggregated data and the figures. An
+        artefact is only used if its metadata is the same.
 
-        self.__genres_df = self.__create_specialized_df('Genres', self.__genres_list, ['Revenue'])
-        self.__dist_df = self.__create_specialized_df('Distributor', self.__distributors_list, ['Revenue'])
-        self.__preferred_genres = ['History', 'Romance', 'Action']  # Taken from persona.png
-        self.__fig1, self.__fig2, self.__fig3, self.__fig4 = self.__create_graph1_figs_mean_revenue()
-        self.__fig5, self.__fig6 = self.__create_graph1_figs_overall_revenue()
-        self.__fig7, self.__fig8, self.__fig9 = self.__create_graph2_figs()
-        self.__fig10 = self.__create_graph3_fig()
-        self.__fig11, self.__fig12, self.__fig13 = self.__create_graph4_figs()
+        Returns
+        -------
+        dict
+            The metadata (it can be serialized as JSON).
 
-    def __create_df(self):
-        """Create a pandas dataframe containing the information from prepared_dataset.xlsx"""
-        df = pd.read_excel(self.__df_file, engine='openpyxl')
-        df.drop(['Unnamed: 0'], axis=1, inplace=True)  # Drop the unnamed column that is generated when reading the file
-        df['Genres'] = df['Genres'].apply(eval)  # Convert the genres column to list (it is in string format initially)
-        df.drop_duplicates(subset=['Film'], inplace=True)
-        return df
+        """
+        options = {'date_frequency': self.__date_frequency, 'streaming': self.__streaming,
+                   'aggregated_variables': self.__aggregated_variables, 'periods': self.__periods,
+                   'max_points': self.__max_points}
+        dataset_hash = source_hash(self.__df_file, self.__cache_dir or default_cache_dir(self.__df_file))
+        return json.loads(json.dumps({'dataset_sha256': dataset_hash, 'options': options}))
 
-    def __create_specialized_df(self, column, column_elements, list_of_variables):
+    def __open_artefact(self, artefact_path):
         """
-        Produce a dataframe containing information (Overall, Mean, Standard deviation and Standard error) about each
-        element in a categorical column in __df (e.g., Genres, Distributors) with regards to different numerical
-        variables (e.g., Revenue, Rating).
+        Open an artefact file, if it exists and it was built from the current dataset file with the same options.
 
         Arguments
         ---------
-        column : str
-            The name of the categorical column whose information we want extracted.
-        column_elements : list
-            The individual categorical elements that appear in column.
-        list_of_variables : list
-            The names of the numerical columns we want the information (overall, mean, standard deviation and standard
-            error) to be calculated about (e.g., Revenue, Rating).
+        artefact_path : str
+            The path of the artefact file (or None).
 
         Returns
         -------
-        pandas.core.frame.DataFrame
-            The dataframe that was created.
+        dash_app.artefact_module.DashboardArtefact
+            The opened artefact, or None if it cannot be used (the data must then be computed).
 
         """
-        info = self.__extract_sms(column, column_elements, list_of_variables)
-        dataframe_columns = [column]  # Initialize the names of the columns that will appear on the dataframe
+        if not artefact_path or not os.path.exists(artefact_path):
+            return None
 
-        # Include the additional column names
-        for variable in list_of_variables:
-            dataframe_columns.extend([variable, f'Mean {variable}', f'SD {variable}'])
-        dataframe_columns.append('Number of Movies')
+        try:
+            artefact = DashboardArtefact(artefact_path)
+        except (OSError, ValueError) as error:
+            logger.warning('Unable to open the artefact %s: %s', artefact_path, error)
+            return None
 
-        specialized_df = pd.DataFrame(info, columns=dataframe_columns)  # Create the dataframe
+        stored_metadata = {key: artefact.metadata.get(key) for key in ('dataset_sha256', 'options')}
+        if stored_metadata != self.__artefact_metadata():
+            logger.info('The artefact %s is outdated, the data is computed again', artefact_path)
+            return None
 
-        # Include additional columns containing the Standard Error of the variables
-        # (the formula is SE = SD / sqrt(n of samples))
-        for variable in list_of_variables:
-            specialized_df[f'Standard Error ({variable})'] = specialized_df.apply(
-                lambda x: round(x[f'SD {variable}'] / math.sqrt(x['Number of Movies']), 2), axis=1)
+        logger.info('Loading the aggregated data and figures from the artefact %s', artefact_path)
+        return artefact
+
+    def __load_artefact(self):
+        """
+        Load the aggregated data from __artefact. The indexes are views of the memory map (they are not copied), and the
+        accumulators are not loaded (they are only needed to modify the data, see __leave_artefact).
+        """
+        artefact = self.__artefact
+        self.__columns = artefact.metadata['columns']
+        self.__films = set()
+        self.__genres_df = artefact.frame('genres_df')
+        self.__dist_df = artefact.frame('dist_df')
+        self.__date_df = artefact.frame('date_df')
+        self.__genre_index, self.__runtime_index, self.__date_index = (
+            index_class.from_arrays({name: artefact.array(f'{prefix}/{name}') for name in names})
+            for index_class, prefix, names in ((GenreIndex, 'genre_index', artefact.metadata['genre_index']),
+                                               (RuntimeIndex, 'runtime_index', artefact.metadata['runtime_index']),
+                                               (DateIndex, 'date_index', artefact.metadata['date_index'])))
+        self.__artefact_figures = set(artefact.figure_names)
+
+    def __leave_artefact(self):
+        """
+        If the data was loaded from __artefact, compute it from the dataset file instead (the artefact does not include
+        the accumulators, which are needed to modify the data). The figures of the artefact are still served until
+        __invalidate is called.
 
-        return specialized_df
+        Returns
+        -------
+        bool
+            Whether the data was loaded from the artefact.
 
-    def __extract_sms(self, column, column_elements, list_of_variables):
         """
-        Extract information (Summation, Mean and Standard deviation) about each element in a categorical column in __df
-        (e.g., Genres, Distributors) with regards to different numerical variables (e.g., Revenue, Rating). This method
-        will be used inside __create_specialized_df to extract the information that will be later introduced into a
-        dataframe.
+        if self.__artefact is None:
+            return False
+
+        self.__artefact = None
+        flat_columns = {}
+        self.__df = None if self.__streaming else self.__create_df(flat_columns)
+        self.__create_specialized_dfs(flat_columns)
+        return True
+
+    def __create_df(self, flat_columns=None):
+        """
+        Load the dataframe from the cache file of the dataset, or read the dataset file if caching is disabled.
 
         Arguments
         ---------
-        column : str
-            The name of the categorical column whose information we want extracted.
-        column_elements : list
-            The individual categorical elements that appear in column.
-        list_of_variables : list
-            The names of the numerical columns we want the information (overall, mean, standard deviation and standard
-            error) to be calculated about (e.g., Revenue, Rating).
+        flat_columns : dict
+            If given, the flattened values and offsets of the columns of strings and lists are stored in it when the
+            dataframe is read from an npz cache file (see dash_app.dataset_cache_module.read_cache_file). Default is
+            None.
 
         Returns
         -------
-        list
-            A list containing the extracted information.
+        pandas.core.frame.DataFrame
+            The prepared dataframe.
 
         """
-        output_list = []
-        for element in column_elements:  # Go through each element in the column
-            output_list.append([element])
-            for variable in list_of_variables:
-                values = []  # Initialize a list containing the values of the numerical column (for each column element)
+        if self.__use_cache:
+            return load_cached_dataset(self.__df_file, self.__read_dataset, self.__cache_dir, flat_columns)
+        return self.__read_dataset()
 
-                # Go through each row and append the numerical value if element appears in the row
-                for index, row in self.__df.iterrows():
-                    if element in row[column]:
-                        values.append(row[variable])
+    def __read_dataset(self):
+        """Create a pandas dataframe containing the information from prepared_dataset.xlsx"""
+        if os.path.splitext(self.__df_file)[1].lower() == '.csv':
+            return prepare_dataset(pd.read_csv(self.__df_file))
+        return prepare_dataset(pd.read_excel(self.__df_file, engine='openpyxl'))
 
-                output_list[-1].append(sum(values))  # Append the summation value
-                output_list[-1].append(sum(values) / len(values))  # Append the mean value
-                output_list[-1].append(np.std(values))  # Append the standard deviation value
+    def __create_specialized_dfs(self, flat_columns=None):
+        """
+        Create the accumulators of the Revenue (and the rest of aggregated variables) for each genre, distribution
+        company and date, either from __df or by streaming the dataset file, and generate the dataframes containing
+        information (overall, mean, standard deviation and standard error) about each of them (__genres_df, __dist_df
+        and __date_df), as well as the genre and runtime indexes.
 
-            output_list[-1].append(len(values))  # Append the number of movies that contained element
+        Arguments
+        ---------
+        flat_columns : dict
+            The flattened values and offsets of the columns of __df, as filled by __create_df. If they are available,
+            the genres and distributors are encoded by the worker processes. Default is None.
 
-        return output_list
+        """
+        self.__accumulators = {column: CategoryAccumulator(column, self.__aggregated_variables)
+                               for column in ('Genres', 'Distributor')}
+        self.__date_accumulator = DateAccumulator('Release Date', 'Revenue', self.__date_frequency)
+        self.__daily_accumulator = DateAccumulator('Release Date', 'Revenue', 'daily')
+        self.__genre_index = GenreIndex(pd.Series([], dtype=object), [])
+        self.__runtime_index = RuntimeIndex([], [])
+        self.__films = set()
+
+        if self.__streaming:
+            self.__stream_dataset()
+        else:
+            self.__columns = list(self.__df.columns)
+            self.__films.update(self.__df['Film'])
+            # The genres and distributors (the most expensive part) can be aggregated in several processes
+            jobs = [(column, self.__aggregated_variables) for column in self.__accumulators]
+            encodings = {}
+            for accumulator in aggregate_in_parallel(self.__df, jobs, self.__workers, flat_columns=flat_columns,
+                                                     encodings=encodings):
+                self.__accumulators[accumulator.column].merge(accumulator)
+            self.__add_to_specialized_dfs(self.__df, include_categories=False, genres_encoding=encodings['Genres'])
+        self.__refresh_specialized_dfs()
+
+    def __stream_dataset(self):
+        """
+        Read the dataset file in chunks and add each chunk to the accumulators, so that the whole dataset is never
+        loaded into memory. The number of rows and chunks, the time and the peak memory (measured with tracemalloc) are
+        stored in __ingestion_report.
+        """
+        already_tracing = tracemalloc.is_tracing()
+        if already_tracing:
+            tracemalloc.reset_peak()
+        else:
+            tracemalloc.start()
+
+        start = time.perf_counter()
+        rows = chunks = 0
+        self.__columns = None
+        try:
+            for chunk in stream_dataset(self.__df_file, self.__films, self.__chunk_size):
+                self.__columns = self.__columns or list(chunk.columns)
+                self.__add_to_specialized_dfs(chunk)
+                rows += len(chunk)
+                chunks += 1
+            peak_memory = tracemalloc.get_traced_memory()[1]
+        finally:
+            if not already_tracing:
+                tracemalloc.stop()
+
+        self.__ingestion_report = {'rows': rows, 'chunks': chunks, 'seconds': time.perf_counter() - start,
+                                   'peak_memory_bytes': peak_memory}
+        logger.info('Streamed %d films in %d chunks in %.3f s (peak memory %.1f MiB)', rows, chunks,
+                    self.__ingestion_report['seconds'], peak_memory / 2 ** 20)
+
+    def __add_to_specialized_dfs(self, new_rows, include_categories=True, genres_encoding=None):
+        """
+        Add new rows to the accumulators and the genre and runtime indexes. Only the new rows are processed (the
+        runtime index merges the sorted new rows with the sorted previous ones).
 
-    def __produce_color_lists(self, base_color, secondary_color):
+        Arguments
+        ---------
+        new_rows : pandas.core.frame.DataFrame
+            The rows that have been added to the dataset.
+        include_categories : bool
+            Whether the rows are added to the accumulators of the genres and distribution companies. Default is True.
+        genres_encoding : tuple
+            The rows, codes and genres of new_rows['Genres'] (as returned by
+            dash_app.aggregation_module.explode_category), if they have already been obtained. Default is None.
+
+        """
+        if include_categories:
+            for accumulator in self.__accumulators.values():
+                accumulator.update(new_rows)
+        self.__date_accumulator.update(new_rows)
+        self.__daily_accumulator.update(new_rows)
+        self.__genre_index.extend(new_rows['Genres'], new_rows['Revenue'], genres_encoding)
+        self.__runtime_index.extend(new_rows['Runtime'], new_rows['Revenue'])
+
+    def __refresh_specialized_dfs(self):
+        """Generate __genres_df, __dist_df, __date_df and __date_index from the accumulators"""
+        self.__genres_df = self.__accumulators['Genres'].to_frame()
+        self.__dist_df = self.__accumulators['Distributor'].to_frame()
+        self.__date_df = self.__date_accumulator.to_frame()
+        daily_df = self.__daily_accumulator.to_frame()
+        self.__date_index = DateIndex(daily_df['Release Date'], daily_df['Revenue'])
+
+    @staticmethod
+    def __produce_color_list(labels, highlighted, base_color, secondary_color):
         """
-        Create a couple of lists comprised of the colors for the bars of a bar chart. One of the lists will be
-        monochromatic and the other will have a different color for the bars representing the preferred user genres.
+        Create the list of colors for the bars of a bar chart, in which the bars representing the highlighted elements
+        (e.g., the preferred genres of the user) have a different color.
 
         Arguments
         ---------
+        labels : pandas.core.series.Series
+            The labels of the bars (e.g., the genres), in the order in which they are displayed.
+        highlighted : frozenset
+            The labels of the bars that will have the secondary color. If it is empty, the list will be monochromatic.
         base_color : str
             A string representing the base color for the bars.
         secondary_color : str
-            A string representing the color that will be used for the preferred genre bars.
+            A string representing the color that will be used for the highlighted bars.
 
         Returns
         -------
-        monochromatic_list : list
-            A list containing the base color for each of the bars.
-        pg_highlighted : list
-            A list containing the secondary colors for the preferred genres and the base colors for the rest.
+        list
+            A list containing the color of each bar.
 
         """
-        monochromatic_list = [base_color] * len(self.__genres_df.index)  # Base color for each genre
-        pg_highlighted = copy.copy(monochromatic_list)
-        genres_list = self.__genres_df['Genres'].tolist()
-
-        # Find the position of the bars that contain the preferred genres
-        preferred_genres_pos = []
-        for i in range(len(genres_list)):
-            if genres_list[i] in self.__preferred_genres:
-                preferred_genres_pos.append(i)
-
-        # Change the color of the preferred genres bars to the secondary color
-        for genre_pos, color in zip(preferred_genres_pos, pg_highlighted):
-            pg_highlighted[genre_pos] = secondary_color
-
-        return monochromatic_list, pg_highlighted
+        return [secondary_color if label in highlighted else base_color for label in labels]
 
     @staticmethod
     def __create_barchart(data_x, data_y, bar_colors, customdata, hovertemplate, error=None):
@@ -270,12 +576,17 @@ class ChartCreator:
 
         return fig
 
-    def __create_horizontal_barchart(self, error=None):
+    @staticmethod
+    def __create_horizontal_barchart(data_x, data_y, error=None):
         """
         Generate a horizontal bar plot to explain the Distributor vs Mean Revenue relationship.
 
         Arguments
         ---------
+        data_x : pandas.core.series.Series
+            Pandas column that contains the x data (e.g., Mean Revenue).
+        data_y : pandas.core.series.Series
+            Pandas column that contains the y data (e.g., Distributor).
         error : pandas.core.series.Series
             The dataframe column that contains the standard error information. It is none by default, which means the
             error bars are not included.
@@ -288,7 +599,7 @@ class ChartCreator:
         """
         fig = go.Figure(layout=go.Layout(bargap=0.3))
         fig.add_trace(go.Bar(
-            y=self.__dist_df['Distributor'], x=self.__dist_df['Mean Revenue'], marker_color='lightslategray',
+            y=data_y, x=data_x, marker_color='lightslategray',
             error_x=dict(type='data', array=error), orientation='h'))
         fig.update_xaxes(type='log')
         fig.update_yaxes(tickfont_size=9)
@@ -340,30 +651,11 @@ class ChartCreator:
             Mean Revenue vs Genre bar plot (monochromatic and error bars).
 
         """
-        self.__genres_df.sort_values(by=['Mean Revenue'], inplace=True)
-        monochromatic_list, pg_highlighted = self.__produce_color_lists('lightslategray', 'crimson')
-
-        # Introduce custom_df and hovertemplate (they will be used to define the hover value of the figures)
-        custom_df = np.stack((self.__genres_df['Mean Revenue'], self.__genres_df['Number of Movies']), axis=-1)
-        hovertemplate = 'Mean Revenue: %{customdata[0]:.0f} (USD) <br><b>Number of Movies: %{customdata[1]:.0f}'
-
-        # Create the four different figures
-        fig1 = self.__create_barchart(self.__genres_df['Genres'], self.__genres_df['Mean Revenue'],
-                                      monochromatic_list, custom_df, hovertemplate)
-        fig2 = self.__create_barchart(self.__genres_df['Genres'], self.__genres_df['Mean Revenue'],
-                                      pg_highlighted, custom_df, hovertemplate,
-                                      self.__genres_df['Standard Error (Revenue)'])
-        fig3 = self.__create_barchart(self.__genres_df['Genres'], self.__genres_df['Mean Revenue'],
-                                      pg_highlighted, custom_df, hovertemplate)
-        fig4 = self.__create_barchart(self.__genres_df['Genres'], self.__genres_df['Mean Revenue'],
-                                      monochromatic_list, custom_df, hovertemplate,
-                                      self.__genres_df['Standard Error (Revenue)'])
-
-        # Include the labels for the figures
-        titles = ['Average Revenue for Movies Containing Elements of Each Main Genre'] * 4
-        xlabels = [None] * 4
-        ylabels = ['Revenue ($)'] * 4
-        self.__add_labels([fig1, fig2, fig3, fig4], titles, xlabels, ylabels)
+        preferred_genres = self.__preferred_genres
+        fig1 = self.category_figure('Genres', 'Mean Revenue')
+        fig2 = self.category_figure('Genres', 'Mean Revenue', preferred_genres, error_bars=True)
+        fig3 = self.category_figure('Genres', 'Mean Revenue', preferred_genres)
+        fig4 = self.category_figure('Genres', 'Mean Revenue', error_bars=True)
 
         return fig1, fig2, fig3, fig4
 
@@ -379,30 +671,49 @@ class ChartCreator:
             Overall Revenue vs Genre bar plot (preferred genres highlighted).
 
         """
-        self.__genres_df.sort_values(by=['Revenue'], inplace=True)
-        monochromatic_list, pg_highlighted = self.__produce_color_lists('lightslategray', 'crimson')
+        fig5 = self.category_figure('Genres', 'Revenue')
+        fig6 = self.category_figure('Genres', 'Revenue', self.__preferred_genres)
 
-        # Introduce custom_df and hovertemplate (they will be used to define the hover value of the figures)
-        custom_df = np.stack((self.__genres_df['Revenue'], self.__genres_df['Number of Movies']), axis=-1)
-        hovertemplate = 'Overall Revenue: %{customdata[0]:.0f} (USD) <br><b>Number of Movies: %{customdata[1]:.0f}'
+        return fig5, fig6
 
-        # Create both figures
-        fig5 = self.__create_barchart(self.__genres_df['Genres'], self.__genres_df['Revenue'],
-                                      monochromatic_list, custom_df, hovertemplate)
-        fig6 = self.__create_barchart(self.__genres_df['Genres'], self.__genres_df['Revenue'],
-                                      pg_highlighted, custom_df, hovertemplate)
+    @staticmethod
+    def __create_runtime_trace(bins, column):
+        """
+        Create the bar trace of a Runtime histogram. It is a dictionary (rather than a plotly object), so that it can be
+        sent by a callback without being validated.
 
-        # Include the labels for the figures
-        titles = ['Overall Revenue for Movies Containing Elements of Each Main Genre'] * 2
-        xlabels = [None] * 2
-        ylabels = ['Revenue ($)'] * 2
-        self.__add_labels([fig5, fig6], titles, xlabels, ylabels)
+        Arguments
+        ---------
+        bins : pandas.core.frame.DataFrame
+            The binned films, as returned by dash_app.runtime_index_module.RuntimeIndex.bins.
+        column : str
+            The column of bins that is displayed: 'Revenue', 'Mean Revenue' or 'Number of Movies'.
 
-        return fig5, fig6
+        Returns
+        -------
+        dict
+            The bar trace.
+
+        """
+        hover_name = 'Overall Revenue' if column == 'Revenue' else column
+        starts, ends = bins['Runtime'].to_numpy(), bins['Runtime End'].to_numpy()
+        # The bars are slightly narrower than the bins to leave a space between them
+        return {
+            'type': 'bar',
+            'x': (starts + ends) / 2,
+            'y': bins[column].to_numpy(),
+            'width': (ends - starts) * 0.98,
+            'customdata': np.stack((starts, ends), axis=-1),
+            'marker': {'color': 'lightslategray'},
+            'hovertemplate': f'Runtime: %{{customdata[0]:.0f}}-%{{customdata[1]:.0f}} min<br>{hover_name}: %{{y}}',
+            'name': ''
+        }
 
     def __create_graph2_figs(self):
         """
-        Create the four figures that display the information about runtime.
+        Create the three figures that display the information about runtime. The films are binned on the server with the
+        runtime index (into DEFAULT_RUNTIME_BINS bins of equal width), so the figures only contain one bar per bin
+        instead of the Runtime and Revenue of every film.
 
         Returns
         -------
@@ -414,65 +725,76 @@ class ChartCreator:
             Count vs Runtime Histogram.
 
         """
-        # Create the figures
-        fig7 = px.histogram(self.__df, x='Runtime', y='Revenue', log_y=True, nbins=8,
-                            color_discrete_sequence=['lightslategray'], template='plotly_white')
-        fig8 = px.histogram(self.__df, x='Runtime', y='Revenue', histfunc='avg', log_y=True, nbins=8,
-                            color_discrete_sequence=['lightslategray'], template='plotly_white')
-        fig9 = px.histogram(self.__df, x='Runtime', nbins=8, color_discrete_sequence=['lightslategray'],
-                            template='plotly_white')
+        # The same bins as runtime_histogram_trace with the default number of bins and range
+        bins = self.__runtime_index.bins(DEFAULT_RUNTIME_BINS)
+
+        figures = []
+        for column in ('Revenue', 'Mean Revenue', 'Number of Movies'):
+            fig = go.Figure(data=[self.__create_runtime_trace(bins, column)])
+            fig.update_layout(template='plotly_white')
+            if column != 'Number of Movies':
+                fig.update_yaxes(type='log')
+            figures.append(fig)
 
-        # Include the labels. Spacing between the bars has been included
+        # Include the labels
         titles = ['Overall Revenue per Runtime', 'Mean Revenue per Runtime', 'Movies per Runtime']
         xlabels = ['Runtime (minutes)'] * 3
         ylabels = ['Revenue ($)', 'Revenue ($)', 'Number of Movies']
-        self.__add_labels([fig7, fig8, fig9], titles, xlabels, ylabels, {'bargap': 0.02})
+        self.__add_labels(figures, titles, xlabels, ylabels)
 
-        return fig7, fig8, fig9
+        return tuple(figures)
 
-    def __create_graph3_fig(self):
-        """Produce the Revenue vs Date Area plot figure"""
+    def __downsample_dates(self, start=None, end=None, max_points=None):
+        """
+        Select the dates of __date_df between start and end, along with the date before and after them (so the line
+        reaches the edges of the plot), and downsample them if there are more than max_points.
+
+        Arguments
+        ---------
+        start, end : str
+            The first and last dates of the range. Default is None, which means the first (or last) date.
+        max_points : int
+            The maximum number of dates. Default is None, which means __max_points.
 
-        # Get each date in the Release Date column of self.__df
-        dates = []
-        for index, row in self.__df.iterrows():
-            if row['Release Date'] not in dates:  # If the date has not already been included
-                dates.append(row['Release Date'])
+        Returns
+        -------
+        pandas.core.frame.DataFrame
+            The selected rows of __date_df (Release Date and Revenue).
 
-        # Get the summation of revenues of movies that came out on each date in dates
-        revenue = []
-        for date in dates:
-            revenue.append(sum([row['Revenue'] for index, row in self.__df.iterrows() if date == row['Release Date']]))
+        """
+        date_df = self.__date_df
+        dates = date_df['Release Date'].to_numpy(dtype='datetime64[ns]')
+        first = 0 if start is None else max(np.searchsorted(dates, pd.Timestamp(start).to_datetime64()) - 1, 0)
+        last = len(dates) if end is None else \
+            min(np.searchsorted(dates, pd.Timestamp(end).to_datetime64(), side='right') + 1, len(dates))
+        date_df = date_df.iloc[first:max(last, first)]
+
+        # The dates are converted into a number of days (since 1970), so the areas of the triangles can be calculated
+        days = (date_df['Release Date'].to_numpy(dtype='datetime64[ns]') - np.datetime64(0, 'ns')) / ONE_DAY
+        positions = largest_triangle_three_buckets(days, date_df['Revenue'].to_numpy(),
+                                                   max_points or self.__max_points)
+        return date_df.iloc[positions] if len(positions) < len(date_df) else date_df
 
-        # Define the figure
+    def __create_graph3_fig(self):
+        """Produce the Revenue vs Date Area plot figure"""
+        # Define the figure (the overall revenue per date has already been calculated in __date_df, and long lines are
+        # downsampled to __max_points). The dates are sent as days, so they are serialized without the time
+        dates = self.__downsample_dates()
         layout = go.Layout(template='plotly_white')
         fig10 = go.Figure(layout=layout)
         fig10.add_trace(
-            go.Scatter(x=dates, y=revenue, fill='tonexty'))
-
-        # Add a green region (pre-lockdown)
-        fig10.add_vrect(
-            x0="2018-01-01", x1="2020-03-15",
-            fillcolor="rgb(0,255,0)", opacity=0.2,
-            layer="below", line_width=0,
-            annotation_text='Pre-Lockdown', annotation_position='top left', annotation_font_color='grey'
-        )
-
-        # Add a red region (lockdown)
-        fig10.add_vrect(
-            x0="2020-03-15", x1="2020-07-15",
-            fillcolor="rgb(255,0,0)", opacity=0.2,
-            layer="below", line_width=0,
-            annotation_text='Lockdown', annotation_position='top left', annotation_font_color='grey'
-        ),
-
-        # Add a yellow region (post-lockdown)
-        fig10.add_vrect(
-            x0="2020-07-15", x1="2021-10-21",
-            fillcolor="rgb(255,153,0)", opacity=0.2,
-            layer="below", line_width=0,
-            annotation_text='Post-Lockdown', annotation_position='top right', annotation_font_color='grey'
-        )
+            go.Scatter(x=dates['Release Date'].to_numpy(dtype='datetime64[D]'), y=dates['Revenue'], fill='tonexty'))
+
+        # Add a region for each period (by default green for pre-lockdown, red for lockdown and yellow for
+        # post-lockdown). The annotation of the last period is placed on the right, so it does not go outside the plot
+        for position, (name, start, end, color) in enumerate(self.__periods):
+            fig10.add_vrect(
+                x0=start, x1=end,
+                fillcolor=color, opacity=0.2,
+                layer="below", line_width=0,
+                annotation_text=name, annotation_font_color='grey',
+                annotation_position='top right' if position == len(self.__periods) - 1 else 'top left'
+            )
 
         fig10.update_yaxes(range=[0, 2.9 * math.pow(10, 9)])  # Select the y range
 
@@ -503,79 +825,543 @@ class ChartCreator:
                            color_continuous_scale='RdBu',
                            color_continuous_midpoint=np.average(self.__dist_df['Number of Movies'],
                                                                 weights=self.__dist_df['Revenue']))
-        self.__dist_df.sort_values(by=['Mean Revenue'], inplace=True)  # Sort by ascending Mean Revenue
-        fig12 = self.__create_horizontal_barchart(self.__dist_df['Standard Error (Revenue)'])
-        fig13 = self.__create_horizontal_barchart()
-
-        # Include the labels
-        titles = ['Distributor Revenue', 'Mean Distributor Revenue', 'Mean Distributor Revenue']
-        xlabels = [None, 'Revenue ($)', 'Revenue ($)']
-        ylabels = [None] * 3
-        self.__add_labels([fig11, fig12, fig13], titles, xlabels, ylabels)
+        self.__add_labels([fig11], ['Distributor Revenue'], [None], [None])
+        fig12 = self.category_figure('Distributor', 'Mean Revenue', error_bars=True)
+        fig13 = self.category_figure('Distributor', 'Mean Revenue')
 
         return fig11, fig12, fig13
 
+    def __build_category_figure(self, column, metric, highlighted, error_bars, ascending, data_version):
+        """
+        Create a bar chart showing a revenue metric for each element of a categorical column. This method is only called
+        through __category_figure_cache (see category_figure), which stores the figures that have been created.
+
+        Arguments
+        ---------
+        column : str
+            The categorical column: 'Genres' (vertical bar chart) or 'Distributor' (horizontal bar chart).
+        metric : str
+            The column of __genres_df/__dist_df that is displayed: 'Mean Revenue' or 'Revenue' (overall revenue).
+        highlighted : frozenset
+            The genres whose bars are highlighted (only used when column is 'Genres').
+        error_bars : bool
+            Whether the standard error bars are included (only available for the Mean Revenue).
+        ascending : bool
+            Whether the bars are sorted by ascending (True) or descending (False) metric.
+        data_version : int
+            The version of the data the figure is created from. It is not used to create the figure, only as part of
+            the cache key.
+
+        Returns
+        -------
+        plotly.graph_objs._figure.Figure
+            The created figure.
+
+        """
+        data = self.__genres_df if column == 'Genres' else self.__dist_df
+        data = data.sort_values(by=[metric], ascending=ascending)  # Sorted copy, the aggregated data is not modified
+        error = data['Standard Error (Revenue)'] if error_bars else None
+        metric_name = 'Mean Revenue' if metric == 'Mean Revenue' else 'Overall Revenue'
+
+        if column == 'Distributor':
+            fig = self.__create_horizontal_barchart(data[metric], data['Distributor'], error)
+            title = 'Mean Distributor Revenue' if metric == 'Mean Revenue' else 'Distributor Revenue'
+            self.__add_labels([fig], [title], ['Revenue ($)'], [None])
+            return fig
+
+        # Introduce custom_df and hovertemplate (they will be used to define the hover value of the figures)
+        custom_df = np.stack((data[metric], data['Number of Movies']), axis=-1)
+        hovertemplate = f'{metric_name}: %{{customdata[0]:.0f}} (USD) <br><b>Number of Movies: %{{customdata[1]:.0f}}'
+        bar_colors = self.__produce_color_list(data['Genres'], highlighted, 'lightslategray', 'crimson')
+
+        fig = self.__create_barchart(data['Genres'], data[metric], bar_colors, custom_df, hovertemplate, error)
+        title = 'Average' if metric == 'Mean Revenue' else 'Overall'
+        self.__add_labels([fig], [f'{title} Revenue for Movies Containing Elements of Each Main Genre'], [None],
+                          ['Revenue ($)'])
+
+        return fig
+
+    def category_figure(self, column, metric, highlighted=(), error_bars=False, ascending=True):
+        """
+        Obtain a bar chart showing a revenue metric for each genre or distributor. The figure is created the first time
+        a combination of options is requested and stored in a size-bounded LRU cache (so it can be personalized, e.g.,
+        with the preferred genres of each user, without storing every combination).
+
+        Arguments
+        ---------
+        column : str
+            The categorical column: 'Genres' or 'Distributor'.
+        metric : str
+            The revenue metric: 'Mean Revenue' or 'Revenue' (overall revenue).
+        highlighted : list
+            The genres whose bars are highlighted (e.g., the preferred genres of the user). Default is an empty tuple.
+        error_bars : bool
+            Whether the standard error bars are included. They are only available for the Mean Revenue. Default is
+            False.
+        ascending : bool
+            Whether the bars are sorted by ascending metric. Default is True.
+
+        Returns
+        -------
+        plotly.graph_objs._figure.Figure
+            The requested figure. It is shared with other callers, so it must not be modified.
+
+        """
+        if column not in ('Genres', 'Distributor'):
+            raise ValueError(f"Unknown column '{column}'. Available options: Genres, Distributor")
+        if metric not in ('Mean Revenue', 'Revenue'):
+            raise ValueError(f"Unknown metric '{metric}'. Available options: Mean Revenue, Revenue")
+
+        # Normalize the options, so that equivalent requests share the same cache entry
+        highlighted = frozenset(highlighted or ()) if column == 'Genres' else frozenset()
+        error_bars = bool(error_bars) and metric == 'Mean Revenue'
+
+        return self.__category_figure_cache(column, metric, highlighted, error_bars, bool(ascending),
+                                            self.__data_version)
+
+    def __get_figure(self, name):
+        """
+        Obtain one of the figures. If the figure has not been created yet, the method that creates it is called, and
+        all the figures returned by that method are stored.
+
+        Arguments
+        ---------
+        name : str
+            The name of the figure (e.g., fig1).
+
+        Returns
+        -------
+        plotly.graph_objs._figure.Figure
+            The requested figure.
+
+        """
+        figure = self.__figures.get(name)  # The figure may be removed by another thread if the data changes
+        if figure is None:
+            with self.__figures_lock:
+                if name not in self.__figures and name in self.__artefact_figures:
+                    self.__figures[name] = pio.from_json(self.__artefact.figure_json(name), skip_invalid=True)
+                elif name not in self.__figures:  # Another thread may have created the figure while waiting
+                    names, builder = next((names, builder) for names, builder in self.__figure_builders.items()
+                                          if name in names)
+                    start = time.perf_counter()
+                    figures = builder()
+                    build_time = time.perf_counter() - start
+                    figures = figures if isinstance(figures, tuple) else (figures,)
+                    for figure_name, figure in zip(names, figures):
+                        self.__figures[figure_name] = figure
+                    self.__build_times['+'.join(names)] = build_time  # The time of the group, not of each figure
+                    logger.info('Created %s in %.3f s', ', '.join(names), build_time)
+                figure = self.__figures[name]
+
+        return figure
+
+    def warm(self):
+        """
+        Create all the figures that have not been created yet, so that later accesses do not have to wait for them.
+
+        Returns
+        -------
+        dict
+            The time (in seconds) it took to create each group of figures (see build_times).
+
+        """
+        for names in self.__figure_builders:
+            self.__get_figure(names[0])
+
+        return self.build_times
+
+    def __invalidate(self):
+        """
+        Remove the figures that have been created from the previous version of the data. They are created again (from
+        the current data) the next time they are accessed.
+
+        Returns
+        -------
+        list
+            The names of the figures that were removed.
+
+        """
+        invalidated = [name for name in self.figure_names if name in self.__figures or name in self.__artefact_figures]
+        self.__figures.clear()
+        self.__artefact_figures.clear()
+        self.__build_times.clear()
+        self.__data_version += 1
+        self.__category_figure_cache.cache_clear()  # Its entries can no longer be requested (old data version)
+
+        return invalidated
+
+    def append_rows(self, new_rows):
+        """
+        Add new films to the dataset. The aggregated data (__genres_df, __dist_df, __date_df and the genre index) is
+        updated by processing only the new rows, and the figures that had been created are removed so that they are
+        created again from the updated data.
+
+        Arguments
+        ---------
+        new_rows : pandas.core.frame.DataFrame
+            The rows of the new films, in the same format as the prepared dataset (Genres must contain lists). Films
+            that are already in the dataset (or repeated in new_rows) are ignored.
+
+        Returns
+        -------
+        list
+            The names of the figures that were removed (empty if no new films were added).
+
+        """
+        missing_columns = [column for column in self.__columns if column not in new_rows.columns]
+        if missing_columns:
+            raise ValueError(f"The new rows do not contain the columns: {', '.join(missing_columns)}")
+
+        new_rows = new_rows[self.__columns].copy()
+        new_rows['Film'] = new_rows['Film'].astype(str)
+        with self.__figures_lock:
+            left_artefact = self.__leave_artefact()
+            new_rows = new_rows[~new_rows['Film'].isin(self.__films)].drop_duplicates(subset=['Film'])
+            if not len(new_rows):
+                return self.__invalidate() if left_artefact else []
+
+            if self.__df is not None:
+                self.__df = pd.concat([self.__df, new_rows], ignore_index=True)
+            self.__films.update(new_rows['Film'])
+            self.__add_to_specialized_dfs(new_rows)
+            self.__refresh_specialized_dfs()
+            logger.info('Appended %d films to the dataset', len(new_rows))
+
+            return self.__invalidate()
+
+    def reload(self):
+        """
+        Read the dataset file again and update the data without restarting the app. If the rows that were already
+        loaded are unchanged (i.e., new films have only been appended to the file), only the new rows are processed.
+        Otherwise, all the aggregated data is created again. If streaming is True, the file is always streamed again. If
+        the data was loaded from an artefact, it is computed from the dataset file (and every figure is removed).
+
+        Returns
+        -------
+        list
+            The names of the figures that were removed (empty if the file contains no changes).
+
+        """
+        with self.__figures_lock:
+            if self.__leave_artefact():  # The data has just been computed from the current dataset file
+                return self.__invalidate()
+
+        if self.__streaming:
+            with self.__figures_lock:
+                self.__create_specialized_dfs()
+                return self.__invalidate()
+
+        flat_columns = {}
+        df = self.__create_df(flat_columns).reset_index(drop=True)
+        with self.__figures_lock:
+            loaded_df = self.__df.reset_index(drop=True)
+            if len(df) >= len(loaded_df) and df.iloc[:len(loaded_df)].equals(loaded_df):
+                return self.append_rows(df.iloc[len(loaded_df):])
+
+            logger.info('The dataset file has been modified, the aggregated data is created again')
+            self.__df = df
+            self.__create_specialized_dfs(flat_columns)
+
+            return self.__invalidate()
+
+    def export_artefact(self, artefact_path):
+        """
+        Create all the figures and write them (serialized), along with the aggregated data and the indexes, into an
+        artefact file. Other processes can then open it (see artefact_path) instead of computing the data and figures.
+
+        Arguments
+        ---------
+        artefact_path : str
+            The path of the artefact file.
+
+        """
+        with self.__figures_lock:
+            self.warm()
+            indexes = {'genre_index': self.__genre_index.to_arrays(), 'runtime_index': self.__runtime_index.to_arrays(),
+                       'date_index': self.__date_index.to_arrays()}
+            arrays = {f'{prefix}/{name}': array for prefix, index_arrays in indexes.items()
+                      for name, array in index_arrays.items()}
+            metadata = {**self.__artefact_metadata(), 'columns': self.__columns,
+                        **{prefix: list(index_arrays) for prefix, index_arrays in indexes.items()}}
+            frames = {'genres_df': self.__genres_df, 'dist_df': self.__dist_df, 'date_df': self.__date_df}
+            # The figures are serialized in the same way as in dash_app.figure_cache_module.FigureCache
+            figures = {name: pio.to_json(self.__get_figure(name), validate=False).encode()
+                       for name in self.figure_names}
+
+        write_artefact(artefact_path, metadata, arrays, frames, figures)
+        logger.info('Wrote the artefact %s', artefact_path)
+
+    def serialized_figure(self, name):
+        """
+        Get the JSON bytes and ETag of a figure stored in the artefact the data was loaded from.
+
+        Arguments
+        ---------
+        name : str
+            The name of the figure (e.g., fig1).
+
+        Returns
+        -------
+        tuple
+            The JSON bytes (read from the memory map) and the ETag of the figure, or None if the data was not loaded
+            from an artefact or the figure has changed since.
+
+        """
+        artefact = self.__artefact
+        if artefact is None or name not in self.__artefact_figures:
+            return None
+        return artefact.figure_json(name), artefact.etag(name)
+
+    @property
+    def dataset_path(self):
+        """Getter method to obtain the path to the dataset file"""
+        return self.__df_file
+
+    @property
+    def ingestion_report(self):
+        """Getter method to obtain the rows, chunks, time and peak memory of the last streaming ingestion"""
+        return dict(self.__ingestion_report)
+
+    @property
+    def construction_times(self):
+        """Getter method to obtain the time it took to load and aggregate the data (or read the artefact)"""
+        return dict(self.__construction_times)
+
+    @property
+    def build_times(self):
+        """
+        Getter method to obtain the time (in seconds) it took to create each group of figures created so far, keyed by
+        the names of the figures of the group joined with '+' (e.g., fig7+fig8+fig9). The figures of a group are created
+        by the same method, so the time of each figure is not known.
+        """
+        return dict(self.__build_times)
+
+    @property
+    def figure_names(self):
+        """Getter method to obtain the names of all the figures (e.g., fig1) that can be created"""
+        return tuple(name for names in self.__figure_builders for name in names)
+
+    @property
+    def figure_cache_info(self):
+        """Getter method to obtain the hits, misses, maximum size and current size of the category_figure cache"""
+        return self.__category_figure_cache.cache_info()._asdict()
+
+    @property
+    def genres(self):
+        """Getter method to obtain the (alphabetically sorted) genres that appear in the dataset"""
+        return sorted(self.__genres_df['Genres'])
+
+    @property
+    def preferred_genres(self):
+        """Getter method to obtain the default preferred genres"""
+        return list(self.__preferred_genres)
+
     @property
     def fig1(self):
-        """Getter method to obtain __fig1"""
-        return self.__fig1
+        """Getter method to obtain fig1"""
+        return self.__get_figure('fig1')
 
     @property
     def fig2(self):
-        """Getter method to obtain __fig2"""
-        return self.__fig2
+        """Getter method to obtain fig2"""
+        return self.__get_figure('fig2')
 
     @property
     def fig3(self):
-        """Getter method to obtain __fig3"""
-        return self.__fig3
+        """Getter method to obtain fig3"""
+        return self.__get_figure('fig3')
 
     @property
     def fig4(self):
-        """Getter method to obtain __fig4"""
-        return self.__fig4
+        """Getter method to obtain fig4"""
+        return self.__get_figure('fig4')
 
     @property
     def fig5(self):
-        """Getter method to obtain __fig5"""
-        return self.__fig5
+        """Getter method to obtain fig5"""
+        return self.__get_figure('fig5')
 
     @property
     def fig6(self):
-        """Getter method to obtain __fig6"""
-        return self.__fig6
+        """Getter method to obtain fig6"""
+        return self.__get_figure('fig6')
 
     @property
     def fig7(self):
-        """Getter method to obtain __fig7"""
-        return self.__fig7
+        """Getter method to obtain fig7"""
+        return self.__get_figure('fig7')
 
     @property
     def fig8(self):
-        """Getter method to obtain __fig8"""
-        return self.__fig8
+        """Getter method to obtain fig8"""
+        return self.__get_figure('fig8')
 
     @property
     def fig9(self):
-        """Getter method to obtain __fig9"""
-        return self.__fig9
+        """Getter method to obtain fig9"""
+        return self.__get_figure('fig9')
 
     @property
     def fig10(self):
-        """Getter method to obtain __fig10"""
-        return self.__fig10
+        """Getter method to obtain fig10"""
+        return self.__get_figure('fig10')
 
     @property
     def fig11(self):
-        """Getter method to obtain __fig11"""
-        return self.__fig11
+        """Getter method to obtain fig11"""
+        return self.__get_figure('fig11')
 
     @property
     def fig12(self):
-        """Getter method to obtain __fig12"""
-        return self.__fig12
+        """Getter method to obtain fig12"""
+        return self.__get_figure('fig12')
 
     @property
     def fig13(self):
-        """Getter method to obtain __fig13"""
-        return self.__fig13
+        """Getter method to obtain fig13"""
+        return self.__get_figure('fig13')
+
+    def runtime_histogram_trace(self, column, number_of_bins, runtime_range=None):
+        """
+        Get the bar trace of a Runtime histogram with any number of bins of equal width. The films are binned with the
+        runtime index, so the time it takes only depends (logarithmically) on the number of films.
+
+        Arguments
+        ---------
+        column : str
+            The value that is displayed for each bin: 'Revenue' (overall revenue), 'Mean Revenue' or 'Number of Movies'.
+        number_of_bins : int
+            The number of bins.
+        runtime_range : list
+            The smallest and largest runtimes that are binned. Default is None, which means all the films are binned.
+
+        Returns
+        -------
+        dict
+            The bar trace. It can be combined with the layout of fig7, fig8 or fig9.
+
+        """
+        if column not in ('Revenue', 'Mean Revenue', 'Number of Movies'):
+            raise ValueError(f"Unknown column '{column}'. Available options: Revenue, Mean Revenue, Number of Movies")
+
+        low, high = runtime_range if runtime_range else (None, None)
+        return self.__create_runtime_trace(self.__runtime_index.bins(number_of_bins, low, high), column)
+
+    @property
+    def runtime_range(self):
+        """Getter method to obtain the smallest and largest runtimes in the dataset"""
+        return self.__runtime_index.runtime_range
+
+    def date_range_summary(self, start=None, end=None):
+        """
+        Get the revenue of the films released between two dates, along with the revenue of each period within the
+        range and the rolling revenue of 7 and 30 days. Every value is obtained from the cumulative revenue of each day,
+        so it does not depend on the number of films.
+
+        Arguments
+        ---------
+        start, end : str
+            The first and last dates of the range (both included). Default is None, which means the first (or last)
+            release date.
+
+        Returns
+        -------
+        dict
+            The Revenue of the range, the revenue of each period within it (Periods, keyed by name) and, for 7 and 30
+            days (Rolling), the revenue of the window of days that ends on the last date of the range (Last) and the
+            highest revenue of any window of days that ends within the range (Highest, and the date it ends on, Highest
+            End). The windows may start before the range.
+
+        """
+        first_date, last_date = self.__date_index.date_range
+        if first_date is None:  # There are no films
+            return {'Revenue': 0.0, 'Periods': {name: 0.0 for name, *_ in self.__periods}, 'Rolling': {}}
+        start = self.__date_index.to_date(first_date if start is None else start)
+        end = self.__date_index.to_date(last_date if end is None else end)
+        after_end = end + ONE_DAY
+
+        periods = {}
+        for name, period_start, period_end, _ in self.__periods:
+            period_start, period_end = self.__date_index.to_date(period_start), self.__date_index.to_date(period_end)
+            periods[name] = self.__date_index.total(max(start, period_start), min(after_end, period_end))
+
+        rolling = {}
+        for days in (7, 30):
+            totals = self.__date_index.rolling_totals(days, start, end)
+            rolling[days] = {'Last': self.__date_index.total(after_end - days * ONE_DAY, after_end),
+                             'Highest': float(totals.max()) if len(totals) else 0.0,
+                             'Highest End': totals.idxmax() if len(totals) else None}
+
+        return {'Revenue': self.__date_index.total(start, after_end), 'Periods': periods, 'Rolling': rolling}
+
+    @property
+    def date_range(self):
+        """Getter method to obtain the first and last release dates"""
+        return self.__date_index.date_range
+
+    @property
+    def periods(self):
+        """Getter method to obtain the periods highlighted on graph 3"""
+        return list(self.__periods)
+
+    def revenue_over_time_trace(self, start=None, end=None, max_points=None):
+        """
+        Get the revenue over time line of a range of dates (e.g., the range the user has zoomed into on graph 3). As
+        the line is downsampled within the range, zooming in displays more detail without sending every date.
+
+        Arguments
+        ---------
+        start, end : str
+            The first and last dates of the range. Default is None, which means the first (or last) date.
+        max_points : int
+            The maximum number of points of the line. Default is None, which means the max_points of the class.
+
+        Returns
+        -------
+        dict
+            The scatter trace. It can be combined with the layout of fig10.
+
+        """
+        dates = self.__downsample_dates(start, end, max_points)
+        return {'type': 'scatter', 'x': dates['Release Date'].to_numpy(dtype='datetime64[D]'),
+                'y': dates['Revenue'].to_numpy(),
+                'fill': 'tonexty'}
+
+    @property
+    def max_points(self):
+        """Getter method to obtain the maximum number of points of the revenue over time line of fig10"""
+        return self.__max_points
+
+    @max_points.setter
+    def max_points(self, max_points):
+        """Setter method for the maximum number of points of the revenue over time line (fig10 is created again)"""
+        with self.__figures_lock:
+            self.__max_points = max_points
+            self.__artefact_figures.discard('fig10')
+            self.__figures.pop('fig10', None)
+            self.__build_times.pop('fig10', None)
+
+    @property
+    def genre_index(self):
+        """Getter method to obtain the bitmask index of the genres of each film"""
+        return self.__genre_index
+
+    def genre_combination_stats(self, include=(), exclude=()):
+        """
+        Get the revenue statistics of the films that contain all the genres in include and none of the genres in
+        exclude (e.g., films that are Action AND Romance but not Horror).
+
+        Arguments
+        ---------
+        include : list
+            The genres that the films must have. Default is an empty tuple (all the films).
+        exclude : list
+            The genres that the films must not have. Default is an empty tuple.
+
+        Returns
+        -------
+        dict
+            The Number of Movies, the (overall) Revenue and the Mean Revenue of the matching films.
+
+        """
+        return self.__genre_index.stats(include, exclude)
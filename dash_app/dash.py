@@ -1,17 +1,46 @@
+import hmac
+import logging
+import math
+import os
+import threading
+import time
 import dash
 from dash import html
 from dash import dcc
 import dash_bootstrap_components as dbc
-from dash.dependencies import Output, Input
-from dash_app.chart_creator_module import ChartCreator
-import collections
+from dash.dependencies import Output, Input, State
+from dash_app.artefact_module import default_artefact_path
+from dash_app.chart_creator_module import DEFAULT_RUNTIME_BINS, ChartCreator
+from dash_app.figure_cache_module import FigureCache
+from dash_app.warm_up_module import WarmUp
+from flask import request, abort, current_app, jsonify
+from flask_login import current_user
+from my_app import csrf, db
+from my_app.metrics import sampled_log
 from my_app.messaging.routes import check_if_unread
 
-cc = ChartCreator('../dash_app/prepared_dataset.xlsx')  # Generate all the charts
+DATASET_PATH = '../dash_app/prepared_dataset.xlsx'
+GRAPH_PAGE_PATHS = ('/dash_app/graph-page-1', '/dash_app/graph-page-2', '/dash_app/graph-page-3',
+                    '/dash_app/graph-page-4')
+# The charts are generated the first time they are displayed, unless they are read from the artefact of the dataset
+# (built with python -m dash_app.artefact_module), which is shared by all the worker processes. cc and fc are created
+# by the warm-up of init_dashboard (in a background thread if DASH_BACKGROUND_WARM_UP is enabled)
+cc = None
+fc = None  # The figures are serialized once and the callbacks return the serialized version
+warm_up = WarmUp()
+logger = logging.getLogger(__name__)
 
 
 def init_dashboard(flask_app):
-    """Initialize the flask app and the layout of the different pages within it"""
+    """
+    Initialize the flask app and the layout of the different pages within it. The dataset is loaded by a warm-up, which
+    runs in a background thread if DASH_BACKGROUND_WARM_UP is enabled (the graph pages display a "preparing" page until
+    it finishes), or before this function returns otherwise.
+    """
+    global warm_up
+    # If enabled, the figures of graph 1, 2 and 4 are switched in the browser (see init_clientside_figure_callbacks)
+    clientside_switching = flask_app.config.get('DASH_CLIENTSIDE_SWITCHING', False)
+
     dash_app = dash.Dash(server=flask_app,
                          routes_pathname_prefix="/dash_app/",
                          external_stylesheets=["../static/css/bootstrap.css"]
@@ -43,6 +72,114 @@ def init_dashboard(flask_app):
         ]),
     ])
 
+    # Depending on the dropdown option selected (type4_1 or type4_2) one of the rows within the graph 4 layout will be
+    # different. Hence, define both rows
+    type4_1_row = dbc.Row([dbc.Col([dcc.Graph(id='graph_4_treemap', style={'height': '75vh'})],
+                                   width={"size": 8, "offset": 2})], id='type4_1_layout')
+    type4_2_row = dbc.Row([
+        dbc.Col([
+            html.Div([html.Br()], style={'height': '30vh'}),
+            create_checklist_card('chck4', [{'label': 'Show Error Bars', 'value': 'SEB'}])
+        ], width={"size": 2, "offset": 1}),
+        dbc.Col([dcc.Graph(id='graph_4', style={'height': '75vh'})], width=8)
+    ], id='type4_2_layout')
+
+    # This is necessary because there are callbacks for elements that do not initially appear on the app
+    dash_app.config['suppress_callback_exceptions'] = True
+
+    # Define the layout of the app
+    dash_app.layout = html.Div([
+        dcc.Location(id='url', refresh=False),
+        html.Div(id='page-content', children=[main_page_layout])
+    ])
+
+    # The layouts of the graph pages contain data of the dataset (e.g., the genres), so they are created (and added to
+    # this dictionary) by the warm-up, once the dataset has been loaded
+    graph_layouts = {}
+    init_callbacks(dash_app, graph_layouts, main_page_layout)
+    if clientside_switching:
+        init_clientside_figure_callbacks(dash_app)
+    else:
+        init_figure_callbacks(dash_app, type4_1_row, type4_2_row)
+
+    # Route used to reload the dataset after new films are appended to it. It is authenticated with a token (instead of
+    # the session), so it is not protected by CSRFProtect
+    flask_app.add_url_rule('/dash_app/reload', 'dash_reload', csrf.exempt(serve_reload), methods=['POST'])
+
+    # Route that reports the progress of the warm-up (e.g., to a load balancer). It does not require a session
+    flask_app.add_url_rule('/ready', 'ready', serve_ready)
+
+    # The revenue over time line of graph 3 is downsampled to this number of points (also when the user zooms in)
+    max_points = flask_app.config.get('DASH_REVENUE_MAX_POINTS')
+    steps = [('Loading the dataset', lambda: create_chart_creator(max_points)),
+             ('Creating the page layouts',
+              lambda: graph_layouts.update(create_graph_layouts(clientside_switching, type4_1_row, type4_2_row)))]
+    watch_interval = flask_app.config.get('DATASET_WATCH_INTERVAL', 0)
+    if watch_interval:
+        steps.append(('Starting the dataset watcher', lambda: start_dataset_watcher(watch_interval)))
+
+    warm_up = WarmUp()
+    if flask_app.config.get('DASH_BACKGROUND_WARM_UP', False):
+        # The rest of the app is served while the dashboard is prepared. The figures are also created in advance, so
+        # that no user has to wait for them
+        steps.append(('Creating the figures', warm_figures))
+        warm_up.start(steps)
+    elif not warm_up.run(steps):
+        raise RuntimeError(f"The dashboard could not be prepared ({warm_up.status['error']})")
+
+    return dash_app
+
+
+def create_chart_creator(max_points=None):
+    """
+    Create the ChartCreator of the dataset (cc) and the FigureCache of its figures (fc), unless they have already been
+    created (e.g., by a previous app of the same process).
+
+    Arguments
+    ---------
+    max_points : int
+        The maximum number of points of the revenue over time line (graph 3). Default is None, which means the default
+        of ChartCreator is kept.
+
+    """
+    global cc, fc
+    if cc is None:
+        chart_creator = ChartCreator(DATASET_PATH, artefact_path=default_artefact_path(DATASET_PATH))
+        fc = FigureCache(chart_creator)
+        cc = chart_creator  # Assigned last, as the rest of the module checks cc to know whether the data is ready
+
+    if max_points and max_points != cc.max_points:
+        cc.max_points = max_points
+        fc.invalidate(['fig10'])
+
+
+def warm_figures():
+    """Create and serialize all the figures, so that they are ready before any user opens the graph pages"""
+    for name in cc.figure_names:
+        fc.figure(name)
+
+
+def create_graph_layouts(clientside_switching, type4_1_row, type4_2_row):
+    """
+    Create the layouts of the graph pages. They can only be created once the dataset has been loaded, as some of their
+    components contain data of the dataset (e.g., the genres of the dropdowns or the range of the sliders).
+
+    Arguments
+    ---------
+    clientside_switching : bool
+        Whether the figures of graph 1, 2 and 4 are switched in the browser.
+    type4_1_row : dash_bootstrap_components._components.Row.Row
+        The row of the graph 4 page displayed when the page is opened (type4_1).
+    type4_2_row : dash_bootstrap_components._components.Row.Row
+        The row of the graph 4 page displayed for type4_2. If the figures are switched in the browser, both rows are
+        included in the layout (the type4_2 row hidden), so the browser only has to show one and hide the other.
+
+    Returns
+    -------
+    dict
+        The layouts of the graph pages, keyed by their path.
+
+    """
     # Define the layout of the graph 1 page
     graph1_layout = html.Div([
         html.Header(className="container-fluid", children=[
@@ -66,12 +203,19 @@ def init_dashboard(flask_app):
         ]),
         dbc.Row([
             dbc.Col([
-                html.Div([html.Br()], style={'height': '25vh'}),
+                html.Div([html.Br()], style={'height': '15vh'}),
                 create_checklist_card('chck1', [{'label': 'Show Preferred Genres', 'value': 'SPG'},
-                                                {'label': 'Show Error Bars', 'value': 'SEB'}])
+                                                {'label': 'Show Error Bars', 'value': 'SEB'}]),
+                html.Br(),
+                create_preferred_genres_card()
             ], width={"size": 2, "offset": 1}),
-            dbc.Col([dcc.Graph(figure=cc.fig1, id='graph_1', style={'height': '75vh'})], width=8)
+            dbc.Col([dcc.Graph(id='graph_1', style={'height': '75vh'})], width=8)
+        ]),
+        dbc.Row([
+            dbc.Col([create_genre_filter_card()], width={"size": 8, "offset": 3})
         ]),
+        html.Br(),
+        html.Div(create_figure_store('graph_1_figures', clientside_switching)),
         dbc.Row([
             dbc.Col([dbc.Button("Go back to main page", color='primary', href='main-page')],
                     width={"size": 4, "offset": 8})
@@ -101,8 +245,13 @@ def init_dashboard(flask_app):
             ], width={"size": 6, "offset": 3})
         ]),
         dbc.Row([
-            dbc.Col([dcc.Graph(figure=cc.fig7, id='graph_2', style={'height': '75vh'})], width={"size": 8, "offset": 2})
+            dbc.Col([dcc.Graph(id='graph_2', style={'height': '75vh'})], width={"size": 8, "offset": 2})
+        ]),
+        dbc.Row([
+            dbc.Col([create_runtime_bins_card()], width={"size": 8, "offset": 2})
         ]),
+        html.Br(),
+        html.Div(create_figure_store('graph_2_figures', clientside_switching)),
         dbc.Row([
             dbc.Col([dbc.Button("Go back to main page", color='primary', href='main-page')],
                     width={"size": 4, "offset": 8})
@@ -119,25 +268,23 @@ def init_dashboard(flask_app):
         html.H1(children='How much are Top Movies Making?', style={'textAlign': 'center'}),
         html.Div(),
         dbc.Row([
-            dbc.Col([dcc.Graph(figure=cc.fig10, style={'height': '75vh'})], width={"size": 8, "offset": 2})
+            dbc.Col([create_date_range_picker()], width={"size": 6, "offset": 3}, style={'textAlign': 'center'})
         ]),
+        dbc.Row([
+            dbc.Col([dcc.Graph(id='graph_3', style={'height': '75vh'})], width={"size": 8, "offset": 2})
+        ]),
+        dbc.Row([
+            dbc.Col([create_date_summary_card()], width={"size": 8, "offset": 2})
+        ]),
+        html.Br(),
         dbc.Row([
             dbc.Col([dbc.Button("Go back to main page", color='primary', href='main-page')],
                     width={"size": 4, "offset": 8})
         ])
     ])
 
-    # Depending on the dropdown option selected (type4_1 or type4_2) one of the rows within the graph 4 layout will be
-    # different. Hence, define both rows
-    type4_1_row = dbc.Row([dbc.Col([dcc.Graph(figure=cc.fig11, style={'height': '75vh'})],
-                                   width={"size": 8, "offset": 2})], id='type4_1_layout')
-    type4_2_row = dbc.Row([
-        dbc.Col([
-            html.Div([html.Br()], style={'height': '30vh'}),
-            create_checklist_card('chck4', [{'label': 'Show Error Bars', 'value': 'SEB'}])
-        ], width={"size": 2, "offset": 1}),
-        dbc.Col([dcc.Graph(figure=cc.fig13, id='graph_4', style={'height': '75vh'})], width=8)
-    ], id='type4_2_layout')
+    # The graphs are left empty in the layouts. Their figures are provided by the callbacks when the graphs are
+    # displayed, so that the figures are only created (by cc) once a user opens the page that contains them
 
     # Define the layout of the graph 4 page
     graph4_layout = html.Div([
@@ -161,26 +308,143 @@ def init_dashboard(flask_app):
             ], width={"size": 6, "offset": 3})
         ]),
         # This is the row that will be modified depending on the value of the dropdown
-        dbc.Row(children=type4_1_row, id='modifiable_row'),
+        dbc.Row(children=[html.Div(type4_1_row, id='type4_1_container'),
+                          html.Div(type4_2_row, id='type4_2_container', style={'display': 'none'})]
+                if clientside_switching else type4_1_row, id='modifiable_row'),
+        html.Div(create_figure_store('graph_4_figures', clientside_switching)),
         dbc.Row([
             dbc.Col([dbc.Button("Go back to main page", color='primary', href='main-page')],
                     width={"size": 4, "offset": 8})
         ])
     ])
 
-    # This is necessary because there are callbacks for elements that do not initially appear on the app
-    dash_app.config['suppress_callback_exceptions'] = True
+    return dict(zip(GRAPH_PAGE_PATHS, [graph1_layout, graph2_layout, graph3_layout, graph4_layout]))
 
-    # Define the layout of the app
-    dash_app.layout = html.Div([
-        dcc.Location(id='url', refresh=False),
-        html.Div(id='page-content', children=[main_page_layout])
-    ])
 
-    init_callbacks(dash_app, graph1_layout, graph2_layout, graph3_layout, graph4_layout, type4_1_row, type4_2_row,
-                   main_page_layout)
+def reload_dataset():
+    """
+    Read the dataset file again and remove the serialized versions of the figures that have changed.
 
-    return dash_app
+    Returns
+    -------
+    list
+        The names of the figures that were removed.
+
+    """
+    invalidated = cc.reload()
+    fc.invalidate(invalidated)
+    return invalidated
+
+
+def serve_reload():
+    """
+    Reload the dataset (e.g., after the weekly box office rows have been appended to it). The request must include the
+    DATASET_RELOAD_TOKEN of the app configuration as a bearer token. If no token is configured, the route is disabled.
+
+    Returns
+    -------
+    flask.wrappers.Response
+        A JSON response containing the names of the figures that were removed.
+
+    """
+    token = current_app.config.get('DATASET_RELOAD_TOKEN')
+    if not token:
+        abort(404)
+    if not hmac.compare_digest(request.headers.get('Authorization', '').encode(), f'Bearer {token}'.encode()):
+        abort(403)
+    if not warm_up.ready:
+        abort(503)  # The dataset has not been loaded yet, so it is read (with the new films) by the warm-up anyway
+
+    invalidated = reload_dataset()
+    return jsonify({'invalidated': invalidated})
+
+
+def serve_ready():
+    """
+    Report the progress of the warm-up of the dashboard (e.g., to the health checks of a load balancer). The rest of
+    the app is served during the warm-up, but the graph pages only display a "preparing" page until it finishes.
+
+    Returns
+    -------
+    flask.wrappers.Response
+        A JSON response containing the state and progress of the warm-up. The status is 200 once the dashboard is ready
+        and 503 otherwise (also if the warm-up has failed).
+
+    """
+    status = warm_up.status
+    response = jsonify(status)
+    response.status_code = 200 if status['state'] == 'ready' else 503
+    response.cache_control.no_store = True
+    return response
+
+
+def start_dataset_watcher(interval):
+    """
+    Start a background thread that checks the modification time and size of the dataset file periodically and reloads
+    the dataset when they change.
+
+    Arguments
+    ---------
+    interval : float
+        The number of seconds between two checks.
+
+    Returns
+    -------
+    threading.Thread
+        The thread that was started.
+
+    """
+    def watch():
+        stat = os.stat(cc.dataset_path)
+        last_seen = (stat.st_mtime_ns, stat.st_size)
+        while True:
+            time.sleep(interval)
+            try:
+                stat = os.stat(cc.dataset_path)
+                if (stat.st_mtime_ns, stat.st_size) != last_seen:
+                    reload_dataset()
+                    # Only updated after a successful reload, so a file that was read while being written is read again
+                    last_seen = (stat.st_mtime_ns, stat.st_size)
+            except Exception:  # The thread must keep running (e.g., the file is being replaced)
+                logger.exception('Unable to reload the dataset %s', cc.dataset_path)
+
+    watcher = threading.Thread(target=watch, name='dataset-watcher', daemon=True)
+    watcher.start()
+    return watcher
+
+
+def create_preparing_layout():
+    """
+    Create the page displayed instead of a graph page while the dashboard is being prepared. It polls the progress of
+    the warm-up (see update_warm_up_progress) and is replaced by the graph page once the warm-up finishes.
+
+    Returns
+    -------
+    dash.html.Div.Div
+        The layout of the page.
+
+    """
+    return html.Div([
+        html.Header(className="container-fluid", children=[
+            html.Br(),
+            include_navbar(),
+        ]),
+        html.Br(),
+        html.H1(children='Preparing the Dashboard', style={'textAlign': 'center'}),
+        dbc.Row([
+            dbc.Col([
+                html.P('The data of the charts is being loaded. The page will be displayed as soon as it is ready.',
+                       style={'textAlign': 'center'}),
+                dbc.Progress(id='warm_up_progress', value=0, striped=True, animated=True)
+            ], width={"size": 6, "offset": 3})
+        ]),
+        dcc.Interval(id='warm_up_interval', interval=1000),
+        html.Br(),
+        dbc.Row([
+            dbc.Col([dbc.Button("Go back to main page", color='primary', href='main-page')],
+                    width={"size": 4, "offset": 8})
+        ])
+    ])
 
 
 def create_graph_card(image_source, description, question, button_url):
@@ -253,6 +517,212 @@ def create_checklist_card(checklist_id, checklist_options):
     return card
 
 
+def create_preferred_genres_card():
+    """
+    Create a card containing a dropdown in which users can choose their preferred genres (the genres highlighted by the
+    Show Preferred Genres option of graph 1).
+
+    Returns
+    -------
+    dash_bootstrap_components._components.Card.Card
+        The created card.
+
+    """
+    card = dbc.Card(className="bg-dark text-light", children=[
+        dbc.CardBody([
+            html.H4('Preferred Genres', className="card-title"),
+            # The value is set to the user's preferred genres by the load_preferred_genres callback
+            dcc.Dropdown(id='preferred_genres', options=cc.genres, multi=True, className='text-dark'),
+            html.Small(id='preferred_genres_status')
+        ])
+    ])
+
+    return card
+
+
+def create_genre_filter_card():
+    """
+    Create a card in which users can choose a combination of genres (genres that the films must and must not have) and
+    see the revenue statistics of the films that match it.
+
+    Returns
+    -------
+    dash_bootstrap_components._components.Card.Card
+        The created card.
+
+    """
+    card = dbc.Card(children=[
+        dbc.CardBody([
+            html.H4('Filter by Genre Combination', className="card-title"),
+            dbc.Row([
+                dbc.Col([
+                    html.Label('Films that are'),
+                    dcc.Dropdown(id='include_genres', options=cc.genres, multi=True)
+                ]),
+                dbc.Col([
+                    html.Label('But not'),
+                    dcc.Dropdown(id='exclude_genres', options=cc.genres, multi=True)
+                ])
+            ]),
+            html.Br(),
+            html.P(id='genre_combination_stats', className="card-text")
+        ])
+    ])
+
+    return card
+
+
+def create_runtime_bins_card():
+    """
+    Create a card containing the sliders used to choose the number of bins and the range of runtimes of graph 2.
+
+    Returns
+    -------
+    dash_bootstrap_components._components.Card.Card
+        The created card.
+
+    """
+    low, high = get_runtime_slider_range()
+    card = dbc.Card(children=[
+        dbc.CardBody([
+            html.Label('Number of bins'),
+            dcc.Slider(id='runtime_bins', min=2, max=50, step=1, value=DEFAULT_RUNTIME_BINS,
+                       marks={number: str(number) for number in [2, 10, 20, 30, 40, 50]}),
+            html.Label('Runtime (minutes)'),
+            dcc.RangeSlider(id='runtime_range', min=low, max=high, step=1, value=[low, high],
+                            tooltip={'placement': 'bottom'})
+        ])
+    ])
+
+    return card
+
+
+def get_runtime_slider_range():
+    """Get the smallest and largest values of the runtime range slider (the runtimes of the films, rounded)."""
+    low, high = cc.runtime_range
+    return math.floor(low), math.ceil(high)
+
+
+def create_runtime_histogram(name, number_of_bins, runtime_range):
+    """
+    Create a runtime histogram (fig7, fig8 or fig9) with the number of bins and range of runtimes chosen with the
+    sliders of graph 2. If the default options are chosen, the cached figure is returned. Otherwise, the films are
+    binned again (without going through them) and the layout of the cached figure is reused, so no figure needs to be
+    validated or serialized by plotly.
+
+    Arguments
+    ---------
+    name : str
+        The name of the figure: fig7 (Overall Revenue), fig8 (Mean Revenue) or fig9 (Number of Movies).
+    number_of_bins : int
+        The number of bins selected on the runtime_bins slider.
+    runtime_range : list
+        The range of runtimes selected on the runtime_range slider.
+
+    Returns
+    -------
+    dict
+        The figure.
+
+    """
+    full_range = not runtime_range or tuple(runtime_range) == get_runtime_slider_range()
+    if number_of_bins in (None, DEFAULT_RUNTIME_BINS) and full_range:
+        return fc.figure(name)
+
+    column = {'fig7': 'Revenue', 'fig8': 'Mean Revenue', 'fig9': 'Number of Movies'}[name]
+    trace = cc.runtime_histogram_trace(column, number_of_bins or DEFAULT_RUNTIME_BINS, runtime_range)
+    return {'data': [trace], 'layout': fc.figure(name)['layout']}
+
+
+def create_date_range_picker():
+    """
+    Create the date picker used to choose the range of release dates displayed on graph 3. Initially, every release
+    date is selected.
+
+    Returns
+    -------
+    dash.dcc.DatePickerRange.DatePickerRange
+        The created date picker.
+
+    """
+    first_date, last_date = get_date_picker_range()
+    return dcc.DatePickerRange(id='date_range', min_date_allowed=first_date, max_date_allowed=last_date,
+                               start_date=first_date, end_date=last_date, display_format='YYYY-MM-DD')
+
+
+def get_date_picker_range():
+    """Get the first and last dates of the date picker (the first and last release dates, as YYYY-MM-DD strings)."""
+    return tuple(f'{date:%Y-%m-%d}' if date is not None else None for date in cc.date_range)
+
+
+def get_zoomed_range(relayout_data):
+    """
+    Get the range of the x axis from the relayoutData of a graph.
+
+    Arguments
+    ---------
+    relayout_data : dict
+        The relayoutData of the graph.
+
+    Returns
+    -------
+    list
+        The first and last values of the x axis, or None if relayout_data does not include them.
+
+    """
+    relayout_data = relayout_data or {}
+    if 'xaxis.range[0]' in relayout_data and 'xaxis.range[1]' in relayout_data:
+        return [relayout_data['xaxis.range[0]'], relayout_data['xaxis.range[1]']]
+
+    return relayout_data.get('xaxis.range')
+
+
+def create_date_summary_card():
+    """
+    Create the card that displays the revenue of the range of dates selected on graph 3 (its content is provided by the
+    summarize_date_range callback).
+
+    Returns
+    -------
+    dash_bootstrap_components._components.Card.Card
+        The created card.
+
+    """
+    card = dbc.Card(children=[
+        dbc.CardBody([
+            html.H4('Revenue in the Selected Dates', className="card-title"),
+            html.Div(id='date_range_summary', className="card-text")
+        ])
+    ])
+
+    return card
+
+
+def get_user_preferred_genres():
+    """Get the preferred genres of the current user, or the default preferred genres if the user has not chosen any."""
+    return current_user.get_preferred_genres() or cc.preferred_genres
+
+
+def create_figure_store(store_id, clientside_switching):
+    """
+    Create the dcc.Store that will contain the figure variants of a graph when the figures are switched in the browser.
+
+    Arguments
+    ---------
+    store_id : str
+        The id of the store.
+    clientside_switching : bool
+        Whether the figures are switched in the browser. If they are not, the store is not needed.
+
+    Returns
+    -------
+    list
+        A list containing the store, or an empty list if the store is not needed.
+
+    """
+    return [dcc.Store(id=store_id)] if clientside_switching else []
+
+
 def include_navbar():
     """Create the navigation bar that will integrate both the flask and the dash apps."""
     navbar = html.Nav(className="navbar navbar-expand-lg navbar-dark bg-primary", children=[
@@ -279,24 +749,13 @@ def include_navbar():
     return navbar
 
 
-def init_callbacks(dash_app, graph1_layout, graph2_layout, graph3_layout, graph4_layout, type4_1_row, type4_2_row,
-                   main_page_layout):
+def init_callbacks(dash_app, graph_layouts, main_page_layout):
     """
     Define a series of callbacks that will allow the user to interact with the dash_app.
     dash_app : dash.dash.Dash
         The created Dash app.
-    graph1_layout : dash.html.Div.Div
-        The defined layout for the graph 1 page.
-    graph2_layout : dash.html.Div.Div
-        The defined layout for the graph 2 page.
-    graph3_layout : dash.html.Div.Div
-        The defined layout for the graph 3 page.
-    graph4_layout : dash.html.Div.Div
-        The defined layout for the graph 4 page.
-    type4_1_row : dash_bootstrap_components._components.Row.Row
-        The row defined for checklist type4_1 value.
-    type4_2_row : dash_bootstrap_components._components.Row.Row
-        The row define for checklist type4_2 value.
+    graph_layouts : dict
+        The defined layouts for the graph pages, keyed by their path. It is empty until the warm-up creates them.
     main_page_layout : dash.html.Div.Div
         The defined layout for the main page.
 
@@ -319,94 +778,242 @@ def init_callbacks(dash_app, graph1_layout, graph2_layout, graph3_layout, graph4
             The layout of the page that will be displayed.
 
         """
-        print("I am here hahaha")
-        if pathname == '/dash_app/graph-page-1':
-            return graph1_layout
+        sampled_log(logger, 'dash_navigation', current_app.config.get('DASH_NAVIGATION_LOG_SAMPLE_RATE', 0.1),
+                    pathname=pathname, authenticated=current_user.is_authenticated)
+        if pathname not in GRAPH_PAGE_PATHS:
+            return main_page_layout
 
-        if pathname == '/dash_app/graph-page-2':
-            return graph2_layout
+        if not warm_up.ready:
+            return create_preparing_layout()
 
-        if pathname == '/dash_app/graph-page-3':
-            return graph3_layout
+        return graph_layouts[pathname]
 
-        if pathname == '/dash_app/graph-page-4':
-            return graph4_layout
+    @dash_app.callback([Output('page-content', 'children', allow_duplicate=True),
+                        Output('warm_up_progress', 'value'),
+                        Output('warm_up_progress', 'label')],
+                       Input('warm_up_interval', 'n_intervals'),
+                       State('url', 'pathname'),
+                       prevent_initial_call=True)
+    def update_warm_up_progress(n_intervals, pathname):
+        """
+        Update the progress bar of the "preparing" page, and display the graph page once the warm-up has finished.
 
-        else:
-            return main_page_layout
+        Arguments
+        ---------
+        n_intervals : int
+            The number of times the progress has been checked (this value will not be used).
+        pathname : str
+            The path to the graph page the user is trying to open.
+
+        Returns
+        -------
+        tuple
+            The layout of the graph page (or dash.no_update if the warm-up has not finished), and the value and label
+            of the progress bar.
 
-    @dash_app.callback(Output('graph_1', 'figure'),
-                       Input('dropdown1', 'value'),
-                       Input('chck1', 'value'))
-    def modify_graph_1(dropdown_value, selected_chart_options):
         """
-        Change graph_1 depending on the dropdown1 and chck1 options selected.
+        status = warm_up.status
+        if status['state'] == 'ready':
+            return graph_layouts.get(pathname, main_page_layout), 100, ''
+
+        if status['state'] == 'failed':
+            return dash.no_update, 100, 'The dashboard could not be prepared'
+
+        return dash.no_update, round(100 * status['progress']), status['current_step'] or ''
+
+    @dash_app.callback(Output('graph_3', 'figure'),
+                       [Input('url', 'pathname'),
+                        Input('date_range', 'start_date'),
+                        Input('date_range', 'end_date'),
+                        Input('graph_3', 'relayoutData')])
+    def display_graph_3(pathname, start_date, end_date, relayout_data):
+        """
+        Display graph_3 when the graph 3 page is opened, showing the range of dates selected on the date picker or the
+        range the user has zoomed into. The line is downsampled within the displayed range, so zooming in shows more
+        detail.
 
         Arguments
         ---------
-        dropdown_value : str
-            The selected dropdown value. Available options: Mean Revenue, Overall Revenue.
-        selected_chart_options : str
-            The selected checklist value. Available options: Show Preferred Genres, Show Error Bars (when Mean Revenue
-            is chosen) and Show Error Bars (when Overall Genre Revenue is chosen).
+        pathname : str
+            The dash_app path the user is currently located at (this value will not be used).
+        start_date, end_date : str
+            The first and last dates selected on the date picker.
+        relayout_data : dict
+            The changes of the layout of graph_3 made by the user (e.g., zooming, panning or resetting the axes).
 
         Returns
         -------
-        plotly.graph_objs._figure.Figure
-            The figure that corresponds to the chosen dropdown1 and chck1 options.
+        dict
+            The serialized Revenue vs Date figure. If only some of the dates are displayed, the x axis of the figure is
+            limited to them (the layout of the cached figure is reused, so no figure needs to be validated or
+            serialized by plotly).
 
         """
-        # If selected_chart_options is None, convert to an empty list to avoid exception 'NoneType' is not iterable
-        if selected_chart_options is None:
-            selected_chart_options = []
+        x_range = None
+        if dash.callback_context.triggered_id == 'graph_3':
+            x_range = get_zoomed_range(relayout_data)
+            if x_range is None and not (relayout_data or {}).get('xaxis.autorange'):
+                return dash.no_update  # The x axis has not changed (e.g., only the y axis was zoomed)
+
+        figure = fc.figure('fig10')
+        if x_range is None:  # The axes were reset or the date picker was used
+            if not start_date or not end_date or (start_date[:10], end_date[:10]) == get_date_picker_range():
+                return figure
+            x_range = [start_date, end_date]
+
+        layout = dict(figure['layout'])
+        layout['xaxis'] = {**layout.get('xaxis', {}), 'range': x_range, 'autorange': False}
+        return {'data': [cc.revenue_over_time_trace(*x_range)], 'layout': layout}
+
+    @dash_app.callback(Output('date_range_summary', 'children'),
+                       [Input('date_range', 'start_date'),
+                        Input('date_range', 'end_date')])
+    def summarize_date_range(start_date, end_date):
+        """
+        Display the revenue of the range of dates selected on the date picker, of each period within it (e.g., the
+        lockdown) and of the best and last 7 and 30 days.
 
-        # User has chosen Overall Revenue and Show Preferred Genres is not selected
-        if dropdown_value == 'type1_2' and 'SPG' not in selected_chart_options:
-            return cc.fig5
+        Arguments
+        ---------
+        start_date, end_date : str
+            The first and last dates selected on the date picker.
 
-        # User has chosen Overall Revenue and Show Preferred Genres
-        elif dropdown_value == 'type1_2':
-            return cc.fig6
+        Returns
+        -------
+        list
+            The paragraphs containing the summary.
 
-        # User has chosen Mean Revenue and Show Preferred Genres
-        elif dropdown_value == 'type1_1' and selected_chart_options == ['SPG']:
-            return cc.fig3
+        """
+        summary = cc.date_range_summary(start_date, end_date)
+        periods = ' | '.join(f'{name}: {revenue:,.0f} (USD)' for name, revenue in summary['Periods'].items())
+        children = [html.P(f"Overall Revenue: {summary['Revenue']:,.0f} (USD)"), html.P(periods)]
+        for days, rolling in summary['Rolling'].items():
+            best = (f" | Best {days} days: {rolling['Highest']:,.0f} (USD), up to {rolling['Highest End']:%Y-%m-%d}"
+                    if rolling['Highest End'] is not None else '')
+            children.append(html.P(f"Last {days} days: {rolling['Last']:,.0f} (USD){best}"))
 
-        # User has chosen Mean Revenue and Show Error Bars
-        elif dropdown_value == 'type1_1' and selected_chart_options == ['SEB']:
-            return cc.fig4
+        return children
 
-        # User has chosen Mean Revenue, Show Error Bars and Show Preferred Genres
-        elif dropdown_value == 'type1_1' and collections.Counter(selected_chart_options) == collections.Counter(
-                ['SEB', 'SPG']):
-            return cc.fig2
+    @dash_app.callback(Output('preferred_genres', 'value'),
+                       Input('url', 'pathname'))
+    def load_preferred_genres(pathname):
+        """
+        Display the preferred genres of the current user when the graph 1 page is opened.
 
-        else:  # User has chosen Mean Revenue and no additional checklist options
-            return cc.fig1
+        Arguments
+        ---------
+        pathname : str
+            The dash_app path the user is currently located at (this value will not be used).
+
+        Returns
+        -------
+        list
+            The preferred genres of the user.
 
-    @dash_app.callback(Output('graph_2', 'figure'),
-                       [Input('dropdown2', 'value')])
-    def modify_graph_2(value):
         """
-        Change graph 2 depending on the value selected on the dropdown bar.
+        return get_user_preferred_genres()
+
+    @dash_app.callback(Output('preferred_genres_status', 'children'),
+                       Input('preferred_genres', 'value'),
+                       prevent_initial_call=True)
+    def save_preferred_genres(preferred_genres):
+        """
+        Store the preferred genres chosen by the user.
 
         Arguments
         ---------
-        value : str
-            The selected value of dropdown2.
+        preferred_genres : list
+            The genres selected on the preferred_genres dropdown.
 
         Returns
         -------
-        plotly.graph_objs._figure.Figure
-            The figure that corresponds to the selected dropdown option.
+        str
+            A message informing that the genres have been saved (no update if they had not changed).
 
         """
-        if value == 'type2_1':  # User has chosen Overall Revenue
-            return cc.fig7
-        elif value == 'type2_2':  # User has chosen Mean Revenue
-            return cc.fig8
-        else:  # User has chosen Number of Movies
-            return cc.fig9
+        if preferred_genres is None or sorted(preferred_genres) == sorted(get_user_preferred_genres()):
+            return dash.no_update
+
+        current_user.set_preferred_genres(preferred_genres)
+        db.session.commit()
+        return 'Preferred genres saved'
+
+    @dash_app.callback(Output('genre_combination_stats', 'children'),
+                       Input('include_genres', 'value'),
+                       Input('exclude_genres', 'value'))
+    def filter_genre_combination(include_genres, exclude_genres):
+        """
+        Display the revenue statistics of the films that have all the genres in include_genres and none of the genres in
+        exclude_genres.
+
+        Arguments
+        ---------
+        include_genres : list
+            The genres selected on the include_genres dropdown.
+        exclude_genres : list
+            The genres selected on the exclude_genres dropdown.
+
+        Returns
+        -------
+        str
+            The number of films, overall revenue and mean revenue of the films that match the combination.
+
+        """
+        stats = cc.genre_combination_stats(include_genres, exclude_genres)
+        if stats['Number of Movies'] == 0:
+            return 'No films match this combination of genres.'
+
+        return (f"Number of Movies: {stats['Number of Movies']} | Overall Revenue: {stats['Revenue']:,.0f} (USD) | "
+                f"Mean Revenue: {stats['Mean Revenue']:,.0f} (USD)")
+
+    @dash_app.callback(Output('messages', 'children'),
+                       Input('url', 'pathname'))
+    def unread_messages_notification(pathname):
+        """
+        Display an unread messages notification symbol (red dot) if the current user has any unread messages.
+
+        Arguments
+        ---------
+        pathname : str
+            The dash_app path the user is currently located at (this value will not be used, but everytime the user
+            enters the dash app, the check_if_unread function will be called).
+
+        Returns
+        -------
+        list
+            A list containing the dash.html.Li.Li component to be displayed in the navigation bar. If there are unread
+            messages, the notification symbol will appear. Otherwise, no notification symbol will be displayed.
+
+        """
+        if check_if_unread():
+            return [html.Li(className="nav-item",
+                            children=[html.A(['Messages ', html.Span(
+                                className="position-relative top-0 start-0 translate-middle badge border border-light\
+                                           rounded-circle bg-danger p-2",
+                                children=[html.Span('unread messages', className='visually-hidden')])],
+                                             className="nav-link", href="/view_messages"),
+                                      ])]
+
+        else:
+            return [html.Li(className="nav-item",
+                            children=[html.A('Messages', className="nav-link", href="/view_messages")])]
+
+
+def init_figure_callbacks(dash_app, type4_1_row, type4_2_row):
+    """
+    Define the callbacks that switch the figures of graph_1, graph_2 and graph_4 (and the options and rows that depend
+    on the dropdowns) depending on the options selected. The figures are selected on the server.
+
+    Arguments
+    ---------
+    dash_app : dash.dash.Dash
+        The created Dash app.
+    type4_1_row : dash_bootstrap_components._components.Row.Row
+        The row defined for dropdown4 type4_1 value.
+    type4_2_row : dash_bootstrap_components._components.Row.Row
+        The row defined for dropdown4 type4_2 value.
+
+    """
 
     @dash_app.callback(Output('chck1', 'options'),
                        Input('dropdown1', 'value'))
@@ -453,6 +1060,97 @@ def init_callbacks(dash_app, graph1_layout, graph2_layout, graph3_layout, graph4
         else:  # User has chosen Mean Revenue
             return type4_2_row
 
+    @dash_app.callback(Output('graph_4_treemap', 'figure'),
+                       Input('dropdown4', 'value'))
+    def display_graph_4_treemap(dropdown_value):
+        """
+        Display the Distributor Revenue treemap when the type4_1 row is shown.
+
+        Arguments
+        ---------
+        dropdown_value : str
+            The value chosen on dropdown4 (this value will not be used, as the treemap only appears for type4_1).
+
+        Returns
+        -------
+        dict
+            The serialized Distributor Revenue treemap.
+
+        """
+        return fc.figure('fig11')
+
+    @dash_app.callback(Output('graph_1', 'figure'),
+                       Input('dropdown1', 'value'),
+                       Input('chck1', 'value'),
+                       Input('preferred_genres', 'value'))
+    def modify_graph_1(dropdown_value, selected_chart_options, preferred_genres):
+        """
+        Change graph_1 depending on the dropdown1, chck1 and preferred_genres options selected.
+
+        Arguments
+        ---------
+        dropdown_value : str
+            The selected dropdown value. Available options: Mean Revenue, Overall Revenue.
+        selected_chart_options : str
+            The selected checklist value. Available options: Show Preferred Genres, Show Error Bars (when Mean Revenue
+            is chosen) and Show Error Bars (when Overall Genre Revenue is chosen).
+        preferred_genres : list
+            The preferred genres of the user, which are highlighted if Show Preferred Genres is selected.
+
+        Returns
+        -------
+        dict or plotly.graph_objs._figure.Figure
+            The figure that corresponds to the chosen options.
+
+        """
+        # If selected_chart_options is None, convert to an empty list to avoid exception 'NoneType' is not iterable
+        if selected_chart_options is None:
+            selected_chart_options = []
+
+        # If Show Preferred Genres is not selected, the (serialized) figures shared by all users are displayed
+        if 'SPG' not in selected_chart_options:
+            if dropdown_value == 'type1_2':  # User has chosen Overall Revenue
+                return fc.figure('fig5')
+            elif 'SEB' in selected_chart_options:  # User has chosen Mean Revenue and Show Error Bars
+                return fc.figure('fig4')
+            else:  # User has chosen Mean Revenue and no additional checklist options
+                return fc.figure('fig1')
+
+        # Otherwise, get the figure that highlights the genres chosen by the user (error bars are only available for
+        # the Mean Revenue, category_figure ignores them otherwise)
+        metric = 'Revenue' if dropdown_value == 'type1_2' else 'Mean Revenue'
+        return cc.category_figure('Genres', metric, preferred_genres, error_bars='SEB' in selected_chart_options)
+
+    @dash_app.callback(Output('graph_2', 'figure'),
+                       [Input('dropdown2', 'value'),
+                        Input('runtime_bins', 'value'),
+                        Input('runtime_range', 'value')])
+    def modify_graph_2(value, number_of_bins, runtime_range):
+        """
+        Change graph 2 depending on the value selected on the dropdown bar and the bins selected on the sliders.
+
+        Arguments
+        ---------
+        value : str
+            The selected value of dropdown2.
+        number_of_bins : int
+            The number of bins selected on the runtime_bins slider.
+        runtime_range : list
+            The range of runtimes selected on the runtime_range slider.
+
+        Returns
+        -------
+        dict
+            The figure that corresponds to the selected options.
+
+        """
+        if value == 'type2_1':  # User has chosen Overall Revenue
+            return create_runtime_histogram('fig7', number_of_bins, runtime_range)
+        elif value == 'type2_2':  # User has chosen Mean Revenue
+            return create_runtime_histogram('fig8', number_of_bins, runtime_range)
+        else:  # User has chosen Number of Movies
+            return create_runtime_histogram('fig9', number_of_bins, runtime_range)
+
     @dash_app.callback(Output('graph_4', 'figure'),
                        Input('chck4', 'value'))
     def modify_graph_4(checklist_value):
@@ -466,43 +1164,157 @@ def init_callbacks(dash_app, graph1_layout, graph2_layout, graph3_layout, graph4
 
         Returns
         -------
-        plotly.graph_objs._figure.Figure
-            The figure that corresponds to the selected checklist option.
+        dict
+            The serialized figure that corresponds to the selected checklist option.
 
         """
         if checklist_value is None or checklist_value == []:  # User has not selected the Show Error Bars option
-            return cc.fig13
+            return fc.figure('fig13')
         else:  # User has selected the Show Error Bars option
-            return cc.fig12
+            return fc.figure('fig12')
 
-    @dash_app.callback(Output('messages', 'children'),
+
+def init_clientside_figure_callbacks(dash_app):
+    """
+    Define the callbacks that switch the figures of graph_1, graph_2 and graph_4 in the browser. The figure variants of
+    a graph page are sent once (when the page is opened) to a dcc.Store, and the clientside callbacks choose among
+    them, so changing the options of a graph does not require any request to the server.
+
+    Arguments
+    ---------
+    dash_app : dash.dash.Dash
+        The created Dash app.
+
+    """
+
+    @dash_app.callback(Output('graph_1_figures', 'data'),
+                       Input('preferred_genres', 'value'))
+    def store_graph_1_figures(preferred_genres):
+        """
+        Send the figure variants of graph_1 to the browser when the graph 1 page is opened (and when the preferred
+        genres change). The variants are stored with the names of the figures they replace: fig2, fig3 and fig6
+        highlight the preferred genres of the user.
+        """
+        figures = {name: fc.figure(name) for name in ['fig1', 'fig4', 'fig5']}
+        figures['fig2'] = cc.category_figure('Genres', 'Mean Revenue', preferred_genres, error_bars=True)
+        figures['fig3'] = cc.category_figure('Genres', 'Mean Revenue', preferred_genres)
+        figures['fig6'] = cc.category_figure('Genres', 'Revenue', preferred_genres)
+        return figures
+
+    @dash_app.callback(Output('graph_2_figures', 'data'),
+                       [Input('url', 'pathname'),
+                        Input('runtime_bins', 'value'),
+                        Input('runtime_range', 'value')])
+    def store_graph_2_figures(pathname, number_of_bins, runtime_range):
+        """
+        Send the figure variants of graph_2 (fig7 to fig9) to the browser when the graph 2 page is opened. The films are
+        binned on the server, so the variants are sent again when the bins selected on the sliders change.
+        """
+        return {name: create_runtime_histogram(name, number_of_bins, runtime_range)
+                for name in ['fig7', 'fig8', 'fig9']}
+
+    @dash_app.callback(Output('graph_4_figures', 'data'),
                        Input('url', 'pathname'))
-    def unread_messages_notification(pathname):
+    def store_graph_4_figures(pathname):
         """
-        Display an unread messages notification symbol (red dot) if the current user has any unread messages.
+        Send the figures of graph 4 (the fig11 treemap and the fig12 and fig13 variants) to the browser when the graph 4
+        page is opened.
+        """
+        return {name: fc.figure(name) for name in ['fig11', 'fig12', 'fig13']}
 
-        Arguments
-        ---------
-        pathname : str
-            The dash_app path the user is currently located at (this value will not be used, but everytime the user
-            enters the dash app, the check_if_unread function will be called).
+    # The following functions are the JavaScript equivalent of modify_checklist_1, modify_graph4_layout_row,
+    # display_graph_4_treemap, modify_graph_1, modify_graph_2 and modify_graph_4. The checklist options and the rows of
+    # graph 4 do not depend on the data, so they are included in the functions and in the layout
+    dash_app.clientside_callback(
+        """
+        function(dropdownValue) {
+            const options = [{label: 'Show Preferred Genres', value: 'SPG'}];
+            if (dropdownValue === 'type1_1') {
+                options.push({label: 'Show Error Bars', value: 'SEB'});
+            }
+            return options;
+        }
+        """,
+        Output('chck1', 'options'),
+        Input('dropdown1', 'value')
+    )
 
-        Returns
-        -------
-        list
-            A list containing the dash.html.Li.Li component to be displayed in the navigation bar. If there are unread
-            messages, the notification symbol will appear. Otherwise, no notification symbol will be displayed.
+    dash_app.clientside_callback(
+        """
+        function(dropdownValue) {
+            const hidden = {display: 'none'};
+            return dropdownValue === 'type4_1' ? [{}, hidden] : [hidden, {}];
+        }
+        """,
+        Output('type4_1_container', 'style'),
+        Output('type4_2_container', 'style'),
+        Input('dropdown4', 'value')
+    )
 
+    dash_app.clientside_callback(
         """
-        if check_if_unread():
-            return [html.Li(className="nav-item",
-                            children=[html.A(['Messages ', html.Span(
-                                className="position-relative top-0 start-0 translate-middle badge border border-light\
-                                           rounded-circle bg-danger p-2",
-                                children=[html.Span('unread messages', className='visually-hidden')])],
-                                             className="nav-link", href="/view_messages"),
-                                      ])]
+        function(figures) {
+            return figures ? figures.fig11 : window.dash_clientside.no_update;
+        }
+        """,
+        Output('graph_4_treemap', 'figure'),
+        Input('graph_4_figures', 'data')
+    )
 
-        else:
-            return [html.Li(className="nav-item",
-                            children=[html.A('Messages', className="nav-link", href="/view_messages")])]
+    dash_app.clientside_callback(
+        """
+        function(dropdownValue, selectedChartOptions, figures) {
+            if (!figures) {
+                return window.dash_clientside.no_update;
+            }
+            const options = selectedChartOptions || [];
+            const showPreferredGenres = options.includes('SPG');
+            const showErrorBars = options.includes('SEB');
+            if (dropdownValue === 'type1_2') {
+                return showPreferredGenres ? figures.fig6 : figures.fig5;
+            }
+            if (showPreferredGenres && showErrorBars) {
+                return figures.fig2;
+            }
+            if (showPreferredGenres) {
+                return figures.fig3;
+            }
+            return showErrorBars ? figures.fig4 : figures.fig1;
+        }
+        """,
+        Output('graph_1', 'figure'),
+        Input('dropdown1', 'value'),
+        Input('chck1', 'value'),
+        Input('graph_1_figures', 'data')
+    )
+
+    dash_app.clientside_callback(
+        """
+        function(value, figures) {
+            if (!figures) {
+                return window.dash_clientside.no_update;
+            }
+            if (value === 'type2_1') {
+                return figures.fig7;
+            }
+            return value === 'type2_2' ? figures.fig8 : figures.fig9;
+        }
+        """,
+        Output('graph_2', 'figure'),
+        Input('dropdown2', 'value'),
+        Input('graph_2_figures', 'data')
+    )
+
+    dash_app.clientside_callback(
+        """
+        function(checklistValue, figures) {
+            if (!figures) {
+                return window.dash_clientside.no_update;
+            }
+            return (checklistValue && checklistValue.length) ? figures.fig12 : figures.fig13;
+        }
+        """,
+        Output('graph_4', 'figure'),
+        Input('chck4', 'value'),
+        Input('graph_4_figures', 'data')
+    )
@@ -0,0 +1,291 @@
+import hashlib
+import json
+import logging
+import os
+import struct
+import zipfile
+import numpy as np
+import pandas as pd
+
+try:  # Parquet is only used if pyarrow is installed, otherwise the cache falls back to numpy .npz files
+    import pyarrow  # noqa: F401
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+# Increase this number whenever the way the dataset is prepared changes, so that old cache files are not reused
+CACHE_VERSION = 1
+logger = logging.getLogger(__name__)
+
+
+def load_cached_dataset(source_path, build_df, cache_dir=None, flat_columns=None):
+    """
+    Load the dataframe prepared from a source file (e.g., prepared_dataset.xlsx) from a columnar cache file. If there is
+    no cache file for the current version of the source, build the dataframe and store it in the cache.
+
+    The cache is keyed by the sha256 hash of the source file. The hash is stored alongside the size and modification
+    time of the file, so that the source is only read again (to be hashed) when it has changed on disk.
+
+    Arguments
+    ---------
+    source_path : str
+        The path to the source file of the dataset.
+    build_df : function
+        A function with no arguments that reads the source file and returns the prepared dataframe. It is only called
+        when the cache is missing or outdated.
+    cache_dir : str
+        The directory where the cache files are stored. Default is None, which means a .dataset_cache directory next to
+        the source file will be used.
+    flat_columns : dict
+        If given and the dataframe is read from an npz cache file, the flattened values and offsets of its columns of
+        strings and lists are stored in it (see read_cache_file). Default is None.
+
+    Returns
+    -------
+    pandas.core.frame.DataFrame
+        The prepared dataframe.
+
+    """
+    if cache_dir is None:
+        cache_dir = default_cache_dir(source_path)
+    stem = os.path.splitext(os.path.basename(source_path))[0]
+    extension = '.parquet' if PARQUET_AVAILABLE else '.npz'
+    cache_path = os.path.join(cache_dir, f'{stem}-{source_hash(source_path, cache_dir)[:16]}-v{CACHE_VERSION}'
+                                         f'{extension}')
+
+    if os.path.exists(cache_path):
+        try:
+            return read_cache_file(cache_path, flat_columns)
+        except (OSError, ValueError, KeyError):  # The cache file is corrupted, so it is built again
+            logger.warning('Unable to read the dataset cache %s', cache_path)
+
+    df = build_df()
+    try:
+        write_cache_file(df, cache_path)
+        remove_stale_cache_files(cache_dir, stem, keep=cache_path)
+    except OSError:  # E.g., the directory is read-only. The app still works, it just does not benefit from the cache
+        logger.warning('Unable to write the dataset cache %s', cache_path)
+
+    return df
+
+
+def default_cache_dir(source_path):
+    """Get the default cache directory of a source file (a .dataset_cache directory next to it)"""
+    return os.path.join(os.path.dirname(os.path.abspath(source_path)), '.dataset_cache')
+
+
+def source_hash(source_path, cache_dir):
+    """
+    Get the sha256 hash of a source file. The hash is only calculated if the size or modification time of the file
+    have changed since the last time it was stored in the cache directory.
+
+    Arguments
+    ---------
+    source_path : str
+        The path to the source file.
+    cache_dir : str
+        The directory in which the hash of the source file is stored.
+
+    Returns
+    -------
+    str
+        The hexadecimal sha256 hash of the file.
+
+    """
+    stat = os.stat(source_path)
+    stem = os.path.splitext(os.path.basename(source_path))[0]
+    hash_path = os.path.join(cache_dir, f'{stem}.hash.json')
+    try:
+        with open(hash_path) as hash_file:
+            stored = json.load(hash_file)
+        if stored['size'] == stat.st_size and stored['mtime_ns'] == stat.st_mtime_ns:
+            return stored['sha256']
+    except (OSError, ValueError, KeyError):
+        pass
+
+    sha256 = hashlib.sha256()
+    with open(source_path, 'rb') as source_file:
+        for block in iter(lambda: source_file.read(1 << 20), b''):
+            sha256.update(block)
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        atomic_write(hash_path, lambda f: f.write(json.dumps(
+            {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': sha256.hexdigest()}).encode()))
+    except OSError:
+        pass
+
+    return sha256.hexdigest()
+
+
+def write_cache_file(df, cache_path):
+    """
+    Store a dataframe in a cache file (Parquet or npz, depending on the extension of cache_path).
+
+    In npz files, the columns of strings are stored as fixed-width unicode arrays and the columns of lists (e.g.,
+    Genres) are stored as a flattened array of values plus an array of offsets (the values of row i are
+    values[offsets[i]:offsets[i + 1]]). This way, no pickled objects are needed.
+
+    Arguments
+    ---------
+    df : pandas.core.frame.DataFrame
+        The dataframe that is to be stored.
+    cache_path : str
+        The path of the cache file.
+
+    """
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    if cache_path.endswith('.parquet'):
+        atomic_write(cache_path, lambda f: df.to_parquet(f))
+        return
+
+    arrays = {'__columns__': np.array(df.columns, dtype=str), '__index__': df.index.to_numpy()}
+    kinds = []
+    for position, column in enumerate(df.columns):
+        column_data = df[column]
+        if len(column_data) and isinstance(column_data.iloc[0], (list, tuple)):
+            lengths = np.fromiter((len(cell) for cell in column_data), dtype=np.int64, count=len(column_data))
+            arrays[f'{position}__offsets'] = np.concatenate(([0], np.cumsum(lengths)))
+            arrays[f'{position}__values'] = np.array([value for cell in column_data for value in cell], dtype=str)
+            kinds.append('list')
+        elif column_data.dtype.kind in 'biufcmM':  # Numbers and datetimes can be stored directly
+            arrays[f'{position}__values'] = column_data.to_numpy()
+            kinds.append('values')
+        else:
+            arrays[f'{position}__values'] = np.array(column_data.tolist(), dtype=str)
+            kinds.append('str')
+    arrays['__kinds__'] = np.array(kinds, dtype=str)
+
+    atomic_write(cache_path, lambda f: np.savez(f, **arrays))
+
+
+def read_cache_file(cache_path, flat_columns=None):
+    """
+    Read a dataframe from a cache file created by write_cache_file.
+
+    Arguments
+    ---------
+    cache_path : str
+        The path of the cache file.
+    flat_columns : dict
+        If given, the location in an npz file (see stored_array_location) of the arrays of each column of strings or
+        lists is stored in it, keyed by column: a (values, offsets) tuple, where offsets is None for columns of
+        strings. They can be memory-mapped and encoded (e.g., by
+        dash_app.parallel_aggregation_module.aggregate_in_parallel) without going through the Python objects of the
+        dataframe. Parquet files do not fill it. Default is None.
+
+    Returns
+    -------
+    pandas.core.frame.DataFrame
+        The dataframe stored in the cache file.
+
+    """
+    if cache_path.endswith('.parquet'):
+        df = pd.read_parquet(cache_path)
+        for column in df.columns:  # Parquet returns list columns as arrays, convert them back to lists
+            if len(df[column]) and isinstance(df[column].iloc[0], np.ndarray):
+                df[column] = df[column].apply(list)
+        return df
+
+    with np.load(cache_path, allow_pickle=False) as arrays:
+        columns = {}
+        for position, (column, kind) in enumerate(zip(arrays['__columns__'], arrays['__kinds__'])):
+            values = arrays[f'{position}__values']
+            if flat_columns is not None and kind in ('list', 'str'):
+                locations = (stored_array_location(cache_path, arrays.zip, f'{position}__values'),
+                             stored_array_location(cache_path, arrays.zip, f'{position}__offsets')
+                             if kind == 'list' else None)
+                if locations[0] is not None and (kind == 'str' or locations[1] is not None):
+                    flat_columns[str(column)] = locations
+            if kind == 'list':
+                offsets = arrays[f'{position}__offsets']
+                values = values.tolist()
+                columns[column] = [values[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+            elif kind == 'str':
+                columns[column] = values.tolist()
+            else:
+                columns[column] = values
+
+        index = arrays['__index__']
+        if np.array_equal(index, np.arange(len(index))):
+            index = pd.RangeIndex(len(index))
+
+        return pd.DataFrame(columns, index=index)
+
+
+def stored_array_location(cache_path, zip_file, name):
+    """
+    Find where the data of an array stored in an npz file starts. np.savez does not compress the arrays, so they can be
+    memory-mapped (e.g., by several processes at once) instead of being read.
+
+    Arguments
+    ---------
+    cache_path : str
+        The path of the npz file.
+    zip_file : zipfile.ZipFile
+        The opened npz file.
+    name : str
+        The name of the array.
+
+    Returns
+    -------
+    tuple
+        The path of the file, the offset of the data of the array, its shape and its dtype (the same format as the
+        descriptors of dash_app.parallel_aggregation_module.attach_array). It is None if the array cannot be
+        memory-mapped (e.g., it is compressed).
+
+    """
+    info = zip_file.getinfo(f'{name}.npy')
+    if info.compress_type != zipfile.ZIP_STORED:
+        return None
+
+    with open(cache_path, 'rb') as cache_file:
+        # The data of the member starts after its local header (30 bytes, then the name and extra fields)
+        cache_file.seek(info.header_offset)
+        name_length, extra_length = struct.unpack('<26xHH', cache_file.read(30))
+        cache_file.seek(info.header_offset + 30 + name_length + extra_length)
+        version = np.lib.format.read_magic(cache_file)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(cache_file)
+        elif version == (2, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(cache_file)
+        else:
+            return None
+        if fortran_order or dtype.hasobject:
+            return None
+        return cache_path, cache_file.tell(), shape, dtype.str
+
+
+def remove_stale_cache_files(cache_dir, stem, keep):
+    """Remove the cache files that belong to previous versions of a source file."""
+    for file_name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, file_name)
+        # Temporary files are skipped, as they may be in the process of being written by another worker
+        if file_name.startswith(f'{stem}-') and not file_name.endswith('.tmp') and path != keep:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def atomic_write(path, write):
+    """
+    Write a file atomically: the content is written to a temporary file that then replaces path. This prevents other
+    processes (e.g., other gunicorn workers) from reading a half-written file.
+
+    Arguments
+    ---------
+    path : str
+        The path of the file that is to be written.
+    write : function
+        A function that receives the open (binary) temporary file and writes the content into it.
+
+    """
+    temporary_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        with open(temporary_path, 'wb') as temporary_file:
+            write(temporary_file)
+        os.replace(temporary_path, path)
+    finally:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
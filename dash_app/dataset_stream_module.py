@@ -0,0 +1,101 @@
+import ast
+import itertools
+import os
+import openpyxl
+import pandas as pd
+
+# Number of rows read from the dataset file at a time when it is streamed
+DEFAULT_CHUNK_SIZE = 50000
+
+
+def prepare_dataset(df):
+    """
+    Prepare the rows read from the dataset file (prepared_dataset.xlsx or an export with the same columns), so they can
+    be used by ChartCreator.
+
+    Arguments
+    ---------
+    df : pandas.core.frame.DataFrame
+        The rows as they were read from the file.
+
+    Returns
+    -------
+    pandas.core.frame.DataFrame
+        The prepared rows. Films that appear more than once are only kept the first time.
+
+    """
+    df = df.drop(columns=['Unnamed: 0'], errors='ignore')  # Drop the unnamed column that is generated with the file
+    # Convert the genres column to list (it is in string format initially). literal_eval only accepts Python literals,
+    # so the file cannot run any code
+    df['Genres'] = df['Genres'].apply(lambda genres: ast.literal_eval(genres) if isinstance(genres, str) else genres)
+    df['Film'] = df['Film'].astype(str)  # Titles such as 1917 are read as numbers
+    df['Release Date'] = pd.to_datetime(df['Release Date'])
+    return df.drop_duplicates(subset=['Film'])
+
+
+def read_dataset_chunks(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Read the rows of a dataset file in chunks, without loading the whole file. Excel files are read with openpyxl in
+    read-only mode (which parses the rows one at a time) and CSV files with pandas.read_csv.
+
+    Arguments
+    ---------
+    path : str
+        The path to the dataset file (.xlsx or .csv).
+    chunk_size : int
+        The maximum number of rows of each chunk. Default is DEFAULT_CHUNK_SIZE.
+
+    Returns
+    -------
+    generator
+        The chunks (pandas.core.frame.DataFrame), as they are in the file.
+
+    """
+    if os.path.splitext(path)[1].lower() == '.csv':
+        with pd.read_csv(path, chunksize=chunk_size) as reader:
+            yield from reader
+        return
+
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        # Name the columns without a header in the same way as pandas.read_excel
+        columns = [f'Unnamed: {position}' if name is None else name for position, name in enumerate(header)]
+        while True:
+            chunk = list(itertools.islice(rows, chunk_size))
+            if not chunk:
+                break
+            yield pd.DataFrame(chunk, columns=columns)
+    finally:
+        workbook.close()
+
+
+def stream_dataset(path, seen_films, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Read and prepare the rows of a dataset file in chunks. Films that have already been seen (in a previous chunk, or
+    before calling this function) are removed.
+
+    Arguments
+    ---------
+    path : str
+        The path to the dataset file (.xlsx or .csv).
+    seen_films : set
+        The titles of the films that have already been read. The films of each chunk are added to it.
+    chunk_size : int
+        The maximum number of rows of each chunk. Default is DEFAULT_CHUNK_SIZE.
+
+    Returns
+    -------
+    generator
+        The prepared chunks (pandas.core.frame.DataFrame). Empty chunks are skipped.
+
+    """
+    for chunk in read_dataset_chunks(path, chunk_size):
+        chunk = prepare_dataset(chunk)
+        chunk = chunk[~chunk['Film'].isin(seen_films)]
+        if len(chunk):
+            seen_films.update(chunk['Film'])
+            yield chunk
@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+
+ONE_DAY = np.timedelta64(1, 'D')
+
+
+class DateIndex:
+    """
+    A class that keeps the release dates in order along with the cumulative revenue up to each date (prefix sums), so
+    that the revenue of any range of dates is the difference between two prefix sums, found with two binary searches.
+
+    Arguments
+    ---------
+    dates : pandas.core.series.Series
+        The dates (e.g., the release dates, or the dates of a dataframe with the revenue per date).
+    revenue : pandas.core.series.Series
+        The revenue of each date.
+
+    Attributes
+    ----------
+    __dates : numpy.ndarray
+        The distinct dates (numpy.datetime64, without time), sorted.
+    __cumulative_revenue : numpy.ndarray
+        The overall revenue of the dates before each position of __dates (it has one more element, the first one being
+        0).
+
+    Methods
+    -------
+    from_arrays
+        Create an index from the arrays returned by to_arrays.
+    to_arrays
+        Get the arrays of the index.
+    to_date
+        Convert a date into a numpy.datetime64 without time.
+    total
+        Get the revenue of a range of dates.
+    rolling_totals
+        Get the revenue of the window of days that ends on each date of a range.
+    date_range
+        Getter method to obtain the first and last dates.
+
+    """
+
+    def __init__(self, dates, revenue):
+        """Create an instance of the class"""
+        days = pd.to_datetime(pd.Series(dates)).dt.normalize().to_numpy(dtype='datetime64[ns]')
+        self.__dates, inverse = np.unique(days, return_inverse=True)
+        revenue_per_date = np.bincount(inverse, weights=np.asarray(revenue, dtype=np.float64),
+                                       minlength=len(self.__dates))
+        self.__cumulative_revenue = np.concatenate(([0.0], np.cumsum(revenue_per_date)))
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """Create an index from the arrays returned by to_arrays (they are not copied, so they can be memory-mapped)"""
+        index = cls.__new__(cls)
+        index.__dates = arrays['dates']
+        index.__cumulative_revenue = arrays['cumulative_revenue']
+        return index
+
+    def to_arrays(self):
+        """Get the arrays of the index (the sorted dates and the cumulative revenue), keyed by name"""
+        return {'dates': self.__dates, 'cumulative_revenue': self.__cumulative_revenue}
+
+    @staticmethod
+    def to_date(value):
+        """Convert a date (str, datetime or numpy.datetime64) into a numpy.datetime64 without time"""
+        return pd.Timestamp(value).normalize().to_datetime64()
+
+    def total(self, start=None, end=None):
+        """
+        Get the revenue of the dates from start (included) to end (not included).
+
+        Arguments
+        ---------
+        start : str
+            The first date of the range (e.g., '2020-03-15'). Default is None, which means the range starts on the
+            first date.
+        end : str
+            The date after the last date of the range. Default is None, which means the range includes the last date.
+
+        Returns
+        -------
+        float
+            The revenue of the range (0 if it does not contain any date).
+
+        """
+        first = 0 if start is None else np.searchsorted(self.__dates, self.to_date(start), side='left')
+        last = len(self.__dates) if end is None else np.searchsorted(self.__dates, self.to_date(end), side='left')
+        return float(self.__cumulative_revenue[max(last, first)] - self.__cumulative_revenue[first])
+
+    def rolling_totals(self, days, start=None, end=None):
+        """
+        Get the revenue of the window of days that ends on each of the dates from start to end (both included). All the
+        windows are computed with vectorized binary searches.
+
+        Arguments
+        ---------
+        days : int
+            The number of days of the window (e.g., 7 means the date and the 6 days before it).
+        start, end : str
+            The first and last dates at which a window ends. Default is None, which means the first (or last) date.
+
+        Returns
+        -------
+        pandas.core.series.Series
+            The revenue of each window, indexed by the date it ends on.
+
+        """
+        first = 0 if start is None else np.searchsorted(self.__dates, self.to_date(start), side='left')
+        last = len(self.__dates) if end is None else np.searchsorted(self.__dates, self.to_date(end), side='right')
+        window_ends = self.__dates[first:last]
+        window_starts = np.searchsorted(self.__dates, window_ends - (days - 1) * ONE_DAY, side='left')
+        totals = self.__cumulative_revenue[np.arange(first, max(last, first)) + 1] - \
+            self.__cumulative_revenue[window_starts]
+        return pd.Series(totals, index=pd.DatetimeIndex(window_ends))
+
+    @property
+    def date_range(self):
+        """Getter method to obtain the first and last dates (None and None if there are no dates)"""
+        if not len(self.__dates):
+            return None, None
+        return pd.Timestamp(self.__dates[0]), pd.Timestamp(self.__dates[-1])
@@ -0,0 +1,59 @@
+import numpy as np
+
+# Number of points of the revenue over time line (graph 3) above which it is downsampled
+DEFAULT_MAX_POINTS = 2000
+
+
+def largest_triangle_three_buckets(x, y, number_of_points):
+    """
+    Choose the points of a line that preserve its shape, with the Largest-Triangle-Three-Buckets algorithm. The first
+    and last points are always kept, and the rest of the points are split into number_of_points - 2 buckets. From each
+    bucket, the point that forms the largest triangle with the point chosen from the previous bucket and the mean of
+    the next bucket is kept, so peaks and troughs are not lost (unlike taking every n-th point or the mean of each
+    bucket).
+
+    The buckets are visited in order (each choice depends on the previous one), but the areas of the triangles of each
+    bucket and the means of all the buckets are calculated with vectorized operations.
+
+    Arguments
+    ---------
+    x : numpy.ndarray
+        The x coordinates of the points, in increasing order (e.g., the number of days since the first date).
+    y : numpy.ndarray
+        The y coordinates of the points.
+    number_of_points : int
+        The number of points to be kept.
+
+    Returns
+    -------
+    numpy.ndarray
+        The positions of the kept points, in increasing order. If the line does not have more than number_of_points
+        points (or number_of_points is lower than 3), every position is returned.
+
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    number_of_positions = len(x)
+    if number_of_points >= number_of_positions or number_of_points < 3:
+        return np.arange(number_of_positions)
+
+    # Every point but the first and the last one is assigned to a bucket. The mean of each bucket is obtained from the
+    # cumulative sums, and the "next bucket" of the last bucket is the last point
+    edges = np.linspace(1, number_of_positions - 1, number_of_points - 1).astype(np.int64)
+    cumulative_x = np.concatenate(([0.0], np.cumsum(x)))
+    cumulative_y = np.concatenate(([0.0], np.cumsum(y)))
+    sizes = np.diff(edges)
+    next_x = np.append(((cumulative_x[edges[1:]] - cumulative_x[edges[:-1]]) / sizes)[1:], x[-1])
+    next_y = np.append(((cumulative_y[edges[1:]] - cumulative_y[edges[:-1]]) / sizes)[1:], y[-1])
+
+    positions = np.empty(number_of_points, dtype=np.int64)
+    positions[0], positions[-1] = 0, number_of_positions - 1
+    previous = 0
+    for bucket, (start, end) in enumerate(zip(edges[:-1], edges[1:])):
+        # Twice the area of the triangle formed by the previous point, each point of the bucket and the next mean
+        areas = np.abs((x[previous] - next_x[bucket]) * (y[start:end] - y[previous]) -
+                       (x[previous] - x[start:end]) * (next_y[bucket] - y[previous]))
+        previous = start + int(np.argmax(areas))
+        positions[bucket + 1] = previous
+
+    return positions
@@ -0,0 +1,112 @@
+import hashlib
+import json
+import threading
+import plotly.io as pio
+
+
+class FigureCache:
+    """
+    A class that stores the JSON serialization of the figures created by a ChartCreator, so that each figure is only
+    validated and serialized once (instead of every time a callback returns it). A callback that returns an unchanged
+    figure only costs a dictionary lookup: it returns the cached dictionary, which Dash sends without validating it, and
+    the compressed bytes of the response are reused by my_app.compression.Compress (keyed by the hash of the JSON).
+    The entries are only serialized again after they are invalidated (e.g., when the dataset is reloaded).
+
+    Arguments
+    ---------
+    chart_creator : dash_app.chart_creator_module.ChartCreator
+        The object that creates the figures.
+
+    Attributes
+    ----------
+    __chart_creator : dash_app.chart_creator_module.ChartCreator
+        The chart creator introduced when creating the class.
+    __entries : dict
+        The serialized figures, keyed by figure name. Each entry is a tuple containing the JSON bytes of the figure, its
+        content hash (used as ETag) and the dictionary obtained from the JSON (which is what the callbacks return).
+    __lock : threading.Lock
+        Lock used to avoid serializing the same figure in two threads at the same time.
+
+    Methods
+    -------
+    __get_entry
+        Obtain the entry of a figure, serializing the figure if it is not in the cache.
+    figure
+        Get the serialized figure as a dictionary (which Dash can send without validating it again).
+    serialized
+        Get the JSON bytes and the content hash of a figure.
+    invalidate
+        Remove one or more figures from the cache (e.g., after the dataset is reloaded).
+
+    """
+
+    def __init__(self, chart_creator):
+        """Create an instance of the class"""
+        self.__chart_creator = chart_creator
+        self.__entries = {}
+        self.__lock = threading.Lock()
+
+    def __get_entry(self, name):
+        """
+        Obtain the cache entry of a figure. If the figure has not been serialized yet, serialize it and store it.
+
+        Arguments
+        ---------
+        name : str
+            The name of the figure (e.g., fig1). It must be one of the figure names of the chart creator.
+
+        Returns
+        -------
+        tuple
+            The JSON bytes, the content hash and the dictionary of the figure.
+
+        """
+        entry = self.__entries.get(name)
+        if entry is None:
+            if name not in self.__chart_creator.figure_names:
+                raise KeyError(f"Unknown figure '{name}'")
+
+            with self.__lock:
+                entry = self.__entries.get(name)
+                if entry is None:  # Another thread may have serialized the figure while waiting
+                    stored = self.__chart_creator.serialized_figure(name)
+                    if stored is not None:  # The figure is read from the artefact, so it is not created at all
+                        payload, etag = stored
+                    else:
+                        # The figure has already been validated when it was created, so it does not need to be
+                        # validated again
+                        payload = pio.to_json(getattr(self.__chart_creator, name), validate=False).encode()
+                        etag = hashlib.sha256(payload).hexdigest()[:32]
+                    entry = (payload, etag, json.loads(payload))
+                    self.__entries[name] = entry
+
+        return entry
+
+    def figure(self, name):
+        """Get the serialized figure (as a dictionary) with the given name"""
+        return self.__get_entry(name)[2]
+
+    def serialized(self, name):
+        """
+        Get the JSON bytes and the content hash of the figure with the given name. Both are read from the same entry,
+        so they always belong to the same version of the figure (even if the cache is invalidated at the same time).
+        """
+        payload, etag, _ = self.__get_entry(name)
+        return payload, etag
+
+    def invalidate(self, names=None):
+        """
+        Remove figures from the cache, so that they are serialized again the next time they are requested.
+
+        Arguments
+        ---------
+        names : list
+            The names of the figures to be removed. Default is None, which means all the figures are removed.
+
+        """
+        with self.__lock:
+            if names is None:
+                self.__entries.clear()
+            else:
+                for name in names:
+                    self.__entries.pop(name, None)
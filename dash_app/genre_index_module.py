@@ -0,0 +1,243 @@
+import numpy as np
+from dash_app.aggregation_module import explode_category
+
+
+class GenreIndex:
+    """
+    A class that encodes the genres of each film as an integer bitmask (one bit per genre), so that queries about
+    combinations of genres (e.g., films that are Action AND Romance but not Horror) are vectorized mask operations.
+
+    As many films share the same combination of genres, the revenue statistics are also precomputed for each distinct
+    bitmask. Hence, the statistics of a query only depend on the number of distinct combinations, not on the number of
+    films.
+
+    Arguments
+    ---------
+    genres_column : pandas.core.series.Series
+        The column containing the list of genres of each film.
+    revenue : pandas.core.series.Series
+        The column containing the revenue of each film.
+
+    Attributes
+    ----------
+    __bits : dict
+        The bit (as a numpy.uint64) that represents each genre.
+    __film_masks : numpy.ndarray
+        The bitmask of each film.
+    __revenue : numpy.ndarray
+        The revenue of each film.
+    __combination_masks : numpy.ndarray
+        The distinct bitmasks that appear in __film_masks.
+    __combination_counts, __combination_revenue : numpy.ndarray
+        The number of films and the overall revenue of each of the distinct bitmasks.
+
+    Methods
+    -------
+    from_arrays
+        Create an index from the arrays returned by to_arrays.
+    to_arrays
+        Get the arrays of the index.
+    __encode
+        Obtain the bitmask of each film in a genres column, assigning bits to the genres that are not in the index.
+    __add_combinations
+        Add the statistics of a set of films to the statistics of each distinct bitmask.
+    extend
+        Add new films to the index.
+    __query_mask
+        Obtain the bitmasks that match the query.
+    film_mask
+        Get a boolean array that selects the films that match a genre combination.
+    stats
+        Get the number of films, overall revenue and mean revenue of the films that match a genre combination.
+    genres
+        Getter method to obtain the genres included in the index.
+
+    """
+
+    def __init__(self, genres_column, revenue):
+        """Create an instance of the class"""
+        self.__bits = {}
+        self.__film_masks = np.zeros(0, dtype=np.uint64)
+        self.__revenue = np.zeros(0)
+        self.__combination_masks = np.zeros(0, dtype=np.uint64)
+        self.__combination_counts = np.zeros(0, dtype=np.int64)
+        self.__combination_revenue = np.zeros(0)
+        self.extend(genres_column, revenue)
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """Create an index from the arrays returned by to_arrays (they are not copied, so they can be memory-mapped)"""
+        index = cls.__new__(cls)
+        index.__bits = {genre: np.uint64(1) << np.uint64(bit) for bit, genre in enumerate(arrays['genres'].tolist())}
+        index.__film_masks = arrays['film_masks']
+        index.__revenue = arrays['revenue']
+        index.__combination_masks = arrays['combination_masks']
+        index.__combination_counts = arrays['combination_counts']
+        index.__combination_revenue = arrays['combination_revenue']
+        return index
+
+    def to_arrays(self):
+        """Get the arrays of the index (the genres in order of their bits, the bitmasks and statistics) by name"""
+        return {'genres': np.array(sorted(self.__bits, key=self.__bits.get), dtype=str),
+                'film_masks': self.__film_masks, 'revenue': self.__revenue,
+                'combination_masks': self.__combination_masks, 'combination_counts': self.__combination_counts,
+                'combination_revenue': self.__combination_revenue}
+
+    def __encode(self, genres_column, encoding=None):
+        """
+        Obtain the bitmask of each film in a genres column. The genres that are not in the index yet are assigned the
+        next free bits.
+
+        Arguments
+        ---------
+        genres_column : pandas.core.series.Series
+            The column containing the list of genres of each film.
+        encoding : tuple
+            The rows, codes and genres of the column, as returned by explode_category. Default is None, which means
+            the column is encoded here.
+
+        Returns
+        -------
+        numpy.ndarray
+            The bitmask of each film.
+
+        """
+        rows, codes, genres = encoding if encoding is not None else explode_category(genres_column)
+        new_genres = [genre for genre in genres if genre not in self.__bits]
+        number_of_genres = len(self.__bits) + len(new_genres)
+        if number_of_genres > 64:
+            raise ValueError(f'GenreIndex supports up to 64 genres, but {number_of_genres} were found')
+        for genre in new_genres:
+            self.__bits[genre] = np.uint64(1) << np.uint64(len(self.__bits))
+
+        genre_bits = np.array([self.__bits[genre] for genre in genres], dtype=np.uint64)
+        film_masks = np.zeros(len(genres_column), dtype=np.uint64)
+        np.bitwise_or.at(film_masks, rows, genre_bits[codes])
+        return film_masks
+
+    def __add_combinations(self, film_masks, revenue):
+        """
+        Add the number of films and overall revenue of a set of films to the statistics of each distinct bitmask. Only
+        the new films and the (few) distinct bitmasks are processed.
+
+        Arguments
+        ---------
+        film_masks : numpy.ndarray
+            The bitmask of each of the films.
+        revenue : numpy.ndarray
+            The revenue of each of the films.
+
+        """
+        masks = np.concatenate((self.__combination_masks, film_masks))
+        counts = np.concatenate((self.__combination_counts, np.ones(len(film_masks), dtype=np.int64)))
+        revenues = np.concatenate((self.__combination_revenue, revenue))
+
+        self.__combination_masks, inverse = np.unique(masks, return_inverse=True)
+        self.__combination_counts = np.bincount(inverse, weights=counts,
+                                                minlength=len(self.__combination_masks)).astype(np.int64)
+        self.__combination_revenue = np.bincount(inverse, weights=revenues, minlength=len(self.__combination_masks))
+
+    def extend(self, genres_column, revenue, encoding=None):
+        """
+        Add new films to the index (e.g., after new rows are appended to the dataset).
+
+        Arguments
+        ---------
+        genres_column : pandas.core.series.Series
+            The column containing the list of genres of each new film.
+        revenue : pandas.core.series.Series
+            The column containing the revenue of each new film.
+        encoding : tuple
+            The rows, codes and genres of genres_column, if they have already been obtained with explode_category
+            (e.g., by dash_app.parallel_aggregation_module.aggregate_in_parallel). Default is None.
+
+        """
+        film_masks = self.__encode(genres_column, encoding)
+        revenue = np.asarray(revenue, dtype=np.float64)
+        self.__film_masks = np.concatenate((self.__film_masks, film_masks))
+        self.__revenue = np.concatenate((self.__revenue, revenue))
+        self.__add_combinations(film_masks, revenue)
+
+    def __query_mask(self, masks, include, exclude):
+        """
+        Check which bitmasks contain all the included genres and none of the excluded genres.
+
+        Arguments
+        ---------
+        masks : numpy.ndarray
+            The bitmasks that are to be checked.
+        include : list
+            The genres that must appear. If a genre is not in the index, no bitmask matches.
+        exclude : list
+            The genres that must not appear. Genres that are not in the index are ignored.
+
+        Returns
+        -------
+        numpy.ndarray
+            A boolean array (True for the bitmasks that match).
+
+        """
+        include = include or ()
+        exclude = exclude or ()
+        if any(genre not in self.__bits for genre in include):
+            return np.zeros(len(masks), dtype=bool)
+
+        include_mask = np.uint64(0)
+        for genre in include:
+            include_mask |= self.__bits[genre]
+        exclude_mask = np.uint64(0)
+        for genre in exclude:
+            exclude_mask |= self.__bits.get(genre, np.uint64(0))
+
+        return ((masks & include_mask) == include_mask) & ((masks & exclude_mask) == 0)
+
+    def film_mask(self, include=(), exclude=()):
+        """
+        Get a boolean array that selects the films that contain all the genres in include and none of the genres in
+        exclude (it can be used to filter the rows of the dataframe the index was created from).
+
+        Arguments
+        ---------
+        include : list
+            The genres that the films must have (AND). Default is an empty tuple.
+        exclude : list
+            The genres that the films must not have. Default is an empty tuple.
+
+        Returns
+        -------
+        numpy.ndarray
+            A boolean array with one element per film.
+
+        """
+        return self.__query_mask(self.__film_masks, include, exclude)
+
+    def stats(self, include=(), exclude=()):
+        """
+        Get the revenue statistics of the films that contain all the genres in include and none of the genres in
+        exclude.
+
+        Arguments
+        ---------
+        include : list
+            The genres that the films must have (AND). Default is an empty tuple.
+        exclude : list
+            The genres that the films must not have. Default is an empty tuple.
+
+        Returns
+        -------
+        dict
+            The Number of Movies, the (overall) Revenue and the Mean Revenue of the matching films. The Mean Revenue is
+            None if no films match.
+
+        """
+        matches = self.__query_mask(self.__combination_masks, include, exclude)
+        number_of_movies = int(self.__combination_counts[matches].sum())
+        revenue = float(self.__combination_revenue[matches].sum())
+
+        return {'Number of Movies': number_of_movies, 'Revenue': revenue,
+                'Mean Revenue': revenue / number_of_movies if number_of_movies else None}
+
+    @property
+    def genres(self):
+        """Getter method to obtain the (alphabetically sorted) genres included in the index"""
+        return sorted(self.__bits)
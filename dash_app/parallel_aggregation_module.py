@@ -0,0 +1,303 @@
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+from dash_app.aggregation_module import CategoryAccumulator, category_statistics, explode_category
+
+# Rows (after splitting the lists of columns such as Genres) below which a job is not split into more tasks, as starting
+# a task would take longer than aggregating the rows
+MIN_ROWS_PER_TASK = 200000
+
+
+def share_array(array, segments):
+    """
+    Copy a numpy array into a new shared memory segment, so that worker processes can read it without it being pickled.
+
+    Arguments
+    ---------
+    array : numpy.ndarray
+        The array to be shared.
+    segments : list
+        The list the created segment (multiprocessing.shared_memory.SharedMemory) is appended to, so that it can be
+        released once the workers have finished.
+
+    Returns
+    -------
+    tuple
+        The name of the segment, the shape and the dtype of the array (everything attach_array needs).
+
+    """
+    array = np.ascontiguousarray(array)
+    segment = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    segments.append(segment)
+    np.ndarray(array.shape, dtype=array.dtype, buffer=segment.buf)[...] = array
+    return segment.name, array.shape, array.dtype.str
+
+
+def attach_array(descriptor):
+    """
+    Open an array shared with share_array, or memory-map an array stored in a file.
+
+    Arguments
+    ---------
+    descriptor : tuple
+        The name of the segment, the shape and the dtype of the array, or the path of the file, the offset of the
+        array in it, the shape and the dtype (e.g., as returned by
+        dash_app.dataset_cache_module.stored_array_location).
+
+    Returns
+    -------
+    segment : multiprocessing.shared_memory.SharedMemory or mmap.mmap
+        The segment or memory map. It must be closed once the array is no longer used.
+    array : numpy.ndarray
+        The array (a view of the segment, not a copy).
+
+    """
+    if len(descriptor) == 4:
+        path, offset, shape, dtype = descriptor
+        with open(path, 'rb') as mapped_file:
+            segment = mmap.mmap(mapped_file.fileno(), 0, access=mmap.ACCESS_READ)
+        return segment, np.frombuffer(segment, dtype=np.dtype(dtype), count=int(np.prod(shape)),
+                                      offset=offset).reshape(shape)
+
+    name, shape, dtype = descriptor
+    segment = shared_memory.SharedMemory(name=name)
+    return segment, np.ndarray(shape, dtype=np.dtype(dtype), buffer=segment.buf)
+
+
+def read_array(descriptor):
+    """Get a copy of an array given by a descriptor of attach_array"""
+    segment, array = attach_array(descriptor)
+    try:
+        return array.copy()
+    finally:
+        array = None  # The view must be released before the segment is closed
+        segment.close()
+
+
+def aggregate_shared_rows(rows_descriptor, codes_descriptor, value_descriptors, start, end, number_of_elements):
+    """
+    Calculate the statistics of a range of the (exploded) rows of a categorical column. This function is run by the
+    worker processes.
+
+    Arguments
+    ---------
+    rows_descriptor, codes_descriptor : tuple
+        The shared arrays returned by explode_category (the row and the element code of each position).
+    value_descriptors : dict
+        The shared arrays of the values of each variable (one value per row of the dataframe), keyed by variable name.
+    start, end : int
+        The range of positions of rows and codes that are aggregated.
+    number_of_elements : int
+        The number of different elements of the column.
+
+    Returns
+    -------
+    tuple
+        The counts, sums and M2 of each element, as returned by category_statistics.
+
+    """
+    segments = []
+    try:
+        rows_segment, rows = attach_array(rows_descriptor)
+        codes_segment, codes = attach_array(codes_descriptor)
+        segments += [rows_segment, codes_segment]
+        values = {}
+        for variable, descriptor in value_descriptors.items():
+            segment, variable_values = attach_array(descriptor)
+            segments.append(segment)
+            values[variable] = variable_values[rows[start:end]]
+
+        return category_statistics(codes[start:end], values, number_of_elements)
+    finally:
+        rows = codes = variable_values = None  # The views must be released before the segments are closed
+        for segment in segments:
+            segment.close()
+
+
+def encode_shared_rows(flat_descriptors, value_descriptors, start, end):
+    """
+    Encode a range of the rows of a categorical column, whose cells are given as a flattened array of strings (e.g.,
+    the values and offsets stored in a dataset cache file), and calculate their statistics. This function is run by
+    the worker processes, so the column is encoded in parallel.
+
+    Arguments
+    ---------
+    flat_descriptors : tuple
+        The descriptors (see attach_array) of the values and the offsets of the column (the values of row i are
+        values[offsets[i]:offsets[i + 1]]). The offsets are None if every row has a single value.
+    value_descriptors : dict
+        The shared arrays of the values of each variable (one value per row of the dataframe), keyed by variable name.
+    start, end : int
+        The range of rows that are encoded and aggregated.
+
+    Returns
+    -------
+    elements : list
+        The elements found in the range of rows, in order of appearance.
+    codes : numpy.ndarray
+        The code of each value of the range of rows (elements[code] is the element it stands for).
+    counts, sums, m2
+        The statistics of each element, as returned by category_statistics.
+
+    """
+    segments = []
+    try:
+        values_descriptor, offsets_descriptor = flat_descriptors
+        values_segment, flat_values = attach_array(values_descriptor)
+        segments.append(values_segment)
+        if offsets_descriptor is None:
+            rows = np.arange(start, end)
+            flat_values = flat_values[start:end]
+        else:
+            offsets_segment, offsets = attach_array(offsets_descriptor)
+            segments.append(offsets_segment)
+            rows = np.repeat(np.arange(start, end), np.diff(offsets[start:end + 1]))
+            flat_values = flat_values[offsets[start]:offsets[end]]
+        codes, elements = pd.factorize(flat_values.astype(object))
+
+        values = {}
+        for variable, descriptor in value_descriptors.items():
+            segment, variable_values = attach_array(descriptor)
+            segments.append(segment)
+            values[variable] = variable_values[rows]
+
+        return elements.tolist(), codes, *category_statistics(codes, values, len(elements))
+    finally:
+        offsets = flat_values = variable_values = None  # The views must be released before the segments are closed
+        for segment in segments:
+            segment.close()
+
+
+def matching_flat_column(flat_columns, column, number_of_rows):
+    """
+    Get the descriptors of the flattened values and offsets of a column (see
+    dash_app.dataset_cache_module.read_cache_file) if they describe a column with the given number of rows, or None
+    otherwise.
+    """
+    values, offsets = (flat_columns or {}).get(column, (None, None))
+    if values is None or (values[2][0] if offsets is None else offsets[2][0] - 1) != number_of_rows:
+        return None
+    return values, offsets
+
+
+def aggregate_in_parallel(df, jobs, max_workers=None, min_rows_per_task=MIN_ROWS_PER_TASK, flat_columns=None,
+                          encodings=None):
+    """
+    Aggregate several (categorical column, numerical variables) jobs in a pool of processes.
+
+    The numerical variables are copied into shared memory (so the dataframe is never pickled) and every job is split
+    into ranges of rows that are aggregated by the workers. If the flattened strings of a categorical column are
+    stored in a file (flat_columns), the workers memory-map them and each one encodes its own range of rows, returning
+    the elements it found; these vocabularies are merged here in the order of the tasks. Otherwise, the column is
+    encoded here with explode_category and the workers receive its codes through shared memory. The results are merged
+    into one CategoryAccumulator per job. If the dataframe is too small to be split, the jobs are aggregated in this
+    process.
+
+    Arguments
+    ---------
+    df : pandas.core.frame.DataFrame
+        The dataframe that contains the categorical and numerical columns.
+    jobs : list
+        The (column, list_of_variables) pairs to be aggregated (e.g., [('Genres', ['Revenue', 'Rating'])]).
+    max_workers : int
+        The maximum number of processes. Default is None, which means the number of CPUs.
+    min_rows_per_task : int
+        The minimum number of rows of each task. Default is MIN_ROWS_PER_TASK.
+    flat_columns : dict
+        The locations of the (values, offsets) of the categorical columns, as filled by
+        dash_app.dataset_cache_module.read_cache_file. The ones that do not match the rows of df are ignored. Default
+        is None.
+    encodings : dict
+        If given, the rows, codes and elements of each categorical column (in the same format as explode_category) are
+        stored in it, so that the columns do not have to be encoded again (e.g., by the genre index). Default is None.
+
+    Returns
+    -------
+    list
+        The CategoryAccumulator of each job, in the same order as jobs.
+
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    encodings = {} if encodings is None else encodings
+    accumulators = [CategoryAccumulator(column, variables) for column, variables in jobs]
+    columns = list(dict.fromkeys(column for column, _ in jobs))
+    if max_workers == 1 or len(df) < 2 * min_rows_per_task:
+        for accumulator, (column, _) in zip(accumulators, jobs):
+            if column not in encodings:
+                encodings[column] = explode_category(df[column])
+            accumulator.update(df, encodings[column])
+        return accumulators
+
+    flat = {column: matching_flat_column(flat_columns, column, len(df)) for column in columns}
+    flat_offsets = {column: None if flat[column][1] is None else read_array(flat[column][1])
+                    for column in columns if flat[column] is not None}
+    exploded = {column: explode_category(df[column]) for column in columns if flat[column] is None}
+    integer_variables = {variable for _, variables in jobs for variable in variables
+                         if np.issubdtype(df[variable].dtype, np.integer)}
+    segments = []
+    try:
+        value_descriptors = {variable: share_array(df[variable].to_numpy(dtype=np.float64), segments)
+                             for variable in dict.fromkeys(variable for _, variables in jobs for variable in variables)}
+        column_descriptors = {column: (share_array(rows, segments), share_array(codes, segments))
+                              for column, (rows, codes, _) in exploded.items()}
+
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = []
+            for column, variables in jobs:
+                job_values = {variable: value_descriptors[variable] for variable in variables}
+                if column in exploded:
+                    number_of_positions = len(exploded[column][1])
+                    number_of_tasks = max(1, min(max_workers, number_of_positions // min_rows_per_task))
+                    bounds = np.linspace(0, number_of_positions, number_of_tasks + 1).astype(np.int64)
+                    futures.append([executor.submit(aggregate_shared_rows, *column_descriptors[column], job_values,
+                                                    int(start), int(end), len(exploded[column][2]))
+                                    for start, end in zip(bounds[:-1], bounds[1:])])
+                    continue
+
+                # The rows are split so that every task encodes a similar number of values
+                number_of_values, offsets = flat[column][0][2][0], flat_offsets[column]
+                number_of_tasks = max(1, min(max_workers, number_of_values // min_rows_per_task))
+                if offsets is None:
+                    bounds = np.linspace(0, len(df), number_of_tasks + 1).astype(np.int64)
+                else:
+                    bounds = np.searchsorted(offsets, np.linspace(0, number_of_values, number_of_tasks + 1))
+                    bounds[0], bounds[-1] = 0, len(df)
+                futures.append([executor.submit(encode_shared_rows, flat[column], job_values, int(start), int(end))
+                                for start, end in zip(bounds[:-1], bounds[1:])])
+
+            # The tasks are merged in order, so the elements keep the order of their first appearance (the same order
+            # as in a single process)
+            for accumulator, (column, variables), job_futures in zip(accumulators, jobs, futures):
+                if column in exploded:
+                    elements = exploded[column][2]
+                    for future in job_futures:
+                        counts, sums, m2 = future.result()
+                        present = counts > 0
+                        accumulator.add_statistics(list(elements[present]), counts[present],
+                                                   {variable: values[present] for variable, values in sums.items()},
+                                                   {variable: values[present] for variable, values in m2.items()},
+                                                   integer_variables & set(variables))
+                    encodings.setdefault(column, exploded[column])
+                    continue
+
+                # The vocabulary of each task is mapped to the codes of the whole column
+                vocabulary, codes = {}, []
+                for future in job_futures:
+                    elements, task_codes, counts, sums, m2 = future.result()
+                    accumulator.add_statistics(elements, counts, sums, m2, integer_variables & set(variables))
+                    mapping = np.fromiter((vocabulary.setdefault(element, len(vocabulary)) for element in elements),
+                                          dtype=np.int64, count=len(elements))
+                    codes.append(mapping[task_codes])
+                if column not in encodings:
+                    offsets = flat_offsets[column]
+                    rows = np.arange(len(df)) if offsets is None else np.repeat(np.arange(len(df)), np.diff(offsets))
+                    encodings[column] = (rows, np.concatenate(codes), np.asarray(list(vocabulary), dtype=object))
+    finally:
+        for segment in segments:
+            segment.close()
+            segment.unlink()
+
+    return accumulators
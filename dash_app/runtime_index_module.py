@@ -0,0 +1,146 @@
+import numpy as np
+import pandas as pd
+
+
+class RuntimeIndex:
+    """
+    A class that keeps the runtimes of the films sorted, along with their revenue and the cumulative revenue in that
+    order (prefix sums), so that the films can be binned in any way without going through them: the number of films and
+    the overall revenue of a bin are the difference between the positions and prefix sums at its edges, which are found
+    with a binary search. Hence, binning takes O(bins * log(films)).
+
+    Arguments
+    ---------
+    runtime : pandas.core.series.Series
+        The column containing the runtime of each film.
+    revenue : pandas.core.series.Series
+        The column containing the revenue of each film.
+
+    Attributes
+    ----------
+    __runtimes : numpy.ndarray
+        The sorted runtimes (films without runtime are not included).
+    __revenue : numpy.ndarray
+        The revenue of each film of __runtimes.
+    __cumulative_revenue : numpy.ndarray
+        The overall revenue of the films before each position of __runtimes (it has one more element, the first one
+        being 0).
+
+    Methods
+    -------
+    from_arrays
+        Create an index from the arrays returned by to_arrays.
+    to_arrays
+        Get the arrays of the index.
+    extend
+        Add new films to the index.
+    bins
+        Get the number of films and the overall and mean revenue of each bin.
+    runtime_range
+        Getter method to obtain the smallest and largest runtimes.
+
+    """
+
+    def __init__(self, runtime, revenue):
+        """Create an instance of the class"""
+        self.__runtimes = np.zeros(0)
+        self.__revenue = np.zeros(0)
+        self.__cumulative_revenue = np.zeros(1)
+        self.extend(runtime, revenue)
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """Create an index from the arrays returned by to_arrays (they are not copied, so they can be memory-mapped)"""
+        index = cls.__new__(cls)
+        index.__runtimes = arrays['runtimes']
+        index.__revenue = arrays['revenue']
+        index.__cumulative_revenue = arrays['cumulative_revenue']
+        return index
+
+    def to_arrays(self):
+        """Get the arrays of the index (the sorted runtimes, their revenue and the prefix sums), keyed by name"""
+        return {'runtimes': self.__runtimes, 'revenue': self.__revenue, 'cumulative_revenue': self.__cumulative_revenue}
+
+    def extend(self, runtime, revenue):
+        """
+        Add new films to the index (e.g., after new rows are appended to the dataset). The new films are sorted and
+        merged with the existing ones, so the films in the index are not sorted again, and the prefix sums are only
+        computed again from the position of the first new film.
+
+        Arguments
+        ---------
+        runtime : pandas.core.series.Series
+            The column containing the runtime of each new film.
+        revenue : pandas.core.series.Series
+            The column containing the revenue of each new film.
+
+        """
+        runtime = np.asarray(runtime, dtype=np.float64)
+        revenue = np.asarray(revenue, dtype=np.float64)
+        valid = ~np.isnan(runtime)
+        order = np.argsort(runtime[valid], kind='stable')
+        new_runtimes, new_revenue = runtime[valid][order], revenue[valid][order]
+        if not len(new_runtimes):
+            return
+
+        # Position of each new film in the merged array: its position among the new films plus the number of existing
+        # films that go before it
+        positions = np.arange(len(new_runtimes)) + np.searchsorted(self.__runtimes, new_runtimes, side='right')
+        merged_runtimes = np.empty(len(self.__runtimes) + len(new_runtimes))
+        merged_revenue = np.empty(len(merged_runtimes))
+        existing = np.ones(len(merged_runtimes), dtype=bool)
+        existing[positions] = False
+        merged_runtimes[positions], merged_revenue[positions] = new_runtimes, new_revenue
+        merged_runtimes[existing] = self.__runtimes
+        merged_revenue[existing] = self.__revenue
+
+        # The prefix sums before the first new film do not change
+        first = positions[0]
+        self.__runtimes, self.__revenue = merged_runtimes, merged_revenue
+        unchanged = self.__cumulative_revenue[:first + 1]
+        self.__cumulative_revenue = np.concatenate((unchanged, unchanged[-1] + np.cumsum(merged_revenue[first:])))
+
+    def bins(self, number_of_bins, low=None, high=None):
+        """
+        Get the number of films and the overall and mean revenue of each of number_of_bins bins of equal width between
+        low and high.
+
+        Arguments
+        ---------
+        number_of_bins : int
+            The number of bins.
+        low, high : float
+            The range of runtimes that is binned. Films outside of it are not included. Default is None, which means
+            the smallest (or largest) runtime.
+
+        Returns
+        -------
+        pandas.core.frame.DataFrame
+            A dataframe with the start and end of each bin (Runtime and Runtime End), the Number of Movies, the Revenue
+            and the Mean Revenue (only the bins with films are included).
+
+        """
+        smallest, largest = self.runtime_range
+        low = smallest if low is None else low
+        high = largest if high is None else high
+        if high <= low:
+            high = low + 1
+
+        edges = np.linspace(low, high, max(int(number_of_bins), 1) + 1)
+        # Every bin is half-open except the last one, as in numpy.histogram
+        positions = np.searchsorted(self.__runtimes, edges, side='left')
+        positions[-1] = np.searchsorted(self.__runtimes, high, side='right')
+        counts = np.diff(positions)
+        sums = np.diff(self.__cumulative_revenue[positions])
+        present = counts > 0
+
+        return pd.DataFrame({'Runtime': edges[:-1][present], 'Runtime End': edges[1:][present],
+                             'Number of Movies': counts[present], 'Revenue': sums[present],
+                             'Mean Revenue': sums[present] / counts[present]})
+
+    @property
+    def runtime_range(self):
+        """Getter method to obtain the smallest and largest runtimes in the index (0 and 0 if it is empty)"""
+        if not len(self.__runtimes):
+            return 0.0, 0.0
+        return float(self.__runtimes[0]), float(self.__runtimes[-1])
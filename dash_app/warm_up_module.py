@@ -0,0 +1,162 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class WarmUp:
+    """
+    A class that prepares the dashboard (e.g., loads the dataset and creates the figures) by running a series of steps,
+    either in the current thread or in a background thread, and keeps track of its progress, so that the rest of the
+    app can be served while the dashboard is being prepared.
+
+    Attributes
+    ----------
+    __state : str
+        'pending' (the steps have not started), 'running', 'ready' or 'failed'.
+    __steps : list
+        The names of the steps.
+    __completed : int
+        The number of steps that have been completed.
+    __error : str
+        The description of the exception raised by the step that failed (None if no step has failed).
+    __started, __finished : float
+        The time (time.perf_counter) at which the steps started and finished (None if they have not).
+    __done : threading.Event
+        Event that is set when all the steps have finished (or one of them has failed).
+    __lock : threading.Lock
+        Lock used to read the progress while it is being updated by another thread.
+
+    Methods
+    -------
+    run
+        Run the steps in the current thread.
+    start
+        Run the steps in a background thread.
+    wait
+        Wait until the steps have finished.
+    ready
+        Getter method to obtain whether all the steps have been completed.
+    status
+        Getter method to obtain the state and progress of the steps.
+
+    """
+
+    def __init__(self):
+        """Create an instance of the class"""
+        self.__state = 'pending'
+        self.__steps = []
+        self.__completed = 0
+        self.__error = None
+        self.__started = None
+        self.__finished = None
+        self.__done = threading.Event()
+        self.__lock = threading.Lock()
+
+    def run(self, steps):
+        """
+        Run the steps in the current thread, in order. If a step raises an exception, the remaining steps are not run
+        and the state becomes 'failed'.
+
+        Arguments
+        ---------
+        steps : list
+            The steps, as (name, function) tuples. The functions are called without arguments.
+
+        Returns
+        -------
+        bool
+            Whether all the steps were completed.
+
+        """
+        with self.__lock:
+            if self.__state != 'pending':
+                raise RuntimeError('The warm-up has already been started')
+            self.__state = 'running'
+            self.__steps = [name for name, _ in steps]
+            self.__started = time.perf_counter()
+
+        try:
+            for name, function in steps:
+                function()
+                with self.__lock:
+                    self.__completed += 1
+        except Exception as error:
+            logger.exception('The warm-up failed at the step: %s', self.__steps[self.__completed])
+            with self.__lock:
+                self.__state = 'failed'
+                self.__error = f'{type(error).__name__}: {error}'
+                self.__finished = time.perf_counter()
+        else:
+            with self.__lock:
+                self.__state = 'ready'
+                self.__finished = time.perf_counter()
+        finally:
+            self.__done.set()
+
+        return self.__state == 'ready'
+
+    def start(self, steps):
+        """
+        Run the steps in a background (daemon) thread.
+
+        Arguments
+        ---------
+        steps : list
+            The steps, as (name, function) tuples.
+
+        Returns
+        -------
+        threading.Thread
+            The thread that was started.
+
+        """
+        thread = threading.Thread(target=self.run, args=(steps,), name='dashboard-warm-up', daemon=True)
+        thread.start()
+        return thread
+
+    def wait(self, timeout=None):
+        """
+        Wait until the steps have finished (or one of them has failed).
+
+        Arguments
+        ---------
+        timeout : float
+            The maximum number of seconds to wait. Default is None, which means there is no limit.
+
+        Returns
+        -------
+        bool
+            Whether all the steps were completed.
+
+        """
+        self.__done.wait(timeout)
+        return self.ready
+
+    @property
+    def ready(self):
+        """Getter method to obtain whether all the steps have been completed"""
+        return self.__state == 'ready'
+
+    @property
+    def status(self):
+        """
+        Getter method to obtain the state and progress of the steps.
+
+        Returns
+        -------
+        dict
+            The state, the number of completed and total steps, the fraction of completed steps, the name of the step
+            that is running (None if no step is running), the error (None if no step has failed) and the seconds since
+            the steps started (until they finished).
+
+        """
+        with self.__lock:
+            total = len(self.__steps)
+            running = self.__state == 'running' and self.__completed < total
+            end = self.__finished if self.__finished is not None else time.perf_counter()
+            return {'state': self.__state, 'completed_steps': self.__completed, 'total_steps': total,
+                    'progress': self.__completed / total if total else float(self.__state == 'ready'),
+                    'current_step': self.__steps[self.__completed] if running else None, 'error': self.__error,
+                    'elapsed_seconds': end - self.__started if self.__started is not None else 0.0}
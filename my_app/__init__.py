@@ -2,12 +2,16 @@ from flask import Flask
 from flask_wtf.csrf import CSRFProtect
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, login_required
+from my_app.compression import Compress
+from my_app.metrics import Metrics
 
 
 csrf = CSRFProtect()
 csrf._exempt_views.add('dash.dash.dispatch')  # Exclude dash from CSRFProtect
 db = SQLAlchemy()
 login_manager = LoginManager()
+compress = Compress()
+metrics = Metrics()
 
 
 def create_app(config_class_name):
@@ -31,15 +35,20 @@ def create_app(config_class_name):
     db.init_app(app)
     login_manager.login_view = 'auth.login'
     login_manager.init_app(app)
+    compress.init_app(app)
+    metrics.init_app(app)  # Initialized after compress, so the size of the responses is recorded before compression
 
     with app.app_context():
         # Import Dash application
         from dash_app.dash import init_dashboard
         d_app = init_dashboard(app)
         _protect_dash_views(d_app)
+        metrics.instrument_dash(d_app)
 
         from my_app.models import User
+        from my_app.schema import upgrade_schema
         db.create_all()
+        upgrade_schema()  # Add the columns and indexes that databases created with older models do not have
 
     from my_app.auth.routes import auth_bp
     from my_app.main.routes import main_bp
@@ -0,0 +1,222 @@
+import collections
+import gzip
+import hashlib
+import threading
+from flask import request
+
+try:  # Brotli is used if it is installed, otherwise the responses are only compressed with gzip
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+
+class Compress:
+    """
+    A Flask extension that compresses the responses (e.g., the Jinja pages and the JSON of the Dash component updates)
+    with Brotli or gzip, depending on the Accept-Encoding header of the request.
+
+    Only successful responses whose content type is in the COMPRESS_MIMETYPES allowlist and whose size is at least
+    COMPRESS_MIN_SIZE bytes are compressed. The compressed bytes are stored in a small LRU cache, so that payloads that
+    are sent many times (e.g., the figures sent by the Dash component updates, which are the same for every user) are
+    only compressed once. Responses with a strong ETag are keyed by their path and ETag, and responses whose content
+    type is in COMPRESS_CACHE_MIMETYPES (JSON by default) by the SHA-256 hash of their content, which is much cheaper
+    than compressing it. The rest of responses (e.g., the Jinja pages, which are different for each user) are compressed
+    without using the cache, so they do not evict the payloads that are reused.
+
+    Configuration (read from the app configuration by init_app):
+        COMPRESS_ENABLED, COMPRESS_ALGORITHMS (in order of preference), COMPRESS_MIMETYPES, COMPRESS_MIN_SIZE,
+        COMPRESS_BROTLI_QUALITY, COMPRESS_GZIP_LEVEL, COMPRESS_CACHE_SIZE and COMPRESS_CACHE_MIMETYPES.
+
+    Arguments
+    ---------
+    app : flask.app.Flask
+        The app whose responses are compressed. Default is None, which means init_app must be called later.
+
+    Attributes
+    ----------
+    __cache : collections.OrderedDict
+        The compressed bytes, keyed by (key of the content, encoding), from least to most recently used.
+    __cache_size : int
+        The maximum number of entries of __cache.
+    __lock : threading.Lock
+        Lock used to modify __cache from several threads.
+
+    Methods
+    -------
+    init_app
+        Register the compression of the responses of an app.
+    __choose_encoding
+        Choose the encoding of a response from the Accept-Encoding header of the request.
+    __compress
+        Compress some content, reusing the cached bytes if it has already been compressed.
+    __compress_content
+        Compress some content without using the cache.
+    __compress_response
+        Compress a response, if it can be compressed.
+    cache_info
+        Getter method to obtain the number of entries and size of the cache of compressed content.
+
+    """
+
+    def __init__(self, app=None):
+        """Create an instance of the class"""
+        self.__cache = collections.OrderedDict()
+        self.__cache_size = 0
+        self.__lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Set the default configuration of the extension and compress the responses of the app after each request.
+
+        Arguments
+        ---------
+        app : flask.app.Flask
+            The app whose responses are compressed.
+
+        """
+        app.config.setdefault('COMPRESS_ENABLED', True)
+        app.config.setdefault('COMPRESS_ALGORITHMS', ['br', 'gzip'])
+        app.config.setdefault('COMPRESS_MIMETYPES', ['text/html', 'text/css', 'text/plain', 'text/javascript',
+                                                     'application/javascript', 'application/json', 'image/svg+xml'])
+        app.config.setdefault('COMPRESS_MIN_SIZE', 500)
+        app.config.setdefault('COMPRESS_BROTLI_QUALITY', 4)
+        app.config.setdefault('COMPRESS_GZIP_LEVEL', 6)
+        app.config.setdefault('COMPRESS_CACHE_SIZE', 128)
+        app.config.setdefault('COMPRESS_CACHE_MIMETYPES', ['application/json'])
+        self.__cache_size = app.config['COMPRESS_CACHE_SIZE']
+
+        if app.config['COMPRESS_ENABLED']:
+            app.after_request(lambda response: self.__compress_response(app.config, response))
+
+    @staticmethod
+    def __choose_encoding(config):
+        """
+        Choose the encoding of the response from the Accept-Encoding header of the request: the available algorithm
+        with the highest quality value (ties are broken by the order of COMPRESS_ALGORITHMS).
+
+        Arguments
+        ---------
+        config : flask.config.Config
+            The configuration of the app.
+
+        Returns
+        -------
+        str
+            The encoding ('br' or 'gzip'), or None if the client does not accept any of the algorithms.
+
+        """
+        algorithms = [algorithm for algorithm in config['COMPRESS_ALGORITHMS']
+                      if algorithm == 'gzip' or (algorithm == 'br' and BROTLI_AVAILABLE)]
+        # The algorithm with the highest quality is chosen, and ties are broken by the order of preference
+        encoding = max(algorithms, default=None,
+                       key=lambda algorithm: (request.accept_encodings.quality(algorithm),
+                                              -algorithms.index(algorithm)))
+        if encoding is None or request.accept_encodings.quality(encoding) <= 0:
+            return None
+
+        return encoding
+
+    def __compress(self, config, content, key, encoding):
+        """
+        Compress some content with an encoding. If content with the same key has already been compressed with the same
+        encoding, the cached bytes are returned. Content without a key is compressed without using the cache.
+
+        Arguments
+        ---------
+        config : flask.config.Config
+            The configuration of the app.
+        content : bytes
+            The content that is to be compressed.
+        key : tuple
+            The key of the content (the path and strong ETag of the response, or the hash of the content), or None if
+            it is not cached.
+        encoding : str
+            The encoding ('br' or 'gzip').
+
+        Returns
+        -------
+        bytes
+            The compressed content.
+
+        """
+        if key is None or self.__cache_size <= 0:
+            return self.__compress_content(config, content, encoding)
+
+        with self.__lock:
+            compressed = self.__cache.get((key, encoding))
+            if compressed is not None:
+                self.__cache.move_to_end((key, encoding))
+                return compressed
+
+        compressed = self.__compress_content(config, content, encoding)
+        with self.__lock:
+            self.__cache[(key, encoding)] = compressed
+            while len(self.__cache) > self.__cache_size:
+                self.__cache.popitem(last=False)
+
+        return compressed
+
+    @staticmethod
+    def __compress_content(config, content, encoding):
+        """Compress some content with an encoding ('br' or 'gzip'), using the level set in the configuration"""
+        if encoding == 'br':
+            return brotli.compress(content, quality=config['COMPRESS_BROTLI_QUALITY'])
+        return gzip.compress(content, compresslevel=config['COMPRESS_GZIP_LEVEL'], mtime=0)
+
+    def __compress_response(self, config, response):
+        """
+        Compress a response, if it is successful, it has not been compressed yet, its content type is in the allowlist
+        and it is not smaller than the threshold (and the client accepts one of the algorithms).
+
+        Arguments
+        ---------
+        config : flask.config.Config
+            The configuration of the app.
+        response : flask.wrappers.Response
+            The response.
+
+        Returns
+        -------
+        flask.wrappers.Response
+            The same response (compressed, if possible).
+
+        """
+        if response.mimetype not in config['COMPRESS_MIMETYPES']:
+            return response
+        response.vary.add('Accept-Encoding')  # Caches must store a version of the response for each encoding
+
+        # Files are sent directly from disk, so their content cannot be compressed here
+        if (response.status_code != 200 or response.direct_passthrough or response.is_streamed or
+                'Content-Encoding' in response.headers or response.content_length is None or
+                response.content_length < config['COMPRESS_MIN_SIZE']):
+            return response
+
+        encoding = self.__choose_encoding(config)
+        if encoding is None:
+            return response
+
+        content = response.get_data()
+        etag, weak = response.get_etag()
+        # A strong ETag identifies the content without hashing it. Otherwise, only the content types that are usually
+        # sent many times (e.g., the JSON of the figures) are hashed and cached
+        if etag and not weak:
+            key = ('etag', request.path, etag)
+        elif response.mimetype in config['COMPRESS_CACHE_MIMETYPES']:
+            key = ('sha256', hashlib.sha256(content).digest())
+        else:
+            key = None
+        response.set_data(self.__compress(config, content, key, encoding))
+        response.headers['Content-Encoding'] = encoding
+        if etag and not weak:  # The compressed bytes are not the same as the original ones, so the ETag becomes weak
+            response.set_etag(etag, weak=True)
+
+        return response
+
+    @property
+    def cache_info(self):
+        """Getter method to obtain the number of entries and the size (in bytes) of the cache of compressed content"""
+        with self.__lock:
+            return {'entries': len(self.__cache), 'bytes': sum(len(value) for value in self.__cache.values())}
@@ -8,20 +8,59 @@ class Config(object):
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     DATA_PATH = pathlib.Path(__file__).parent.parent.joinpath("my_app")
     SQLALCHEMY_DATABASE_URI = 'sqlite:///' + str(DATA_PATH.joinpath('example.sqlite'))
+    # Load the dataset of the dashboard in a background thread, so the rest of the app is served while it is loaded (the
+    # graph pages display a "preparing" page and GET /ready returns 503 until it finishes)
+    DASH_BACKGROUND_WARM_UP = False
+    # Switch the dashboard figures in the browser (the variants are sent once per page) instead of on the server
+    DASH_CLIENTSIDE_SWITCHING = False
+    # Seconds between the checks for changes in the dataset file (0 disables the watcher) and the token required by
+    # POST /dash_app/reload (None disables the route)
+    DATASET_WATCH_INTERVAL = 0
+    DATASET_RELOAD_TOKEN = None
+    # Maximum number of points of the revenue over time line (graph 3). Longer lines are downsampled
+    DASH_REVENUE_MAX_POINTS = 2000
+    # Compression of the responses (Brotli, or gzip if the client does not accept it). Only the content types in the
+    # allowlist and responses of at least COMPRESS_MIN_SIZE bytes are compressed, and the compressed bytes of the last
+    # COMPRESS_CACHE_SIZE payloads with a strong ETag or a content type in COMPRESS_CACHE_MIMETYPES (e.g., the figures)
+    # are reused
+    COMPRESS_ENABLED = True
+    COMPRESS_ALGORITHMS = ['br', 'gzip']
+    COMPRESS_MIMETYPES = ['text/html', 'text/css', 'text/plain', 'text/javascript', 'application/javascript',
+                          'application/json', 'image/svg+xml']
+    COMPRESS_MIN_SIZE = 500
+    COMPRESS_BROTLI_QUALITY = 4
+    COMPRESS_GZIP_LEVEL = 6
+    COMPRESS_CACHE_SIZE = 128
+    COMPRESS_CACHE_MIMETYPES = ['application/json']
+    # Prometheus endpoint with the latency, response size and calls of the Flask views and Dash callbacks. The token
+    # must be sent as a bearer token. Without a token, the endpoint is only registered if METRICS_ALLOW_PUBLIC is set
+    METRICS_ENABLED = True
+    METRICS_PATH = '/metrics'
+    METRICS_TOKEN = None
+    METRICS_ALLOW_PUBLIC = False
+    # Number of messages of a chat displayed when it is opened (and loaded each time older messages are requested)
+    MESSAGES_PAGE_SIZE = 50
+    # Number of chats listed on each page of the messages page (the older chats are listed on the next pages)
+    INBOX_PAGE_SIZE = 100
+    # Fraction of the navigations between dashboard pages that are logged
+    DASH_NAVIGATION_LOG_SAMPLE_RATE = 0.1
 
 
 class ProductionConfig(Config):
     """Production configuration class."""
     TESTING = False
+    DASH_BACKGROUND_WARM_UP = True
 
 
 class DevelopmentConfig(Config):
     """Development configuration class."""
     TESTING = False
     SQLALCHEMY_ECHO = True
+    METRICS_ALLOW_PUBLIC = True
 
 
 class TestingConfig(Config):
     """Testing configuration class."""
     TESTING = True
     SQLALCHEMY_ECHO = True
+    METRICS_ALLOW_PUBLIC = True
@@ -1,90 +1,107 @@
 from flask_login import current_user
 from my_app.models import User, Message, Chat, LastTimeChecked
 from my_app import db
-from sqlalchemy import desc
+from sqlalchemy.dialects import postgresql, sqlite
 from datetime import datetime
-import time
 
 
-def check_if_unread_chat(chat, time_check):
+def check_if_unread():
     """
-    Check if a specific chat has unread messages.
-
-    Arguments
-    ---------
-    chat : my_app.models.Chat
-        The chat that is to be checked.
-    time_check : my_app.models.LastTimeChecked
-        The model containing the information about the last time the chat was checked by the user.
+    Check if the user has any unread messages. The number of unread messages of each chat is stored in the time checks,
+    so this is a single EXISTS query (on the indexed user_id).
 
     Returns
     -------
     bool
-        True if the chat has any unread messages, otherwise False.
+        True if the user has any unread messages, otherwise False.
 
     """
-    # Get the last message that was stored in the chat
-    last_message = Message.query.filter_by(chat_id=chat.id).order_by(desc('post_time')).first()
-
-    # If there is a last message and it was posted after the last time the chat was checked
-    if last_message and last_message.post_time > time_check.time:
-        return True
-    else:
-        return False
+    unread_time_checks = LastTimeChecked.query.filter(LastTimeChecked.user_id == current_user.id,
+                                                      LastTimeChecked.unread_count > 0)
+    return db.session.query(unread_time_checks.exists()).scalar()
 
 
-def check_if_unread():
+def mark_chat_as_read(time_check):
     """
-    Check if the user has any unread messages.
+    Record that the user has just checked a chat, so it has no unread messages (the change is not committed).
 
-    Returns
-    -------
-    bool
-        True if the user has any unread messages, otherwise False.
+    Arguments
+    ---------
+    time_check : my_app.models.LastTimeChecked
+        The time check of the chat by the user.
 
     """
-    # Obtain the time checks of all the user's chats
-    time_checks = LastTimeChecked.query.filter_by(user_id=current_user.id).all()
+    time_check.time = datetime.now()
+    time_check.unread_count = 0
 
-    for time_check in time_checks:
-        chat = Chat.query.get(time_check.chat_id)  # Get the chat associated with the time check
-        if check_if_unread_chat(chat, time_check):
-            return True
 
-    return False
+def get_pair_key(user_1_id, user_2_id):
+    """Get the key of the chat between two users, which does not depend on their order (the lowest id goes first)"""
+    low, high = sorted((int(user_1_id), int(user_2_id)))
+    return f'{low}_{high}'
 
 
-def create_chat_and_time_checks(user_id):
+def create_chat_and_time_checks(user_id, pair_key):
     """
-    Create a chat between the current user and another user, and a time check of the chat for each of the users.
+    Create a chat between the current user and another user, and a time check of the chat for each of the users, in a
+    single transaction. The chat is inserted with ON CONFLICT DO NOTHING on its pair key, so if the other user creates
+    the same chat at the same time, only one of them is stored.
 
     Arguments
     ---------
     user_id : str
         The id of the user with whom the current user wants to chat.
+    pair_key : str
+        The pair key of the two users (see get_pair_key).
 
     Returns
     -------
     chat : my_app.models.Chat
-        The created chat between the two users.
+        The created chat between the two users (None if the chat was created by another request).
     time_check_current_user : my_app.models.LastTimeChecked
-        The time check of the chat for the current user.
+        The time check of the chat for the current user (None if the chat was created by another request).
 
     """
-    # Create and commit the chat
-    chat = Chat(user_1_id=current_user.id, user_2_id=user_id)
-    db.session.add(chat)
+    insert = postgresql.insert if db.engine.dialect.name == 'postgresql' else sqlite.insert
+    statement = (insert(Chat)
+                 .values(user_1_id=current_user.id, user_2_id=int(user_id), pair_key=pair_key)
+                 .on_conflict_do_nothing(index_elements=[Chat.pair_key])
+                 .returning(Chat.id))
+    chat_id = db.session.execute(statement).scalar()
+    if chat_id is None:  # The chat already exists
+        db.session.rollback()
+        return None, None
+
+    # Create the time checks and commit them along with the chat
+    time_check_current_user = LastTimeChecked(time=datetime.now(), chat_id=chat_id, user_id=current_user.id)
+    time_check_user_2 = LastTimeChecked(time=datetime.now(), chat_id=chat_id, user_id=user_id)
+    db.session.add_all([time_check_current_user, time_check_user_2])
     db.session.commit()
 
-    # Create and commit the time checks
-    time_check_current_user = LastTimeChecked(time=datetime.now(), chat_id=chat.id,
-                                              user_id=current_user.id)
-    time_check_user_2 = LastTimeChecked(time=datetime.now(), chat_id=chat.id, user_id=user_id)
-    db.session.add(time_check_current_user)
-    db.session.add(time_check_user_2)
-    db.session.commit()
+    return db.session.get(Chat, chat_id), time_check_current_user
 
-    return chat, time_check_current_user
+
+def find_chat_and_time_check(pair_key):
+    """
+    Find the chat with a pair key and the time check of the chat by the current user, with a single query.
+
+    Arguments
+    ---------
+    pair_key : str
+        The pair key of the two users of the chat (see get_pair_key).
+
+    Returns
+    -------
+    tuple
+        The chat (my_app.models.Chat) and the time check (my_app.models.LastTimeChecked), or None if the chat does not
+        exist.
+
+    """
+    return (db.session.query(Chat, LastTimeChecked)
+            .outerjoin(LastTimeChecked, db.and_(LastTimeChecked.chat_id == Chat.id,
+                                                LastTimeChecked.user_id == current_user.id))
+            .filter(Chat.pair_key == pair_key)
+            .first())
 
 
 def get_chat_and_time_check(user_id):
@@ -105,174 +122,159 @@ def get_chat_and_time_check(user_id):
         The time check of the chat by the current user.
 
     """
-    # If the chat between the two users already exists, get it and the time check
-    if Chat.query.filter_by(user_1_id=current_user.id, user_2_id=user_id).first() is not None:
-        chat = Chat.query.filter_by(user_1_id=current_user.id, user_2_id=user_id).first()
-        time_check_current_user = LastTimeChecked.query.filter_by(chat_id=chat.id, user_id=current_user.id).first()
-    elif Chat.query.filter_by(user_1_id=user_id, user_2_id=current_user.id).first() is not None:
-        chat = Chat.query.filter_by(user_1_id=user_id, user_2_id=current_user.id).first()
-        time_check_current_user = LastTimeChecked.query.filter_by(chat_id=chat.id, user_id=current_user.id).first()
-
-    else:  # If the chat does not exist, create it and the time checks for both users.
-        chat, time_check_current_user = create_chat_and_time_checks(user_id)
-
-    return chat, time_check_current_user
-
-
-def get_user_chats():
-    """
-    Get all the chats associated with the current user.
+    pair_key = get_pair_key(current_user.id, user_id)
+    found = find_chat_and_time_check(pair_key)
+    if found is None:  # If the chat does not exist, create it and the time checks for both users
+        chat, time_check_current_user = create_chat_and_time_checks(user_id, pair_key)
+        if chat is not None:
+            return chat, time_check_current_user
 
-    Returns
-    -------
-    list[my_app.models.Chat]
-        The list of all the current user's chats.
+        found = find_chat_and_time_check(pair_key)  # The other user has just created it
 
-    """
-    user_chats_1 = Chat.query.filter_by(user_1_id=current_user.id).all()
-    user_chats_2 = Chat.query.filter_by(user_2_id=current_user.id).all()
-    user_chats = user_chats_1 + user_chats_2
+    chat, time_check_current_user = found
+    if time_check_current_user is None:  # The time check is missing, so it is created (it is committed by the caller)
+        time_check_current_user = LastTimeChecked(time=datetime.now(), chat_id=chat.id, user_id=current_user.id)
+        db.session.add(time_check_current_user)
 
-    return user_chats
+    return chat, time_check_current_user
 
 
-def get_chats_info(user_chats):
+def get_chat(user_id):
     """
-    Get information about the users, last messages and whether or not there are any unread messages for each of the
-    current user's chats.
+    Get the chat between the current user and another user, without creating it.
 
     Arguments
     ---------
-    user_chats : list[my_app.models.Chat]
-        List of the current user's chats.
+    user_id : int
+        The id of the other user involved in the chat.
 
     Returns
     -------
-    users : list[my_app.models.User]
-        List of users that the current user has a chat with.
-    messages : list[my_app.models.Message]
-        List containing the last messages in each of the chats (can be None if the chat has no messages).
-    unread_chats : list[bool]
-        A list containing boolean values. If a chat has unread messages True will be appended, otherwise False.
+    my_app.models.Chat
+        The chat between the two users, or None if it does not exist.
 
     """
-    users, messages, unread_chats = ([] for i in range(3))  # Initialize the lists
-    for chat in user_chats:
-        # Get the id of the other user involved in the chat
-        id_other_user = chat.user_1_id if chat.user_1_id != current_user.id else chat.user_2_id
-        other_user = User.query.get(id_other_user)
-        users.append(other_user)
-
-        # Obtain the last message in the chat
-        last_message = Message.query.filter_by(chat_id=chat.id).order_by(desc('post_time')).first()
-        messages.append(last_message)
+    return Chat.query.filter_by(pair_key=get_pair_key(current_user.id, user_id)).first()
 
-        # Get time check of the chat by the current user
-        chat_time_check = LastTimeChecked.query.filter_by(chat_id=chat.id, user_id=current_user.id).first()
-        unread_chats.append(check_if_unread_chat(chat, chat_time_check))
 
-    return users, messages, unread_chats
-
-
-def reverse_order(tup):
+def get_inbox(page_size=None, before=None):
     """
-    Reverse the order of the elements inside a tuple.
+    Get the other user, the last message and the number of unread messages for each of the current user's chats that
+    contain at least one message, ordered by the post time of the last messages (most recent first). Everything is
+    obtained with a single SQL statement, which reads the last message of each chat from the pointer stored in the chat
+    and is ordered on the indexed post time of the last messages. The chats are obtained in pages, with a keyset on the
+    (last_post_time, last_message_id) of the chats, as the messages of a chat in get_messages_page.
 
     Arguments
     ---------
-    tup : tuple
-        The tuple that is to be inverted.
+    page_size : int
+        The maximum number of chats of the page. Default is None, which means all the chats are obtained.
+    before : tuple
+        The post time and id of the last message of the chat the page starts after (as returned by decode_cursor).
+        Default is None, which means the page starts with the most recent chat.
 
     Returns
     -------
-    list
-        A list containing the values of the tuple in reverse order.
+    inbox : list[tuple]
+        A (user, message, unread_count) tuple for each chat, where user is the other user in the chat
+        (my_app.models.User), message is the last message of the chat (my_app.models.Message) and unread_count is the
+        number of messages the current user has received since they last checked the chat.
+    older_cursor : str
+        The cursor used to get the page of older chats, or None if there are no older chats.
 
     """
-    reversed_list = [element for element in reversed(tup)]
-    return reversed_list
-
-
-def dt_with_delay():
+    other_user_id = db.case((Chat.user_1_id == current_user.id, Chat.user_2_id), else_=Chat.user_1_id)
+
+    inbox = (db.session.query(User, Message, db.func.coalesce(LastTimeChecked.unread_count, 0))
+             .select_from(Chat)
+             .join(Message, Message.id == Chat.last_message_id)  # Chats without messages are excluded
+             .join(User, User.id == other_user_id)
+             .outerjoin(LastTimeChecked, db.and_(LastTimeChecked.chat_id == Chat.id,
+                                                 LastTimeChecked.user_id == current_user.id))
+             .filter(db.or_(Chat.user_1_id == current_user.id, Chat.user_2_id == current_user.id)))
+    if before is not None:
+        inbox = inbox.filter(db.tuple_(Chat.last_post_time, Chat.last_message_id) < db.tuple_(*before))
+
+    # One more chat is read to know if there are older chats
+    inbox = (inbox.order_by(Chat.last_post_time.desc().nulls_last(), Chat.last_message_id.desc())
+             .limit(page_size + 1 if page_size is not None else None)
+             .all())
+    older_cursor = None
+    if page_size is not None and len(inbox) > page_size:
+        older_cursor = encode_cursor(inbox[page_size - 1][1])
+
+    return [tuple(row) for row in inbox[:page_size]], older_cursor
+
+
+def encode_cursor(message):
     """
-    Get the current datetime and introduce a delay.
-
-    This function will be used to introduce datetimes for chats that contain no messages, so that they can be compared
-    to those with messages (chats with no messages will not be displayed in view_messages.html, but their last_message
-    value, which is None, can lead to errors). The delay is introduced to prevent two empty last_messages to be given
-    the same datetime value.
-
-    Returns
-    -------
-    datetime.datetime
-        The current datetime.
-
+    Encode the position of a message in its chat (its post time and id) as the cursor of a page of messages, or the
+    position of a chat in the inbox (the post time and id of its last message) as the cursor of a page of chats.
     """
-    dt = datetime.now()
-    time.sleep(0.000000001)
-    return dt
+    return f'{message.post_time.isoformat()}_{message.id}'
 
 
-def order_chats_info(users, last_messages, unread_chats):
+def decode_cursor(cursor):
     """
-    Order to information about all the chats of the current user (the other users in the chat, the last messages in the
-    chat and whether or not those chats have unread messages) according to post time of the last messages.
+    Decode a cursor created by encode_cursor.
 
     Arguments
     ---------
-    users : list[my_app.models.User]
-        List of users that the current user has a chat with.
-    last_messages : list[my_app.models.Message]
-        List containing the last messages in each of the chats.
-    unread_chats : list[bool]
-        A list containing boolean values. Chats with unread messages will have a value of True, otherwise False.
+    cursor : str
+        The cursor.
 
     Returns
     -------
-    lists
-        The same lists as the ones in the arguments, but ordered according to the post time of the last messages
-        (descending order).
+    tuple
+        The post time (datetime.datetime) and id (int) of the message, or None if the cursor is not valid.
 
     """
-    if last_messages:
-        # Get the post times of each of the last messages. If a chat has no messages, use dt_with_delay()
-        p_times = [message.post_time if message is not None else dt_with_delay() for message in last_messages]
-
-        # Order all the lists with respect to post_times (ascending order and the lists are converted to tuples)
-        p_times, last_messages, users, unread_chats = zip(*sorted(zip(p_times, last_messages, users, unread_chats)))
+    post_time, _, message_id = cursor.rpartition('_')
+    try:
+        return datetime.fromisoformat(post_time), int(message_id)
+    except ValueError:
+        return None
 
-        # Convert the tuples back to lists and reverse their order
-        users = reverse_order(users)
-        last_messages = reverse_order(last_messages)
-        unread_chats = reverse_order(unread_chats)
 
-    return users, last_messages, unread_chats
-
-
-def check_if_no_messages(list_of_messages):
+def get_messages_page(chat_id, page_size, before=None):
     """
-    Check if a user has not received/sent any messages.
+    Get a page of the messages of a chat: the page_size messages that were sent just before a position of the chat
+    (or the last ones). The messages are found with a keyset on (post_time, id), so the query reads the same number of
+    rows of the index however long the chat is and however old the page is.
 
     Arguments
     ---------
-    list_of_messages : list[my_app.models.Message]
-        A list of messages.
+    chat_id : int
+        The id of the chat.
+    page_size : int
+        The maximum number of messages of the page.
+    before : tuple
+        The post time and id of the message the page ends before (as returned by decode_cursor). Default is None, which
+        means the last messages of the chat are obtained.
 
     Returns
     -------
-    bool
-        True if the user has not chats or all the chats are empty, otherwise False.
+    messages : list[my_app.models.Message]
+        The messages of the page, from the oldest to the most recent.
+    older_cursor : str
+        The cursor used to get the page of older messages, or None if there are no older messages.
 
     """
-    if not list_of_messages:  # List is empty (there user has not started any chats).
-        return True
-    else:
-        return all(message is None for message in list_of_messages)  # True if all the chats are empty else False
+    query = Message.query.filter(Message.chat_id == chat_id)
+    if before is not None:
+        query = query.filter(db.tuple_(Message.post_time, Message.id) < db.tuple_(*before))
+
+    # One more message is read to know if there are older messages
+    messages = query.order_by(Message.post_time.desc(), Message.id.desc()).limit(page_size + 1).all()
+    older_cursor = encode_cursor(messages[page_size - 1]) if len(messages) > page_size else None
+
+    return list(reversed(messages[:page_size])), older_cursor
 
 
 def create_and_commit_message(m_form, recipient_id, chat_id):
     """
-    Create a message from the data stored in a form and commit it.
+    Create a message from the data stored in a form and commit it, along with the last message of the chat and the
+    unread messages of the recipient.
 
     Arguments
     ---------
@@ -287,4 +289,14 @@ def create_and_commit_message(m_form, recipient_id, chat_id):
     message = Message(text=m_form.text.data, post_time=datetime.now(), user_sender_id=current_user.id,
                       user_recipient_id=recipient_id, chat_id=chat_id)
     db.session.add(message)
+    db.session.flush()  # Obtain the id of the message
+
+    # Point the chat to the message, unless a later message has been stored concurrently
+    Chat.query.filter(Chat.id == chat_id,
+                      db.or_(Chat.last_post_time.is_(None), Chat.last_post_time <= message.post_time)).update(
+        {Chat.last_message_id: message.id, Chat.last_post_time: message.post_time}, synchronize_session=False)
+    # Increase the unread messages of the chat for the recipient in the same transaction (in SQL, so that messages
+    # sent at the same time are all counted)
+    LastTimeChecked.query.filter_by(chat_id=chat_id, user_id=recipient_id).update(
+        {LastTimeChecked.unread_count: LastTimeChecked.unread_count + 1}, synchronize_session=False)
     db.session.commit()
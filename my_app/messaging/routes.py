@@ -1,10 +1,9 @@
 from my_app.messaging.helper_functions import *
-from flask import Blueprint, render_template, redirect, url_for, request, flash
+from flask import Blueprint, render_template, redirect, url_for, request, flash, current_app, abort, jsonify
 from flask_login import current_user, login_required
 from my_app.messaging.forms import MessageForm, LookForUser
-from my_app.models import User, Message
+from my_app.models import User
 from my_app import db
-from datetime import datetime
 
 
 messaging_bp = Blueprint('message', __name__)
@@ -25,23 +24,50 @@ def send_message(user_id):
         create_and_commit_message(form, user_id, chat.id)
         return redirect(url_for('message.send_message', user_id=user_id))
 
-    # Get the chat messages, recipient user and update the time check of the chat by the current user
-    chat_messages = Message.query.filter_by(chat_id=chat.id)
-    recipient_user = User.query.get(user_id)
-    time_check_current_user.time = datetime.now()  # Checked now
+    # Update the time check of the chat by the current user and get the recipient user and the last chat messages (the
+    # older ones are loaded from older_messages). The commit comes first, as it would expire the loaded messages
+    mark_chat_as_read(time_check_current_user)  # Checked now
     db.session.commit()
+    chat_messages, older_cursor = get_messages_page(chat.id, current_app.config.get('MESSAGES_PAGE_SIZE', 50))
+    recipient_user = User.query.get(user_id)
     return render_template('send_message.html', form=form, messages=chat_messages, recipient=recipient_user,
-                           unread_messages=check_if_unread())
+                           older_cursor=older_cursor, unread_messages=check_if_unread())
+
+
+@messaging_bp.route('/send_message/<int:user_id>/older_messages')
+@login_required
+def older_messages(user_id):
+    """
+    Route that sends (as JSON) the page of messages of a chat sent before the cursor given in the before parameter,
+    used to load older messages from the chat page.
+    """
+    chat = get_chat(user_id)
+    before = decode_cursor(request.args.get('before', ''))
+    if chat is None or before is None:
+        abort(404 if chat is None else 400)
+
+    chat_messages, older_cursor = get_messages_page(chat.id, current_app.config.get('MESSAGES_PAGE_SIZE', 50), before)
+    return jsonify({'messages': [{'id': message.id, 'text': message.text, 'post_time': message.post_time.isoformat(),
+                                  'sent_by_current_user': message.user_sender_id == current_user.id}
+                                 for message in chat_messages],
+                    'older_cursor': older_cursor})
 
 
 @messaging_bp.route('/view_messages', methods=['GET', 'POST'])
 @login_required
 def view_messages():
-    """Route used to view all the chats (with at least one messages) of the current user."""
-    # Get the ordered information about the chats
-    user_chats = get_user_chats()
-    users, messages, unread_chats = get_chats_info(user_chats)
-    users, messages, unread_chats = order_chats_info(users, messages, unread_chats)
+    """
+    Route used to view all the chats (with at least one messages) of the current user. The chats are listed in pages,
+    and the page of older chats is requested with the cursor given in the before parameter.
+    """
+    before = None
+    if request.args.get('before'):
+        before = decode_cursor(request.args['before'])
+        if before is None:
+            abort(400)
+
+    # Get the other user, last message and unread flag of each chat, ordered by the post time of the last messages
+    inbox, older_cursor = get_inbox(current_app.config.get('INBOX_PAGE_SIZE', 100), before)
 
     # Get the email of the available users for a chat (all the users except the current) and place them as
     # choices in LookForUser
@@ -54,6 +80,6 @@ def view_messages():
         user_selected = User.query.filter_by(email=user_browser.user.data).first()
         return redirect(url_for('message.send_message', user_id=user_selected.id))
 
-    return render_template('view_messages.html', users_and_messages_and_unreads=zip(users, messages, unread_chats),
-                           form=user_browser, no_messages=check_if_no_messages(messages),
-                           unread_messages=check_if_unread())
+    return render_template('view_messages.html', users_and_messages_and_unreads=inbox, form=user_browser,
+                           no_messages=not inbox and before is None, older_cursor=older_cursor,
+                           first_page=before is None, unread_messages=check_if_unread())
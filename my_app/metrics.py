@@ -0,0 +1,384 @@
+import bisect
+import functools
+import hmac
+import inspect
+import json
+import random
+import threading
+import logging
+import time
+from dash.exceptions import PreventUpdate
+from flask import Response, abort, g, request
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the buckets of the latency (seconds) and size (bytes) histograms
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def sampled_log(logger, event, sample_rate, **fields):
+    """
+    Log an event as a JSON object, but only for a random sample of the calls (so frequent events, such as navigating
+    between pages, do not flood the logs).
+
+    Arguments
+    ---------
+    logger : logging.Logger
+        The logger used to log the event.
+    event : str
+        The name of the event.
+    sample_rate : float
+        The probability of logging each call (0 disables the logging and 1 logs every call).
+    **fields
+        The data of the event (it must be JSON serializable).
+
+    """
+    if sample_rate > 0 and random.random() < sample_rate:
+        logger.info('%s', json.dumps({'event': event, 'sample_rate': sample_rate, **fields}, default=str))
+
+
+class MetricsRegistry:
+    """
+    A class that stores counters and histograms (with labels) and renders them in the Prometheus text format.
+
+    Attributes
+    ----------
+    __metrics : dict
+        The type, help text, buckets (histograms only) and values of each metric, keyed by name. The values are keyed
+        by the tuple of (label, value) pairs. For counters, each value is a number. For histograms, it is a list with
+        the count of each bucket (not cumulative), the sum and the count of the observations.
+    __lock : threading.Lock
+        Lock used to update the metrics from several threads.
+
+    Methods
+    -------
+    counter
+        Declare a counter.
+    histogram
+        Declare a histogram.
+    increment
+        Increase a counter.
+    observe
+        Add an observation to a histogram.
+    render
+        Render all the metrics in the Prometheus text format.
+
+    """
+
+    def __init__(self):
+        """Create an instance of the class"""
+        self.__metrics = {}
+        self.__lock = threading.Lock()
+
+    def counter(self, name, help_text):
+        """Declare a counter (if it has not been declared yet)"""
+        self.__metrics.setdefault(name, {'type': 'counter', 'help': help_text, 'values': {}})
+
+    def histogram(self, name, help_text, buckets):
+        """Declare a histogram with the given (sorted) bucket upper bounds (if it has not been declared yet)"""
+        self.__metrics.setdefault(name, {'type': 'histogram', 'help': help_text, 'buckets': tuple(buckets),
+                                         'values': {}})
+
+    def increment(self, name, labels, amount=1):
+        """
+        Increase a counter.
+
+        Arguments
+        ---------
+        name : str
+            The name of the counter.
+        labels : dict
+            The labels of the value that is increased (e.g., {'endpoint': 'main.index', 'status': '200'}).
+        amount : float
+            The amount added to the counter. Default is 1.
+
+        """
+        key = tuple(sorted(labels.items()))
+        with self.__lock:
+            values = self.__metrics[name]['values']
+            values[key] = values.get(key, 0) + amount
+
+    def observe(self, name, labels, value):
+        """
+        Add an observation to a histogram.
+
+        Arguments
+        ---------
+        name : str
+            The name of the histogram.
+        labels : dict
+            The labels of the histogram the observation is added to.
+        value : float
+            The observed value (e.g., a latency in seconds).
+
+        """
+        metric = self.__metrics[name]
+        key = tuple(sorted(labels.items()))
+        bucket = bisect.bisect_left(metric['buckets'], value)  # The +Inf bucket if it is larger than every bound
+        with self.__lock:
+            histogram = metric['values'].get(key)
+            if histogram is None:
+                histogram = metric['values'][key] = [[0] * (len(metric['buckets']) + 1), 0.0, 0]
+            histogram[0][bucket] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    @staticmethod
+    def __format_labels(labels, extra=()):
+        """Format a tuple of (label, value) pairs as {label="value",...} (an empty string if there are no labels)"""
+        pairs = list(labels) + list(extra)
+        if not pairs:
+            return ''
+        escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+        return '{' + ','.join(f'{label}="{value}"' for (label, _), value in zip(pairs, escaped)) + '}'
+
+    def render(self):
+        """
+        Render all the metrics in the Prometheus text exposition format (version 0.0.4).
+
+        Returns
+        -------
+        str
+            The rendered metrics.
+
+        """
+        lines = []
+        with self.__lock:
+            for name, metric in self.__metrics.items():
+                lines.append(f"# HELP {name} {metric['help']}")
+                lines.append(f"# TYPE {name} {metric['type']}")
+                for labels, value in sorted(metric['values'].items()):
+                    if metric['type'] == 'counter':
+                        lines.append(f'{name}{self.__format_labels(labels)} {value}')
+                        continue
+
+                    bucket_counts, total, count = value
+                    cumulative = 0
+                    for bound, bucket_count in zip(metric['buckets'] + ('+Inf',), bucket_counts):
+                        cumulative += bucket_count
+                        lines.append(f"{name}_bucket{self.__format_labels(labels, [('le', bound)])} {cumulative}")
+                    lines.append(f'{name}_sum{self.__format_labels(labels)} {total}')
+                    lines.append(f'{name}_count{self.__format_labels(labels)} {count}')
+
+        return '\n'.join(lines) + '\n'
+
+
+class Metrics:
+    """
+    A Flask extension that records the latency, response size and number of calls of every Flask view and every Dash
+    callback, and serves them on a Prometheus endpoint (/metrics by default).
+
+    Configuration (read from the app configuration by init_app):
+        METRICS_ENABLED, METRICS_PATH, METRICS_TOKEN (if it is set, the endpoint requires it as a bearer token) and
+        METRICS_ALLOW_PUBLIC (whether the endpoint is registered without a token, e.g., in development). If there is no
+        token and the endpoint cannot be public, the metrics are recorded but the endpoint is not registered.
+
+    Arguments
+    ---------
+    app : flask.app.Flask
+        The app that is instrumented. Default is None, which means init_app must be called later.
+
+    Attributes
+    ----------
+    __registry : my_app.metrics.MetricsRegistry
+        The registry that stores the metrics.
+
+    Methods
+    -------
+    init_app
+        Record the metrics of the requests of an app and register the metrics endpoint.
+    __start_timer
+        Store the start time of a request.
+    __record_request
+        Record the latency, response size and status of a request (and the response size of the Dash callback).
+    __serve_metrics
+        Send the metrics in the Prometheus text format.
+    instrument_dash
+        Wrap every server-side callback of a Dash app, so that its latency, response size and calls are recorded.
+    __instrument_callback
+        Wrap a Dash callback function.
+    registry
+        Getter method to obtain the registry.
+
+    """
+
+    def __init__(self, app=None):
+        """Create an instance of the class"""
+        self.__registry = MetricsRegistry()
+        self.__registry.histogram('flask_request_duration_seconds', 'Latency of the Flask views.', LATENCY_BUCKETS)
+        self.__registry.histogram('flask_response_size_bytes', 'Size of the responses of the Flask views (before '
+                                  'compression).', SIZE_BUCKETS)
+        self.__registry.counter('flask_requests_total', 'Number of requests handled by the Flask views.')
+        self.__registry.histogram('dash_callback_duration_seconds', 'Latency of the Dash callbacks.', LATENCY_BUCKETS)
+        self.__registry.histogram('dash_callback_response_size_bytes', 'Size of the responses of the Dash callbacks.',
+                                  SIZE_BUCKETS)
+        self.__registry.counter('dash_callback_calls_total', 'Number of calls of the Dash callbacks.')
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Set the default configuration of the extension, record the metrics of every request of the app and register the
+        metrics endpoint.
+
+        Arguments
+        ---------
+        app : flask.app.Flask
+            The app that is instrumented.
+
+        """
+        app.config.setdefault('METRICS_ENABLED', True)
+        app.config.setdefault('METRICS_PATH', '/metrics')
+        app.config.setdefault('METRICS_TOKEN', None)
+        app.config.setdefault('METRICS_ALLOW_PUBLIC', False)
+        if not app.config['METRICS_ENABLED']:
+            return
+
+        app.before_request(self.__start_timer)
+        app.after_request(self.__record_request)
+        if app.config['METRICS_TOKEN'] or app.config['METRICS_ALLOW_PUBLIC']:
+            app.add_url_rule(app.config['METRICS_PATH'], 'metrics', lambda: self.__serve_metrics(app.config))
+        else:
+            logger.warning('METRICS_TOKEN is not set, so the metrics endpoint %s is not registered',
+                           app.config['METRICS_PATH'])
+
+    @staticmethod
+    def __start_timer():
+        """Store the time at which the request started"""
+        g.metrics_start = time.perf_counter()
+
+    def __record_request(self, response):
+        """
+        Record the latency, response size and status of a request (the size of streamed files is not known, so it is
+        not recorded). If the request ran a Dash callback, the size of the serialized response (the JSON that Dash sends
+        back) is also recorded as the response size of the callback.
+
+        Arguments
+        ---------
+        response : flask.wrappers.Response
+            The response of the request.
+
+        Returns
+        -------
+        flask.wrappers.Response
+            The same response.
+
+        """
+        start = g.pop('metrics_start', None)
+        endpoint = request.endpoint or 'not_found'
+        self.__registry.increment('flask_requests_total', {'endpoint': endpoint, 'method': request.method,
+                                                           'status': str(response.status_code)})
+        if start is not None:
+            self.__registry.observe('flask_request_duration_seconds', {'endpoint': endpoint, 'method': request.method},
+                                    time.perf_counter() - start)
+        callback = g.pop('metrics_dash_callback', None)
+        if response.content_length is not None:
+            self.__registry.observe('flask_response_size_bytes', {'endpoint': endpoint}, response.content_length)
+            if callback is not None and response.status_code == 200:
+                self.__registry.observe('dash_callback_response_size_bytes', {'callback': callback},
+                                        response.content_length)
+
+        return response
+
+    def __serve_metrics(self, config):
+        """
+        Send the metrics in the Prometheus text format. If METRICS_TOKEN is set, the request must include it as a
+        bearer token.
+
+        Arguments
+        ---------
+        config : flask.config.Config
+            The configuration of the app.
+
+        Returns
+        -------
+        flask.wrappers.Response
+            The metrics.
+
+        """
+        token = config['METRICS_TOKEN']
+        if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            abort(403)
+
+        return Response(self.__registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+    def instrument_dash(self, dash_app):
+        """
+        Wrap every server-side callback registered on a Dash app (clientside callbacks run in the browser, so they are
+        not included), so that its latency, response size and number of calls (by outcome) are recorded. It must be
+        called after the callbacks are registered. The response size is recorded by __record_request, once Dash has
+        serialized the response of the _dash-update-component request.
+
+        Arguments
+        ---------
+        dash_app : dash.Dash
+            The Dash app.
+
+        """
+        if not dash_app.server.config.get('METRICS_ENABLED', True):
+            return
+
+        for output, callback in dash_app.callback_map.items():
+            function = callback.get('callback')
+            if function is not None and not getattr(function, 'instrumented', False):
+                callback['callback'] = self.__instrument_callback(function, getattr(function, '__name__', output))
+
+    def __instrument_callback(self, function, name):
+        """
+        Wrap a Dash callback function. Its name is stored in flask.g, so the size of the response is recorded with it.
+
+        Arguments
+        ---------
+        function : function
+            The callback function.
+        name : str
+            The name of the callback used as label of the metrics.
+
+        Returns
+        -------
+        function
+            The wrapped function.
+
+        """
+        def record(start, outcome):
+            """Record the metrics of a call of the callback"""
+            labels = {'callback': name}
+            self.__registry.observe('dash_callback_duration_seconds', labels, time.perf_counter() - start)
+            self.__registry.increment('dash_callback_calls_total', {**labels, 'outcome': outcome})
+            g.metrics_dash_callback = name
+
+        if inspect.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def instrumented(*args, **kwargs):
+                start, outcome = time.perf_counter(), 'error'
+                try:
+                    result = await function(*args, **kwargs)
+                    outcome = 'ok'
+                    return result
+                except PreventUpdate:
+                    outcome = 'prevented'
+                    raise
+                finally:
+                    record(start, outcome)
+        else:
+            @functools.wraps(function)
+            def instrumented(*args, **kwargs):
+                start, outcome = time.perf_counter(), 'error'
+                try:
+                    result = function(*args, **kwargs)
+                    outcome = 'ok'
+                    return result
+                except PreventUpdate:
+                    outcome = 'prevented'
+                    raise
+                finally:
+                    record(start, outcome)
+
+        instrumented.instrumented = True
+        return instrumented
+
+    @property
+    def registry(self):
+        """Getter method to obtain the registry that stores the metrics"""
+        return self.__registry
@@ -13,6 +13,8 @@ class User(UserMixin, db.Model):
     password = db.Column(db.Text, nullable=False)
     proposals = db.relationship("Proposal")  # One user to many proposals relationship
     time_checks = db.relationship("LastTimeChecked")  # One user to many time checks relationship
+    # One user to many preferred genres relationship (the genres highlighted on the dashboard)
+    preferred_genres = db.relationship("PreferredGenre", cascade="all, delete-orphan")
 
     def __repr__(self):
         """String representation of the user."""
@@ -26,6 +28,14 @@ class User(UserMixin, db.Model):
         """Check if the password input when logging in is the same as the hashed password."""
         return check_password_hash(self.password, password)
 
+    def get_preferred_genres(self):
+        """Get the names of the preferred genres of the user (sorted alphabetically)."""
+        return sorted(genre.genre_name for genre in self.preferred_genres)
+
+    def set_preferred_genres(self, genre_names):
+        """Replace the preferred genres of the user with the given genre names."""
+        self.preferred_genres = [PreferredGenre(genre_name=genre_name) for genre_name in sorted(set(genre_names))]
+
 
 class Proposal(db.Model):
     """DataBase model that stores a film proposal's information."""
@@ -57,12 +67,30 @@ class Genre(db.Model):
     proposal_id = db.Column(db.Integer, db.ForeignKey("proposal.id"))
 
 
+class PreferredGenre(db.Model):
+    """DataBase model that stores a genre that a user has chosen as preferred (highlighted on the dashboard)."""
+    __tablename__ = "preferred_genre"
+    id = db.Column(db.Integer, primary_key=True)
+    genre_name = db.Column(db.Text, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), index=True)
+
+
 class Chat(db.Model):
     """DataBase model that stores information about a chat between two users."""
     __tablename__ = "chat"
+    # The chats of a user are listed by the post time of their last message, so each user column is indexed with it
+    __table_args__ = (db.Index('ix_chat_user_1_id_last_post_time', 'user_1_id', 'last_post_time'),
+                      db.Index('ix_chat_user_2_id_last_post_time', 'user_2_id', 'last_post_time'))
     id = db.Column(db.Integer, primary_key=True)
     user_1_id = db.Column(db.Integer, db.ForeignKey("user.id"))
     user_2_id = db.Column(db.Integer, db.ForeignKey("user.id"))
+    # The ids of the two users from lowest to highest (e.g., "2_3"), which is the same whoever started the chat. It is
+    # unique, so there can only be one chat between two users
+    pair_key = db.Column(db.Text, index=True, unique=True)
+    # The id and post time of the last message sent in the chat (None if the chat has no messages), updated in the same
+    # transaction as the message is stored. The id is not a foreign key, as message already references chat
+    last_message_id = db.Column(db.Integer)
+    last_post_time = db.Column(db.DateTime)
     messages = db.relationship("Message")  # One chat to many messages relationship
     # One chat to many time checks relationship, though only one per user (per chat) is allowed
     time_checks = db.relationship("LastTimeChecked")
@@ -71,6 +99,8 @@ class Chat(db.Model):
 class Message(db.Model):
     """DataBase model that stores information about a message sent in a chat."""
     __tablename__ = "message"
+    # The messages of a chat are read in pages ordered by (post_time, id), so the index covers the keyset of the pages
+    __table_args__ = (db.Index('ix_message_chat_id_post_time_id', 'chat_id', 'post_time', 'id'),)
     id = db.Column(db.Integer, primary_key=True)
     text = db.Column(db.Text, nullable=False)
     post_time = db.Column(db.DateTime, nullable=False)  # Time when the message was sent
@@ -85,4 +115,7 @@ class LastTimeChecked(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     time = db.Column(db.DateTime)
     chat_id = db.Column(db.Integer, db.ForeignKey("chat.id"))
-    user_id = db.Column(db.Integer, db.ForeignKey("user.id"))
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), index=True)
+    # Number of messages received in the chat since the user last checked it (increased when a message is sent to the
+    # user and reset when the user opens the chat)
+    unread_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
@@ -0,0 +1,125 @@
+from sqlalchemy import inspect, text
+from my_app import db
+
+# Statements that fill the denormalized columns of the chats and time checks from the messages. They are used to
+# backfill the columns and, restricted to some chats (with WHERE ... = :chat_id), to update them after merging chats
+UNREAD_COUNT_SQL = ('UPDATE last_checked SET unread_count = ('
+                    'SELECT COUNT(*) FROM message WHERE message.chat_id = last_checked.chat_id '
+                    'AND message.user_recipient_id = last_checked.user_id '
+                    'AND (last_checked.time IS NULL OR message.post_time > last_checked.time))')
+LAST_MESSAGE_ID_SQL = ('UPDATE chat SET last_message_id = ('
+                       'SELECT message.id FROM message WHERE message.chat_id = chat.id '
+                       'ORDER BY message.post_time DESC, message.id DESC LIMIT 1)')
+LAST_POST_TIME_SQL = ('UPDATE chat SET last_post_time = ('
+                      'SELECT message.post_time FROM message WHERE message.id = chat.last_message_id)')
+PAIR_KEY_SQL = ("UPDATE chat SET pair_key = CASE WHEN user_1_id < user_2_id THEN user_1_id || '_' || user_2_id "
+                "ELSE user_2_id || '_' || user_1_id END")
+
+
+def merge_duplicate_chats(connection):
+    """
+    Merge the chats between the same two users (which could be created before chats had a unique pair key) into the
+    oldest one: their messages and time checks are moved to it, the time checks of each user are merged into one (with
+    the earliest time, so no message becomes read) and the rest of the chats are deleted.
+
+    Arguments
+    ---------
+    connection : sqlalchemy.engine.Connection
+        The connection (within the transaction of upgrade_schema).
+
+    Returns
+    -------
+    list
+        The ids of the chats that other chats were merged into.
+
+    """
+    kept_chats = {}
+    merged = set()
+    for chat_id, user_1_id, user_2_id in connection.execute(text('SELECT id, user_1_id, user_2_id FROM chat '
+                                                                 'ORDER BY id')):
+        kept_id = kept_chats.setdefault(tuple(sorted((user_1_id, user_2_id))), chat_id)
+        if kept_id == chat_id:
+            continue
+
+        parameters = {'kept_id': kept_id, 'chat_id': chat_id}
+        connection.execute(text('UPDATE message SET chat_id = :kept_id WHERE chat_id = :chat_id'), parameters)
+        connection.execute(text('UPDATE last_checked SET chat_id = :kept_id WHERE chat_id = :chat_id'), parameters)
+        connection.execute(text('DELETE FROM chat WHERE id = :chat_id'), parameters)
+        merged.add(kept_id)
+
+    for kept_id in merged:
+        parameters = {'chat_id': kept_id}
+        # Keep the first time check of each user, with the earliest time of the user's time checks
+        connection.execute(text('UPDATE last_checked SET time = ('
+                                'SELECT MIN(other.time) FROM last_checked AS other '
+                                'WHERE other.chat_id = last_checked.chat_id AND other.user_id = last_checked.user_id) '
+                                'WHERE chat_id = :chat_id'), parameters)
+        connection.execute(text('DELETE FROM last_checked WHERE chat_id = :chat_id AND id > ('
+                                'SELECT MIN(other.id) FROM last_checked AS other '
+                                'WHERE other.chat_id = last_checked.chat_id AND other.user_id = last_checked.user_id)'),
+                           parameters)
+        connection.execute(text(UNREAD_COUNT_SQL + ' WHERE last_checked.chat_id = :chat_id'), parameters)
+        connection.execute(text(LAST_MESSAGE_ID_SQL + ' WHERE chat.id = :chat_id'), parameters)
+        connection.execute(text(LAST_POST_TIME_SQL + ' WHERE chat.id = :chat_id'), parameters)
+
+    return sorted(merged)
+
+
+def backfill_pair_keys(connection):
+    """Merge the duplicate chats (see merge_duplicate_chats), so the pair key of every chat is unique, and fill it"""
+    merge_duplicate_chats(connection)
+    connection.execute(text(PAIR_KEY_SQL))
+
+
+# Columns added to the models after databases had already been created with them. db.create_all only creates the
+# tables that do not exist, so these columns are added to existing tables (and filled from the existing rows) by
+# upgrade_schema. Each upgrade is a (table, column, column definition, backfill) tuple, where the backfill is a
+# statement or a function that receives the connection
+COLUMN_UPGRADES = [
+    # Number of messages received in a chat after the user last checked it
+    ('last_checked', 'unread_count', 'INTEGER NOT NULL DEFAULT 0', UNREAD_COUNT_SQL),
+    # Id and post time of the last message of each chat (ties in the post time are broken by the id)
+    ('chat', 'last_message_id', 'INTEGER', LAST_MESSAGE_ID_SQL),
+    ('chat', 'last_post_time', 'DATETIME', LAST_POST_TIME_SQL),
+    # Canonical pair of users of each chat (duplicate chats of a pair are merged, so the unique index can be created)
+    ('chat', 'pair_key', 'TEXT', backfill_pair_keys),
+]
+
+
+def upgrade_schema():
+    """
+    Bring the tables of an existing database up to date with the models: add the columns of COLUMN_UPGRADES that do
+    not exist (filling them from the existing rows) and create the indexes that do not exist. The changes are made in a
+    single transaction, and the columns that already exist are left untouched, so it can be run on every start.
+
+    Returns
+    -------
+    list
+        The names (table.column) of the columns that were added.
+
+    """
+    added = []
+    with db.engine.begin() as connection:
+        inspector = inspect(connection)
+        tables = set(inspector.get_table_names())
+        for table, column, definition, backfill in COLUMN_UPGRADES:
+            if table not in tables or column in {info['name'] for info in inspector.get_columns(table)}:
+                continue
+
+            connection.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {definition}'))
+            if callable(backfill):
+                backfill(connection)
+            else:
+                connection.execute(text(backfill))
+            added.append(f'{table}.{column}')
+
+        # Chats can be left without pair key by an earlier version of this upgrade, which did not merge the duplicates
+        if 'chat' in tables and connection.execute(text('SELECT 1 FROM chat WHERE pair_key IS NULL LIMIT 1')).first():
+            backfill_pair_keys(connection)
+
+        # db.create_all only creates the indexes of new tables
+        for model_table in db.metadata.sorted_tables:
+            for index in model_table.indexes:
+                index.create(connection, checkfirst=True)
+
+    return added
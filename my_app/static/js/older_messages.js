@@ -0,0 +1,65 @@
+// Load the older messages of a chat (from the older_messages route) and place them above the displayed ones, using the
+// same cards as send_message.html
+(function () {
+    const button = document.getElementById('load_older_messages');
+    if (!button) {
+        return;
+    }
+
+    function createMessage(message) {
+        const container = document.createElement('div');
+        container.className = 'container';
+        const row = document.createElement('div');
+        row.className = 'row';
+        const card = document.createElement('div');
+        // Messages sent by the user are light and placed towards the right side, the rest are dark and on the left
+        card.className = message.sent_by_current_user ? 'card text-dark bg-light mb-3 col-7'
+                                                      : 'card text-white bg-dark mb-3 col-7';
+        const body = document.createElement('div');
+        body.className = 'card-body';
+        const text = document.createElement('p');
+        text.className = 'card-text';
+        text.textContent = message.text;
+        body.appendChild(text);
+        card.appendChild(body);
+        const space = document.createElement('div');
+        space.className = 'col';
+        if (message.sent_by_current_user) {
+            row.append(space, card);
+        } else {
+            row.append(card, space);
+        }
+        container.appendChild(row);
+        return container;
+    }
+
+    button.addEventListener('click', function () {
+        button.disabled = true;
+        const url = button.dataset.url + '?before=' + encodeURIComponent(button.dataset.cursor);
+        fetch(url, {credentials: 'same-origin'})
+            .then(function (response) {
+                if (!response.ok) {
+                    throw new Error('The older messages could not be loaded (' + response.status + ')');
+                }
+                return response.json();
+            })
+            .then(function (page) {
+                const messages = document.getElementById('chat_messages');
+                const fragment = document.createDocumentFragment();
+                page.messages.forEach(function (message) {
+                    fragment.appendChild(createMessage(message));
+                });
+                messages.insertBefore(fragment, messages.firstChild);
+                if (page.older_cursor) {
+                    button.dataset.cursor = page.older_cursor;
+                    button.disabled = false;
+                } else {
+                    button.remove();  // There are no older messages
+                }
+            })
+            .catch(function (error) {
+                console.error(error);
+                button.disabled = false;
+            });
+    });
+})();